@@ -1,24 +1,53 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import cv2
-import numpy as np
-from PIL import Image
-import io
+import tempfile
 import json
 from typing import Dict, List, Optional
 import time
 import sys
 import os
 import base64
+import asyncio
+import uuid
+import queue
+import threading
+import itertools
+from contextlib import asynccontextmanager
+from concurrent.futures import Future
 
 # Add the backend directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.posture_analyzer import PostureAnalyzer, PostureAnalysis
+from services.posture_analyzer import PostureAnalysis
+from services.analyzer_pool import AnalyzerPool
+from services.landmark_cache import LandmarkCache
+from services.motion_gate import MotionGate
+from services.complexity_controller import ComplexityController
+from services.inference_executor import InferenceExecutor, InferenceSaturated
+from services.image_io import decode_image_rgb, split_image_batch, ImageDecodeError
+from services.video_sharding import VideoShardAnalyzer
+from services.video_jobs import VideoJobQueue, VideoJobStore, JobQueueFull, SUCCEEDED, FINISHED_STATES
+from services.video_pipeline import (
+    VideoAnalysisPipeline, VideoOpenError, VideoSummary, FrameSampling, spool_upload, open_video, frame_record
+)
+from services.video_landmark_cache import VideoLandmarkCache, LandmarkSeries
+from services.landmark_flow import FlowTracking
+from services.rep_segmentation import RepTimeline
+from services.landmark_smoothing import LandmarkSmoothing, smooth_frames
+from services.roi import RegionOfInterest
 from services.llm_advisor import VirtualCoachAdvisor, WorkoutPlan, NutritionAdvice
 
-app = FastAPI(title="Virtual Fitness Trainer API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Not at import: when this file is run as a script, spawned video shard workers
+    # re-import it and must neither build analyzer graphs nor run queued jobs
+    posture_analyzer.start()
+    video_job_queue.start()
+    yield
+
+app = FastAPI(title="Virtual Fitness Trainer API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -30,83 +59,504 @@ app.add_middleware(
 )
 
 # Initialize services
-posture_analyzer = PostureAnalyzer()
+# Repeated still images (client retries, re-submitted frames) reuse earlier landmarks;
+# a budget of 0 MB disables the cache
+LANDMARK_CACHE_MB = float(os.getenv("LANDMARK_CACHE_MB", "16"))
+landmark_cache = LandmarkCache(
+    max_bytes=int(LANDMARK_CACHE_MB * 1024 * 1024),
+    ttl=float(os.getenv("LANDMARK_CACHE_TTL_SECONDS", "300"))
+) if LANDMARK_CACHE_MB > 0 else None
+
+# Live sessions reuse the previous landmarks while the frame barely changes (planks,
+# pauses between reps); a threshold of 0 runs inference on every frame
+POSE_MOTION_THRESHOLD = float(os.getenv("POSE_MOTION_THRESHOLD", "2.0"))
+motion_gate = MotionGate(
+    threshold=POSE_MOTION_THRESHOLD,
+    max_reuse=int(os.getenv("POSE_MOTION_MAX_REUSE", "15"))
+) if POSE_MOTION_THRESHOLD > 0 else None
+
+# Session frames are cropped to the previous landmarks' bounding box padded by this
+# fraction of its size (0 disables); the crop is kept until the person leaves it
+POSE_SESSION_ROI_MARGIN = float(os.getenv("POSE_SESSION_ROI_MARGIN", "0.15"))
+
+# Still images run at these long sides (px) first and escalate to the next level,
+# then to the full upload, only when no pose is found or key joints are poorly visible;
+# an empty POSE_CASCADE_SIDES always runs at full resolution
+POSE_CASCADE_SIDES = [int(side) for side in os.getenv("POSE_CASCADE_SIDES", "256,384").split(",") if side.strip()]
+
+# Still images pick a Pose model tier (0 lite, 1 full, 2 heavy) per request: the
+# controller drops a tier when p95 inference latency misses POSE_LATENCY_SLO_MS or
+# requests queue, and climbs back while idle. A worker loads a higher tier's graph
+# the first time it is chosen; a single tier (e.g. "0") pins the model
+POSE_COMPLEXITY_TIERS = [int(tier) for tier in os.getenv("POSE_COMPLEXITY_TIERS", "0,1,2").split(",") if tier.strip()]
+complexity_controller = ComplexityController(
+    tiers=POSE_COMPLEXITY_TIERS,
+    slo_ms=float(os.getenv("POSE_LATENCY_SLO_MS", "150")),
+    queue_depth=lambda: inference_executor.queue_depth(),
+    max_queue=int(os.getenv("POSE_COMPLEXITY_MAX_QUEUE", "0")),
+    cooldown=float(os.getenv("POSE_COMPLEXITY_COOLDOWN_SECONDS", "2")),
+    max_sample_age=float(os.getenv("POSE_COMPLEXITY_SAMPLE_AGE_SECONDS", "60"))
+) if len(set(POSE_COMPLEXITY_TIERS)) > 1 else None
+
+# Live-session landmarks are smoothed per session before scoring ("one_euro" or
+# "ema"; "off" disables); VIDEO_POSE_SMOOTHING applies the same filter to videos
+POSE_SMOOTHING = os.getenv("POSE_SMOOTHING", "one_euro").lower()
+pose_smoothing = LandmarkSmoothing(
+    mode=POSE_SMOOTHING,
+    min_cutoff=float(os.getenv("POSE_SMOOTHING_MIN_CUTOFF", "1.0")),
+    beta=float(os.getenv("POSE_SMOOTHING_BETA", "5.0")),
+    alpha=float(os.getenv("POSE_SMOOTHING_ALPHA", "0.5"))
+) if POSE_SMOOTHING in ("one_euro", "ema") else None
+VIDEO_POSE_SMOOTHING = os.getenv("VIDEO_POSE_SMOOTHING", "true").lower() in ("1", "true", "yes")
+
+# Each pool worker owns its own MediaPipe graph; size defaults to one per core
+posture_analyzer = AnalyzerPool(
+    size=int(os.getenv("ANALYZER_POOL_SIZE", "0")),
+    workers_per_core=float(os.getenv("ANALYZER_WORKERS_PER_CORE", "1")),
+    max_sessions=int(os.getenv("POSE_SESSION_MAX", "32")),
+    session_idle_timeout=float(os.getenv("POSE_SESSION_IDLE_SECONDS", "60")),
+    landmark_cache=landmark_cache,
+    motion_gate=motion_gate,
+    session_roi_margin=POSE_SESSION_ROI_MARGIN if POSE_SESSION_ROI_MARGIN > 0 else None,
+    cascade_sides=POSE_CASCADE_SIDES,
+    complexity_controller=complexity_controller,
+    smoothing=pose_smoothing,
+    start=False  # graphs are built by the lifespan hook
+)
 coach_advisor = VirtualCoachAdvisor()
 
+# Each video gets its own tracking-mode graph (released when the request ends) so
+# frames after the first skip person detection; set to false to fan still-image
+# inference out across the analyzer pool instead
+VIDEO_POSE_TRACKING = os.getenv("VIDEO_POSE_TRACKING", "true").lower() in ("1", "true", "yes")
+
+# Video analysis overlaps decoding with inference
+video_pipeline = VideoAnalysisPipeline(
+    posture_analyzer,
+    workers=int(os.getenv("VIDEO_ANALYZER_WORKERS", "0")),
+    queue_size=int(os.getenv("VIDEO_FRAME_QUEUE_SIZE", "8")),
+    tracking=VIDEO_POSE_TRACKING
+)
+
+# Optional multi-process path: one video split into time segments, one process each
+video_shard_analyzer = VideoShardAnalyzer(
+    processes=int(os.getenv("VIDEO_SHARD_PROCESSES", "0")),
+    min_segment_seconds=float(os.getenv("VIDEO_SHARD_MIN_SEGMENT_SECONDS", "5")),
+    tracking=VIDEO_POSE_TRACKING
+)
+
+# Landmark series of analyzed videos, keyed by file content, so re-scoring the same
+# footage with another exercise_type or sparser sampling skips decode and inference
+VIDEO_LANDMARK_CACHE_MB = float(os.getenv("VIDEO_LANDMARK_CACHE_MB", "512"))
+video_landmark_cache = VideoLandmarkCache(
+    os.getenv("VIDEO_LANDMARK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "fitness_video_landmarks")),
+    max_bytes=int(VIDEO_LANDMARK_CACHE_MB * 1024 * 1024)
+) if VIDEO_LANDMARK_CACHE_MB > 0 else None
+
+# Frame records buffered ahead of a slow NDJSON reader before analysis pauses
+VIDEO_STREAM_BUFFER = int(os.getenv("VIDEO_STREAM_BUFFER", "32"))
+
+# Optical-flow propagation bounds (pixels) for keyframe_interval > 1: a landmark whose
+# forward-backward error exceeds VIDEO_FLOW_MAX_ERROR is lost, and accumulated error
+# past VIDEO_FLOW_MAX_DRIFT forces a fresh keyframe
+VIDEO_FLOW_MAX_ERROR = float(os.getenv("VIDEO_FLOW_MAX_ERROR", "2.0"))
+VIDEO_FLOW_MAX_DRIFT = float(os.getenv("VIDEO_FLOW_MAX_DRIFT", "8.0"))
+
+# Sampling gaps of at least this many frames seek to the next sample instead of grabbing through
+VIDEO_SEEK_MIN_GAP = int(os.getenv("VIDEO_SEEK_MIN_GAP", "90"))
+
+# Video frames are form-scored this many at a time, as one (frames x features) evaluation
+VIDEO_SCORE_BATCH = int(os.getenv("VIDEO_SCORE_BATCH", "256"))
+
+# Exercises come from the form rules config, so adding one there is enough
+VALID_EXERCISES = posture_analyzer.form_rules.exercises
+
+# Oversized uploads (e.g. 12 MP phone photos) are decoded at reduced resolution
+MAX_IMAGE_SIDE = int(os.getenv("MAX_IMAGE_SIDE", "1280"))
+RAW_IMAGE_CONTENT_TYPES = ("application/octet-stream", "image/jpeg", "image/png")
+# /analyze-posture/batch: most images per request, and the raw body types holding
+# length-prefixed images
+MAX_BATCH_IMAGES = int(os.getenv("MAX_BATCH_IMAGES", "32"))
+BATCH_CONTENT_TYPES = ("application/x-image-batch", "application/octet-stream")
+
+# CPU-bound decode and inference run here instead of on the event loop; once
+# max in-flight plus queued work is reached, requests are turned away with 503
+inference_executor = InferenceExecutor(
+    max_in_flight=int(os.getenv("INFERENCE_MAX_IN_FLIGHT", str(posture_analyzer.size))),
+    max_queue=int(os.getenv("INFERENCE_MAX_QUEUE", str(posture_analyzer.size * 2)))
+)
+
+@app.exception_handler(InferenceSaturated)
+async def inference_saturated_handler(request, exc: InferenceSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy analyzing other requests. Please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(JobQueueFull)
+async def job_queue_full_handler(request, exc: JobQueueFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many video jobs are waiting. Please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 @app.get("/")
 async def root():
     return {"message": "Virtual Fitness Trainer API", "version": "1.0.0"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": time.time()}
+    return {"status": "healthy", "inference": inference_executor.stats(), "timestamp": time.time()}
+
+@app.get("/metrics")
+async def metrics():
+    """Counters for the inference executor, analyzer pool and landmark cache"""
+    return {
+        "inference": inference_executor.stats(),
+        "analyzer_pool": posture_analyzer.stats(),
+        "video_landmark_cache": video_landmark_cache.stats() if video_landmark_cache is not None else None,
+        "video_jobs": video_job_queue.stats(),
+        "timestamp": time.time()
+    }
 
 @app.post("/analyze-posture")
 async def analyze_posture(
-    file: UploadFile = File(...),
+    request: Request,
+    file: Optional[UploadFile] = File(None),
     exercise_type: str = Form("squat"),
-    include_pose_overlay: bool = Form(False)
+    include_pose_overlay: bool = Form(False),
+    session_id: Optional[str] = Form(None),
+    roi: Optional[str] = Form(None)
 ):
     """
-    Analyze exercise posture from uploaded image/video
+    Analyze exercise posture from an uploaded image.
+    
+    Accepts multipart form data, or a raw JPEG/PNG body (application/octet-stream)
+    with the options passed as query parameters. roi ("x,y,width,height", normalized)
+    hints where the person is; inference runs on that crop first.
     """
     try:
+        if file is not None:
+            contents = await file.read()
+        else:
+            contents = await _read_raw_image_body(request)
+            params = request.query_params
+            exercise_type = params.get("exercise_type", exercise_type)
+            include_pose_overlay = params.get("include_pose_overlay", str(include_pose_overlay)).lower() in ("1", "true", "yes")
+            session_id = params.get("session_id", session_id)
+            roi = params.get("roi", roi)
+        
         # Validate exercise type
-        valid_exercises = ['squat', 'pushup', 'plank', 'lunge', 'deadlift']
-        if exercise_type not in valid_exercises:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid exercise type. Must be one of: {valid_exercises}"
-            )
+        _validate_exercise_type(exercise_type)
+        region = _parse_roi(roi)
+        
+        # Decode and analyze posture on the inference executor
+        analysis, analysis_time, pose_overlay_image = await inference_executor.run(
+            _run_posture_analysis, contents, exercise_type, include_pose_overlay, session_id, region
+        )
         
-        # Read and process image
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        image_array = np.array(image)
+        return JSONResponse(content=_posture_response(analysis, analysis_time, pose_overlay_image))
         
-        # Convert PIL image to OpenCV format
-        if len(image_array.shape) == 3:
-            image_cv = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
+    except (HTTPException, InferenceSaturated):
+        raise
+    except ImageDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing posture: {str(e)}")
+
+@app.post("/analyze-posture/batch")
+async def analyze_posture_batch(
+    request: Request,
+    files: Optional[List[UploadFile]] = File(None),
+    exercise_type: str = Form("squat"),
+    include_pose_overlay: bool = Form(False),
+    roi: Optional[str] = Form(None)
+):
+    """
+    Analyze several still images in one request.
+    
+    Accepts multipart form data with repeated 'files' fields, or a raw
+    application/x-image-batch body (each image as a 4-byte big-endian length
+    followed by its JPEG/PNG bytes) with the options passed as query parameters.
+    Images fan out across the analyzer pool; results come back in input order,
+    each carrying either its analysis or its own error.
+    """
+    try:
+        if files:
+            images = [await upload.read() for upload in files]
         else:
-            image_cv = image_array
+            content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type not in BATCH_CONTENT_TYPES:
+                raise HTTPException(
+                    status_code=400,
+                    detail="No images provided. Send multipart form data with 'files' fields or a raw application/x-image-batch body."
+                )
+            images = split_image_batch(await request.body())
+            params = request.query_params
+            exercise_type = params.get("exercise_type", exercise_type)
+            include_pose_overlay = params.get("include_pose_overlay", str(include_pose_overlay)).lower() in ("1", "true", "yes")
+            roi = params.get("roi", roi)
         
-        # Analyze posture
-        start_time = time.time()
-        analysis = posture_analyzer.analyze_exercise_form(image_cv, exercise_type)
-        analysis_time = time.time() - start_time
+        _validate_exercise_type(exercise_type)
+        region = _parse_roi(roi)
+        if not images:
+            raise HTTPException(status_code=400, detail="The batch contains no images")
+        if len(images) > MAX_BATCH_IMAGES:
+            raise HTTPException(status_code=413, detail=f"A batch holds at most {MAX_BATCH_IMAGES} images")
         
-        # Generate LLM feedback
-        feedback = coach_advisor.analyze_form_feedback(
-            exercise_type, 
-            analysis.form_score, 
-            analysis.corrections
+        # The batch is admitted or turned away as a whole, then fans out across at
+        # most the executor's worker count; each image succeeds or fails on its own
+        tasks = inference_executor.submit_batch(
+            _run_posture_analysis,
+            [(contents, exercise_type, include_pose_overlay, None, region) for contents in images]
         )
         
-        # Prepare response
-        response = {
-            "exercise_type": analysis.exercise_type,
-            "confidence": analysis.confidence,
-            "form_score": analysis.form_score,
-            "is_correct_form": analysis.is_correct_form,
-            "corrections": analysis.corrections,
-            "key_points": analysis.key_points,
-            "feedback": feedback,
-            "analysis_time_ms": round(analysis_time * 1000, 2),
-            "timestamp": time.time()
-        }
-
-        if include_pose_overlay:
-            pose_landmarks = posture_analyzer.extract_pose_landmarks(image_cv)
-            if pose_landmarks is not None:
-                overlay_image = posture_analyzer.draw_pose_landmarks(image_cv, pose_landmarks)
-                success, buffer = cv2.imencode(".jpg", overlay_image)
-                if success:
-                    response["pose_overlay_image"] = base64.b64encode(buffer).decode("utf-8")
+        results = []
+        for index, task in enumerate(tasks):
+            try:
+                analysis, analysis_time, pose_overlay_image = await asyncio.wrap_future(task)
+            except ImageDecodeError as e:
+                results.append({"index": index, "status": 400, "error": str(e)})
+            except Exception as e:
+                results.append({"index": index, "status": 500, "error": f"Error analyzing posture: {str(e)}"})
+            else:
+                results.append({"index": index, "status": 200, **_posture_response(analysis, analysis_time, pose_overlay_image)})
         
-        return JSONResponse(content=response)
+        return JSONResponse(content={
+            "exercise_type": exercise_type,
+            "count": len(results),
+            "failed": sum(1 for result in results if result["status"] != 200),
+            "results": results,
+            "timestamp": time.time()
+        })
         
+    except (HTTPException, InferenceSaturated):
+        raise
+    except ImageDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing posture: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error analyzing posture batch: {str(e)}")
+
+def _posture_response(analysis: PostureAnalysis, analysis_time: float, pose_overlay_image: Optional[str]) -> Dict:
+    """Response body for one analyzed image"""
+    # Generate LLM feedback
+    feedback = coach_advisor.analyze_form_feedback(
+        analysis.exercise_type,
+        analysis.form_score,
+        analysis.corrections
+    )
+    
+    response = {
+        "exercise_type": analysis.exercise_type,
+        "confidence": analysis.confidence,
+        "form_score": analysis.form_score,
+        "is_correct_form": analysis.is_correct_form,
+        "corrections": analysis.corrections,
+        "key_points": analysis.key_points,
+        "feedback": feedback,
+        "analysis_time_ms": round(analysis_time * 1000, 2),
+        "inference_resolution": analysis.inference_side,
+        "model_complexity": analysis.model_complexity,
+        "timestamp": time.time()
+    }
+    if analysis.rep_count is not None:
+        response["reps"] = _rep_payload(analysis)
+    if pose_overlay_image is not None:
+        response["pose_overlay_image"] = pose_overlay_image
+    return response
+
+def _validate_exercise_type(exercise_type: str):
+    if exercise_type not in VALID_EXERCISES:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Invalid exercise type. Must be one of: {VALID_EXERCISES}"
+        )
+
+def _parse_roi(roi: Optional[str]) -> Optional[RegionOfInterest]:
+    if not roi:
+        return None
+    try:
+        return RegionOfInterest.parse(roi)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid roi: {e}. Expected normalized x,y,width,height")
+
+async def _read_raw_image_body(request: Request) -> bytes:
+    """Read a non-multipart image upload straight from the request body"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in RAW_IMAGE_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail="No image provided. Send multipart form data with a 'file' field or a raw application/octet-stream body."
+        )
+    return await request.body()
+
+def _run_posture_analysis(contents: bytes, exercise_type: str, include_pose_overlay: bool, session_id: Optional[str],
+                          roi: Optional[RegionOfInterest] = None):
+    """Decode, analyze and optionally render the overlay (runs on the inference executor)"""
+    # Straight to RGB: no PIL round-trip and no BGR<->RGB conversions before inference
+    image_rgb = decode_image_rgb(contents, max_side=MAX_IMAGE_SIDE)
+    
+    start_time = time.time()
+    analysis = posture_analyzer.analyze_exercise_form(image_rgb, exercise_type, session_id=session_id, is_rgb=True, roi=roi)
+    analysis_time = time.time() - start_time
+    
+    pose_overlay_image = None
+    if include_pose_overlay and analysis.landmarks is not None:
+        # Reuse the landmarks from the analysis above instead of a second inference
+        overlay_image = posture_analyzer.draw_pose_landmarks(image_rgb, analysis.landmarks, analysis.visibilities)
+        cv2.cvtColor(overlay_image, cv2.COLOR_RGB2BGR, dst=overlay_image)  # imencode expects BGR
+        success, buffer = cv2.imencode(".jpg", overlay_image)
+        if success:
+            pose_overlay_image = base64.b64encode(buffer).decode("utf-8")
+    
+    return analysis, analysis_time, pose_overlay_image
+
+def _rep_payload(analysis: PostureAnalysis) -> Dict:
+    """Session rep progress: count, current phase and the rep this frame completed"""
+    return {
+        "count": analysis.rep_count,
+        "phase": analysis.movement_phase,
+        "completed": analysis.completed_rep.to_dict() if analysis.completed_rep is not None else None
+    }
+
+class _LatestFrameSlot:
+    """Single-frame mailbox: a newer frame replaces one that has not been analyzed yet"""
+    
+    def __init__(self):
+        self.frame: Optional[bytes] = None
+        self.sequence = 0
+        self.dropped = 0
+        self.in_flight: Optional[Future] = None  # executor task of the frame being analyzed
+        self._ready = asyncio.Event()
+    
+    def put(self, frame: bytes):
+        if self.frame is not None:
+            self.dropped += 1
+        self.frame = frame
+        self.sequence += 1
+        self._ready.set()
+    
+    async def take(self):
+        await self._ready.wait()
+        self._ready.clear()
+        frame, self.frame = self.frame, None
+        return self.sequence, frame
+
+@app.websocket("/ws/analyze")
+async def analyze_posture_stream(websocket: WebSocket):
+    """
+    Real-time posture analysis over a WebSocket.
+    
+    The client sends binary JPEG/PNG frames and receives one compact JSON result
+    per analyzed frame. Frames that arrive while the previous one is still being
+    analyzed replace each other (latest frame wins). Text messages carrying JSON
+    such as {"exercise_type": "pushup"} change the connection's settings.
+    """
+    params = websocket.query_params
+    settings = {
+        "exercise_type": params.get("exercise_type", "squat"),
+        "include_pose_overlay": params.get("include_pose_overlay", "false").lower() in ("1", "true", "yes")
+    }
+    if settings["exercise_type"] not in VALID_EXERCISES:
+        await websocket.close(code=1008, reason=f"Invalid exercise type. Must be one of: {VALID_EXERCISES}")
+        return
+    
+    await websocket.accept()
+    # One tracking-mode pose graph per connection
+    session_id = f"ws-{uuid.uuid4().hex}"
+    slot = _LatestFrameSlot()
+    processor = asyncio.create_task(_process_stream_frames(websocket, slot, settings, session_id))
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                slot.put(message["bytes"])
+            elif message.get("text"):
+                try:
+                    update = json.loads(message["text"])
+                except ValueError:
+                    await websocket.send_json({"type": "error", "detail": "Control messages must be JSON"})
+                    continue
+                if update.get("exercise_type") in VALID_EXERCISES:
+                    settings["exercise_type"] = update["exercise_type"]
+                if "include_pose_overlay" in update:
+                    settings["include_pose_overlay"] = bool(update["include_pose_overlay"])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        processor.cancel()
+        # Shielded, so the session is still released if this handler itself is cancelled
+        cleanup = asyncio.ensure_future(_end_stream_session(processor, slot, session_id))
+        _session_cleanups.add(cleanup)  # the loop only keeps weak references to tasks
+        cleanup.add_done_callback(_session_cleanups.discard)
+        await asyncio.shield(cleanup)
+
+_session_cleanups = set()
+
+async def _end_stream_session(processor: asyncio.Task, slot: _LatestFrameSlot, session_id: str):
+    """Release a WebSocket's tracking graph once none of its frames is still being analyzed"""
+    await asyncio.gather(processor, return_exceptions=True)
+    if slot.in_flight is not None:
+        # Cancelling the processor cannot stop a frame already running on the executor;
+        # let it finish with the session's graph before the graph is released
+        await asyncio.gather(asyncio.wrap_future(slot.in_flight), return_exceptions=True)
+    await asyncio.to_thread(posture_analyzer.end_session, session_id)
+
+async def _process_stream_frames(websocket: WebSocket, slot: _LatestFrameSlot, settings: Dict, session_id: str):
+    """Analyze the newest pending frame whenever the previous analysis finishes"""
+    try:
+        while True:
+            sequence, frame = await slot.take()
+            exercise_type = settings["exercise_type"]
+            try:
+                slot.in_flight = inference_executor.submit(
+                    _run_posture_analysis, frame, exercise_type, settings["include_pose_overlay"], session_id
+                )
+                analysis, analysis_time, pose_overlay_image = await asyncio.wrap_future(slot.in_flight)
+            except InferenceSaturated as e:
+                await websocket.send_json({"type": "busy", "frame": sequence, "retry_after": e.retry_after})
+                continue
+            except ImageDecodeError as e:
+                await websocket.send_json({"type": "error", "frame": sequence, "detail": str(e)})
+                continue
+            except Exception as e:
+                await websocket.send_json({"type": "error", "frame": sequence, "detail": f"Error analyzing posture: {str(e)}"})
+                continue
+            
+            result = {
+                "type": "analysis",
+                "frame": sequence,
+                "exercise_type": exercise_type,
+                "confidence": analysis.confidence,
+                "form_score": round(analysis.form_score, 3),
+                "is_correct_form": analysis.is_correct_form,
+                "corrections": analysis.corrections,
+                "key_points": {name: [round(float(x), 4), round(float(y), 4)] for name, (x, y) in analysis.key_points.items()},
+                "feedback": coach_advisor.analyze_form_feedback(exercise_type, analysis.form_score, analysis.corrections),
+                "analysis_time_ms": round(analysis_time * 1000, 2),
+                "dropped_frames": slot.dropped
+            }
+            if analysis.rep_count is not None:
+                result["reps"] = _rep_payload(analysis)
+            if pose_overlay_image is not None:
+                result["pose_overlay_image"] = pose_overlay_image
+            await websocket.send_json(result)
+    except (WebSocketDisconnect, RuntimeError):
+        # Client went away mid-send; the receive loop handles cleanup
+        pass
+
+@app.delete("/analyze-posture/sessions/{session_id}")
+async def end_posture_session(session_id: str):
+    """
+    Release the tracking-mode pose graph held by a live session
+    """
+    released = posture_analyzer.end_session(session_id)
+    return {"session_id": session_id, "released": released, "timestamp": time.time()}
 
 @app.post("/workout-plan")
 async def generate_workout_plan(request: Dict):
@@ -250,95 +700,409 @@ async def get_exercise_library():
 async def analyze_video(
     file: UploadFile = File(...),
     exercise_type: str = Form("squat"),
-    frame_interval: int = Form(5)
+    frame_interval: int = Form(5),
+    analyses_per_second: Optional[float] = Form(None),
+    parallel_segments: int = Form(0),
+    keyframe_interval: int = Form(1),
+    stream: bool = Form(False),
+    summary: str = Form("frames")
 ):
     """
-    Analyze exercise posture from uploaded video (analyzes every nth frame)
+    Analyze exercise posture from uploaded video (analyzes every nth frame,
+    or analyses_per_second frames per second of video when given).
+    
+    parallel_segments > 1 splits the video into that many time segments and
+    analyzes them in separate worker processes. keyframe_interval > 1 runs
+    pose inference on every nth sampled frame only and follows the landmarks
+    with optical flow in between. stream=true returns
+    newline-delimited JSON: one "frame" record per analyzed frame as soon as
+    it is scored, then a final "summary" record. summary=reps replaces the
+    frame_analyses list with one aggregate record per detected rep.
     """
+    temp_video_path = None
     try:
         # Validate exercise type
-        valid_exercises = ['squat', 'pushup', 'plank', 'lunge', 'deadlift']
-        if exercise_type not in valid_exercises:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid exercise type. Must be one of: {valid_exercises}"
-            )
-        
-        # Read video file
-        contents = await file.read()
+        _validate_exercise_type(exercise_type)
         
-        # Save temporary video file
-        temp_video_path = f"temp_video_{int(time.time())}.mp4"
-        with open(temp_video_path, "wb") as f:
-            f.write(contents)
-        
-        # Open video with OpenCV
-        cap = cv2.VideoCapture(temp_video_path)
+        if frame_interval < 1 or (analyses_per_second is not None and analyses_per_second <= 0):
+            raise HTTPException(status_code=400, detail="frame_interval and analyses_per_second must be positive")
+        if keyframe_interval < 1:
+            raise HTTPException(status_code=400, detail="keyframe_interval must be positive")
+        if summary not in ("frames", "reps"):
+            raise HTTPException(status_code=400, detail="summary must be 'frames' or 'reps'")
+        if summary == "reps" and stream:
+            raise HTTPException(status_code=400, detail="summary=reps needs the whole video and cannot be streamed")
+        flow = _flow_tracking(keyframe_interval)
+        sampling = FrameSampling(
+            frame_interval=frame_interval,
+            analyses_per_second=analyses_per_second,
+            seek_min_gap=VIDEO_SEEK_MIN_GAP
+        )
         
-        if not cap.isOpened():
-            raise HTTPException(status_code=400, detail="Could not open video file")
+        # Spool the upload to a unique temp file in chunks, then decode and
+        # analyze it on the inference executor
+        temp_video_path = await asyncio.to_thread(spool_upload, file.file, _video_suffix(file.filename))
+        frame_count, fps = await asyncio.to_thread(_probe_video, temp_video_path)
         
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
+        if stream:
+            response = _stream_video_analysis(
+                temp_video_path, exercise_type, sampling, parallel_segments, frame_count, fps, flow
+            )
+            temp_video_path = None  # the streaming body removes it when done
+            return response
         
-        analyses = []
-        frame_number = 0
+        if summary == "reps":
+            video_summary, reps = await inference_executor.run(
+                _run_video_rep_analysis, temp_video_path, exercise_type, sampling, parallel_segments, flow
+            )
+            response = _video_summary(exercise_type, video_summary, frame_count, fps)
+            response["rep_count"] = len(reps)
+            response["reps"] = [rep.to_dict() for rep in reps]
+            return JSONResponse(content=response)
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Analyze every nth frame
-            if frame_number % frame_interval == 0:
-                analysis = posture_analyzer.analyze_exercise_form(frame, exercise_type)
-                analyses.append({
-                    "frame_number": frame_number,
-                    "timestamp": frame_number / fps,
-                    "form_score": analysis.form_score,
-                    "is_correct_form": analysis.is_correct_form,
-                    "corrections": analysis.corrections
-                })
-            
-            frame_number += 1
+        analyses = await inference_executor.run(
+            _run_video_analysis, temp_video_path, exercise_type, sampling, parallel_segments, flow
+        )
         
-        cap.release()
+        response = _video_summary(exercise_type, VideoSummary.from_records(analyses), frame_count, fps)
+        response["frame_analyses"] = analyses
+        return JSONResponse(content=response)
         
-        # Clean up temporary file
-        import os
-        if os.path.exists(temp_video_path):
+    except (HTTPException, InferenceSaturated):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing video: {str(e)}")
+    finally:
+        if temp_video_path is not None:
             os.remove(temp_video_path)
+
+def _video_suffix(filename: Optional[str]) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if extension in (".mp4", ".mov", ".avi", ".mkv", ".webm") else ".mp4"
+
+def _probe_video(video_path: str):
+    """Return (frame_count, fps), or 400 if OpenCV cannot open the file"""
+    try:
+        cap, frame_count, fps = open_video(video_path)
+    except VideoOpenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cap.release()
+    return frame_count, fps
+
+def _flow_tracking(keyframe_interval: int) -> Optional[FlowTracking]:
+    """Optical-flow propagation settings, or None when every sampled frame is inferred"""
+    if keyframe_interval <= 1:
+        return None
+    return FlowTracking(
+        keyframe_interval=keyframe_interval,
+        max_fb_error=VIDEO_FLOW_MAX_ERROR,
+        max_drift=VIDEO_FLOW_MAX_DRIFT
+    )
+
+def _iter_video_records(video_path: str, exercise_type: str, sampling: FrameSampling, parallel_segments: int = 0,
+                        flow: Optional[FlowTracking] = None, score_batch: int = VIDEO_SCORE_BATCH):
+    """Per-frame analysis records in frame order"""
+    for frame, analysis in _iter_video_analyses(video_path, exercise_type, sampling, parallel_segments, flow,
+                                                score_batch):
+        yield frame_record(frame, analysis)
+
+def _iter_video_analyses(video_path: str, exercise_type: str, sampling: FrameSampling, parallel_segments: int = 0,
+                         flow: Optional[FlowTracking] = None, score_batch: int = VIDEO_SCORE_BATCH):
+    """(FramePose, PostureAnalysis) for each sampled frame in frame order, scored score_batch frames at a time"""
+    frames = _iter_video_poses(video_path, sampling, parallel_segments, flow)
+    if pose_smoothing is not None and VIDEO_POSE_SMOOTHING:
+        frames = smooth_frames(frames, pose_smoothing)  # after the cache, which keeps raw landmarks
+    while True:
+        chunk = list(itertools.islice(frames, max(1, score_batch)))
+        if not chunk:
+            return
+        yield from zip(chunk, posture_analyzer.score_poses([frame.pose for frame in chunk], exercise_type))
+
+def _video_landmark_variant() -> str:
+    """Settings that change a video's landmarks, so a cached series is only reused under the same ones"""
+    if VIDEO_POSE_TRACKING:
+        model = "tracking"
+    else:
+        tiers = complexity_controller.tiers if complexity_controller is not None else [0]
+        model = "still-" + "".join(map(str, tiers))  # adaptive tiers vary per frame, so key on the tier set
+    smoothing = "raw" if pose_smoothing is None or not VIDEO_POSE_SMOOTHING else repr(pose_smoothing)
+    return f"{model}:{smoothing}"
+
+def _iter_video_poses(video_path: str, sampling: FrameSampling, parallel_segments: int = 0,
+                      flow: Optional[FlowTracking] = None):
+    """Sampled-frame poses from the landmark cache, or from the thread pipeline or process shards"""
+    cache_key = None
+    if video_landmark_cache is not None:
+        cache_key = video_landmark_cache.key_for_file(video_path, _video_landmark_variant())
+        cached = video_landmark_cache.lookup(cache_key, sampling)
+        if cached is not None:
+            yield from cached
+            return
+    
+    if parallel_segments > 1:
+        frames = video_shard_analyzer.analyze_poses(video_path, sampling, parallel_segments, flow)
+    else:
+        frames = video_pipeline.run_poses(video_path, sampling, flow)
+    
+    # Only complete, fully inferred passes are cached, so only those are held in memory
+    if cache_key is None or flow is not None:
+        yield from frames
+        return
+    analyzed = []
+    for frame in frames:
+        analyzed.append(frame)
+        yield frame
+    
+    # A disconnected client never gets here
+    frame_count, fps = _probe_video(video_path)
+    if frame_count > 0:
+        series = LandmarkSeries.from_frames(analyzed, sampling, fps, frame_count)
+        try:
+            video_landmark_cache.store(cache_key, series)
+        except OSError as e:
+            print(f"Error caching video landmarks: {e}")
+
+def _run_video_analysis(video_path: str, exercise_type: str, sampling: FrameSampling, parallel_segments: int = 0,
+                        flow: Optional[FlowTracking] = None):
+    """Analyze a spooled video into a list of frame records (runs on the inference executor)"""
+    return list(_iter_video_records(video_path, exercise_type, sampling, parallel_segments, flow))
+
+def _run_video_rep_analysis(video_path: str, exercise_type: str, sampling: FrameSampling, parallel_segments: int = 0,
+                            flow: Optional[FlowTracking] = None):
+    """Analyze a spooled video into its overall summary and per-rep aggregates (runs on the inference executor)"""
+    summary = VideoSummary()
+    timeline = RepTimeline(exercise_type, posture_analyzer.form_rules)
+    for frame, analysis in _iter_video_analyses(video_path, exercise_type, sampling, parallel_segments, flow):
+        summary.add(frame_record(frame, analysis))
+        timeline.add(frame.timestamp, analysis)
+    return summary, timeline.segment()
+
+def _video_summary(exercise_type: str, summary: VideoSummary, frame_count: int, fps: float) -> Dict:
+    """Overall performance fields of an /analyze-video response"""
+    if summary.frames_analyzed:
+        # Generate overall feedback
+        overall_feedback = coach_advisor.analyze_form_feedback(
+            exercise_type, 
+            summary.average_form_score, 
+            []  # No specific corrections for overall analysis
+        )
+    else:
+        overall_feedback = "No frames could be analyzed from the video."
+    
+    return {
+        "exercise_type": exercise_type,
+        "total_frames_analyzed": summary.frames_analyzed,
+        "total_frames": frame_count,
+        "average_form_score": summary.average_form_score,
+        "correct_form_percentage": summary.correct_form_percentage,
+        "overall_feedback": overall_feedback,
+        "video_duration": frame_count / fps if fps > 0 else 0,
+        "timestamp": time.time()
+    }
+
+_STREAM_END = object()
+
+def _stream_video_analysis(video_path: str, exercise_type: str, sampling: FrameSampling,
+                           parallel_segments: int, frame_count: int, fps: float,
+                           flow: Optional[FlowTracking] = None) -> StreamingResponse:
+    """NDJSON response fed by an analysis task on the inference executor"""
+    records: "queue.Queue" = queue.Queue(maxsize=VIDEO_STREAM_BUFFER)
+    cancelled = threading.Event()
+    
+    def put(item) -> bool:
+        # Blocks while the client is slow to read, which throttles analysis
+        while not cancelled.is_set():
+            try:
+                records.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def take():
+        # Polls so a disconnected client never leaves a thread parked on an empty queue
+        while not cancelled.is_set():
+            try:
+                return records.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _STREAM_END
+    
+    def produce():
+        try:
+            # Frame by frame, so each record goes out as soon as its frame is analyzed
+            for record in _iter_video_records(video_path, exercise_type, sampling, parallel_segments, flow,
+                                              score_batch=1):
+                if not put(record):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_STREAM_END)
+    
+    # Admission happens here, so a saturated server still answers 503 before streaming
+    # starts; until it succeeds the caller still owns the spooled file
+    producer = inference_executor.submit(produce)
+    
+    async def body():
+        summary = VideoSummary()
+        try:
+            while True:
+                item = await asyncio.to_thread(take)
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, Exception):
+                    yield json.dumps({"type": "error", "detail": f"Error analyzing video: {str(item)}"}) + "\n"
+                    break
+                summary.add(item)
+                yield json.dumps({"type": "frame", **item}) + "\n"
+            yield json.dumps({"type": "summary", **_video_summary(exercise_type, summary, frame_count, fps)}) + "\n"
+        finally:
+            # Client finished or disconnected: stop the producer and drop the spooled file
+            # once it lets go. Nothing is awaited here, since a cancelled body would be
+            # cancelled again at the await and never reach the cleanup
+            cancelled.set()
+            producer.add_done_callback(lambda _: _discard_spooled_video(video_path))
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+def _discard_spooled_video(video_path: str):
+    try:
+        os.remove(video_path)
+    except OSError as e:
+        print(f"Error removing spooled video {video_path}: {e}")
+
+def _run_video_job(job, on_record) -> Dict:
+    """Job runner: analyze a queued video and build the same payload as /analyze-video"""
+    options = job.options
+    sampling = FrameSampling(
+        frame_interval=options["frame_interval"],
+        analyses_per_second=options["analyses_per_second"],
+        seek_min_gap=VIDEO_SEEK_MIN_GAP
+    )
+    summary = VideoSummary()
+    analyses = []
+    flow = _flow_tracking(options.get("keyframe_interval", 1))
+    for record in _iter_video_records(job.video_path, job.exercise_type, sampling, options["parallel_segments"], flow):
+        analyses.append(record)
+        summary.add(record)
+        on_record(record)
+    
+    result = _video_summary(job.exercise_type, summary, job.total_frames, options["fps"])
+    result["frame_analyses"] = analyses
+    return result
+
+# Asynchronous video jobs: uploads are persisted and analyzed by a local worker
+# pool, tracked in a SQLite store so queued work survives restarts; finished jobs
+# and their results are deleted VIDEO_JOB_RESULT_TTL_SECONDS after they end
+VIDEO_JOB_DIR = os.getenv("VIDEO_JOB_DIR", os.path.join(tempfile.gettempdir(), "fitness_video_jobs"))
+os.makedirs(VIDEO_JOB_DIR, exist_ok=True)
+video_job_queue = VideoJobQueue(
+    VideoJobStore(os.path.join(VIDEO_JOB_DIR, "jobs.sqlite3")),
+    _run_video_job,
+    storage_dir=VIDEO_JOB_DIR,
+    workers=int(os.getenv("VIDEO_JOB_WORKERS", "1")),
+    max_queue_depth=int(os.getenv("VIDEO_JOB_MAX_QUEUE", "16")),
+    result_ttl=float(os.getenv("VIDEO_JOB_RESULT_TTL_SECONDS", "86400"))
+)
+
+def _job_status(job) -> Dict:
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "exercise_type": job.exercise_type,
+        "progress": round(job.progress, 1),
+        "frames_analyzed": job.frames_analyzed,
+        "total_frames": job.total_frames,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+        "status_url": f"/video-jobs/{job.job_id}",
+        "result_url": f"/video-jobs/{job.job_id}/result"
+    }
+
+def _get_job_or_404(job_id: str):
+    job = video_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Video job not found")
+    return job
+
+@app.post("/video-jobs", status_code=202)
+async def submit_video_job(
+    file: UploadFile = File(...),
+    exercise_type: str = Form("squat"),
+    frame_interval: int = Form(5),
+    analyses_per_second: Optional[float] = Form(None),
+    parallel_segments: int = Form(0),
+    keyframe_interval: int = Form(1)
+):
+    """
+    Queue a video for background analysis and return its job id
+    """
+    temp_video_path = None
+    try:
+        _validate_exercise_type(exercise_type)
+        if frame_interval < 1 or (analyses_per_second is not None and analyses_per_second <= 0):
+            raise HTTPException(status_code=400, detail="frame_interval and analyses_per_second must be positive")
+        if keyframe_interval < 1:
+            raise HTTPException(status_code=400, detail="keyframe_interval must be positive")
         
-        # Calculate overall performance
-        if analyses:
-            avg_form_score = sum(a["form_score"] for a in analyses) / len(analyses)
-            correct_form_percentage = sum(1 for a in analyses if a["is_correct_form"]) / len(analyses) * 100
-            
-            # Generate overall feedback
-            overall_feedback = coach_advisor.analyze_form_feedback(
-                exercise_type, 
-                avg_form_score, 
-                []  # No specific corrections for overall analysis
-            )
-        else:
-            avg_form_score = 0
-            correct_form_percentage = 0
-            overall_feedback = "No frames could be analyzed from the video."
-        
-        return JSONResponse(content={
-            "exercise_type": exercise_type,
-            "total_frames_analyzed": len(analyses),
-            "total_frames": frame_count,
-            "average_form_score": avg_form_score,
-            "correct_form_percentage": correct_form_percentage,
-            "frame_analyses": analyses,
-            "overall_feedback": overall_feedback,
-            "video_duration": frame_count / fps if fps > 0 else 0,
-            "timestamp": time.time()
-        })
-        
+        temp_video_path = await asyncio.to_thread(spool_upload, file.file, _video_suffix(file.filename))
+        frame_count, fps = await asyncio.to_thread(_probe_video, temp_video_path)
+        job = await asyncio.to_thread(
+            video_job_queue.submit,
+            temp_video_path,
+            exercise_type,
+            {
+                "frame_interval": frame_interval,
+                "analyses_per_second": analyses_per_second,
+                "parallel_segments": parallel_segments,
+                "keyframe_interval": keyframe_interval,
+                "fps": fps
+            },
+            frame_count
+        )
+        temp_video_path = None  # owned by the job queue now
+        return JSONResponse(status_code=202, content=_job_status(job))
+    
+    except (HTTPException, JobQueueFull):
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing video: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error submitting video job: {str(e)}")
+    finally:
+        if temp_video_path is not None:
+            os.remove(temp_video_path)
+
+@app.get("/video-jobs/{job_id}")
+async def get_video_job(job_id: str):
+    """
+    Poll a video job's status and progress
+    """
+    job = await asyncio.to_thread(_get_job_or_404, job_id)
+    return _job_status(job)
+
+@app.get("/video-jobs/{job_id}/result")
+async def get_video_job_result(job_id: str):
+    """
+    Fetch the analysis of a finished video job
+    """
+    job = await asyncio.to_thread(_get_job_or_404, job_id)
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Video job is {job.status}; no result available")
+    result = await asyncio.to_thread(video_job_queue.get_result, job_id)
+    return JSONResponse(content=result)
+
+@app.delete("/video-jobs/{job_id}")
+async def cancel_video_job(job_id: str):
+    """
+    Cancel a queued or running video job
+    """
+    job = await asyncio.to_thread(_get_job_or_404, job_id)
+    if job.status in FINISHED_STATES:
+        raise HTTPException(status_code=409, detail=f"Video job is already {job.status}")
+    cancelled = await asyncio.to_thread(video_job_queue.cancel, job_id)
+    return {"job_id": job_id, "cancel_requested": cancelled, "timestamp": time.time()}
 
 if __name__ == "__main__":
     import uvicorn
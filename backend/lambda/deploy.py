@@ -1,11 +1,32 @@
 # AI Fitness Trainer Lambda Deployment Script
 
+import ast
 import boto3
 import zipfile
 import os
 import json
 from pathlib import Path
 
+def lambda_source_files(entry="lambda/lambda_handler.py"):
+    """The handler plus every services module it imports, directly or through other services"""
+    source_files = [entry]
+    pending = [entry]
+    while pending:
+        tree = ast.parse(Path(pending.pop()).read_text())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module:
+                modules = [node.module]
+            elif isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            else:
+                continue
+            for module in modules:
+                file_path = module.replace(".", "/") + ".py"
+                if module.startswith("services.") and file_path not in source_files:
+                    source_files.append(file_path)
+                    pending.append(file_path)
+    return source_files
+
 def create_deployment_package():
     """Create deployment package for Lambda function"""
     
@@ -14,11 +35,7 @@ def create_deployment_package():
     deployment_dir.mkdir(exist_ok=True)
     
     # Copy source code
-    source_files = [
-        "services/posture_analyzer.py",
-        "services/llm_advisor.py",
-        "lambda/lambda_handler.py"
-    ]
+    source_files = lambda_source_files()
     
     for file_path in source_files:
         if os.path.exists(file_path):
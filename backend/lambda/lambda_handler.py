@@ -1,9 +1,5 @@
 import json
 import base64
-import cv2
-import numpy as np
-from io import BytesIO
-from PIL import Image
 import time
 import sys
 import os
@@ -13,12 +9,15 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import our services
 from services.posture_analyzer import PostureAnalyzer
+from services.image_io import decode_image_rgb, ImageDecodeError
 from services.llm_advisor import LLMFitnessAdvisor
 
 # Initialize services (these will be loaded once per Lambda container)
 posture_analyzer = PostureAnalyzer()
 llm_advisor = LLMFitnessAdvisor()
 
+MAX_IMAGE_SIDE = int(os.getenv('MAX_IMAGE_SIDE', '1280'))
+
 def lambda_handler(event, context):
     """
     AWS Lambda handler for AI Fitness Trainer API
@@ -88,34 +87,45 @@ def lambda_handler(event, context):
 def handle_posture_analysis(event, headers):
     """Handle posture analysis requests"""
     try:
-        # Parse the request body
-        body = json.loads(event.get('body', '{}'))
-        
-        # Get image data (base64 encoded)
-        image_data = body.get('image')
-        exercise_type = body.get('exercise_type', 'squat')
-        
-        if not image_data:
+        request_headers = event.get('headers') or {}
+        content_type = request_headers.get('content-type') or request_headers.get('Content-Type') or ''
+        media_type = content_type.split(';')[0].strip().lower()
+        if media_type == 'application/octet-stream' or media_type.startswith('image/'):
+            # Raw binary upload: API Gateway base64-encodes the body for the
+            # template's BinaryMediaTypes and passes anything else through as text
+            body = event.get('body') or ''
+            image_bytes = base64.b64decode(body) if event.get('isBase64Encoded') else body.encode('utf-8')
+            exercise_type = (event.get('queryStringParameters') or {}).get('exercise_type', 'squat')
+        else:
+            # Parse the request body
+            body = json.loads(event.get('body', '{}'))
+            
+            # Get image data (base64 encoded)
+            image_data = body.get('image')
+            exercise_type = body.get('exercise_type', 'squat')
+            
+            if not image_data:
+                return {
+                    'statusCode': 400,
+                    'headers': headers,
+                    'body': json.dumps({'error': 'No image data provided'})
+                }
+            
+            image_bytes = base64.b64decode(image_data)
+        
+        # Decode straight to RGB for MediaPipe
+        try:
+            image_rgb = decode_image_rgb(image_bytes, max_side=MAX_IMAGE_SIDE)
+        except ImageDecodeError as e:
             return {
                 'statusCode': 400,
                 'headers': headers,
-                'body': json.dumps({'error': 'No image data provided'})
+                'body': json.dumps({'error': str(e)})
             }
         
-        # Decode base64 image
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(BytesIO(image_bytes))
-        image_array = np.array(image)
-        
-        # Convert PIL image to OpenCV format
-        if len(image_array.shape) == 3:
-            image_cv = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
-        else:
-            image_cv = image_array
-        
         # Analyze posture
         start_time = time.time()
-        analysis = posture_analyzer.analyze_exercise_form(image_cv, exercise_type)
+        analysis = posture_analyzer.analyze_exercise_form(image_rgb, exercise_type, is_rgb=True)
         analysis_time = time.time() - start_time
         
         # Generate LLM feedback
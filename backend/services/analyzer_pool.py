@@ -0,0 +1,172 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from services.complexity_controller import ComplexityController
+from services.form_rules import FormRuleEngine
+from services.landmark_cache import LandmarkCache
+from services.landmark_smoothing import LandmarkSmoothing
+from services.motion_gate import MotionGate
+from services.posture_analyzer import PostureAnalyzer, PostureAnalysis, PoseLandmarks, create_tracking_pose
+from services.pose_sessions import PoseSessionPool
+from services.roi import RegionOfInterest
+
+
+class AnalyzerPoolExhausted(Exception):
+    """Raised when no analyzer worker frees up within the checkout timeout"""
+
+
+def default_pool_size(workers_per_core: float = 1.0) -> int:
+    """Number of analyzer workers for this machine"""
+    return max(1, int(round((os.cpu_count() or 1) * workers_per_core)))
+
+
+class AnalyzerPool:
+    """Pool of PostureAnalyzer workers, each owning its own MediaPipe graph"""
+
+    def __init__(self,
+                 size: Optional[int] = None,
+                 workers_per_core: float = 1.0,
+                 max_sessions: int = 32,
+                 session_idle_timeout: float = 60.0,
+                 analyzer_factory: Optional[Callable[..., PostureAnalyzer]] = None,
+                 landmark_cache: Optional[LandmarkCache] = None,
+                 motion_gate: Optional[MotionGate] = None,
+                 session_roi_margin: Optional[float] = None,
+                 cascade_sides: Sequence[int] = (),
+                 complexity_controller: Optional[ComplexityController] = None,
+                 smoothing: Optional[LandmarkSmoothing] = None,
+                 start: bool = True):
+        self.size = size if size and size > 0 else default_pool_size(workers_per_core)
+        self._analyzer_factory = analyzer_factory or PostureAnalyzer
+
+        # Tracking graphs are keyed by session, not by worker, so every worker
+        # shares one session pool
+        self.sessions = PoseSessionPool(
+            create_tracking_pose,
+            max_sessions=max_sessions,
+            idle_timeout=session_idle_timeout
+        )
+
+        # Still-image results keyed by pixel content; tracking sessions bypass it
+        # because their output depends on the frames that came before
+        self.landmark_cache = landmark_cache
+
+        # Picks the still-image model tier per request; workers load a tier's
+        # graph the first time it is picked
+        self.complexity_controller = complexity_controller
+        self._worker_options = dict(
+            session_pool=self.sessions,
+            motion_gate=motion_gate,
+            session_roi_margin=session_roi_margin,
+            cascade_sides=cascade_sides,
+            model_complexities=complexity_controller.tiers if complexity_controller is not None else (0,),
+            smoothing=smoothing
+        )
+
+        # Rule scoring is stateless, so every worker shares one engine
+        self.form_rules = FormRuleEngine()
+
+        # LIFO so the most recently used (cache-warm) worker is handed out first
+        self._idle: "queue.LifoQueue[PostureAnalyzer]" = queue.LifoQueue()
+        self._workers: List[PostureAnalyzer] = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        if start:
+            self.start()
+
+    def start(self):
+        """Build the workers' MediaPipe graphs; a no-op once they exist"""
+        with self._start_lock:
+            if self._workers:
+                return
+            for _ in range(self.size):
+                analyzer = self._analyzer_factory(form_rules=self.form_rules, **self._worker_options)
+                self._workers.append(analyzer)
+                self._idle.put(analyzer)
+
+    @contextmanager
+    def worker(self, timeout: Optional[float] = None) -> Iterator[PostureAnalyzer]:
+        """Check out an analyzer for exclusive use by the calling thread"""
+        try:
+            analyzer = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise AnalyzerPoolExhausted(f"No analyzer worker available within {timeout}s")
+        with self._stats_lock:
+            self.checkouts += 1
+        try:
+            yield analyzer
+        finally:
+            self._idle.put(analyzer)
+
+    def analyze_exercise_form(self, image: np.ndarray, exercise_type: str,
+                              session_id: Optional[str] = None, is_rgb: bool = False,
+                              use_cache: bool = True, roi: Optional[RegionOfInterest] = None) -> PostureAnalysis:
+        pose = self.detect_pose(image, session_id, is_rgb=is_rgb, use_cache=use_cache, roi=roi)
+        analysis = self.score_pose(pose, exercise_type)
+        if session_id is not None:
+            # Rep state lives on the shared session, so any worker can update it
+            self._workers[0].count_reps(session_id, analysis)
+        return analysis
+
+    def detect_pose(self, image: np.ndarray, session_id: Optional[str] = None, is_rgb: bool = False,
+                    use_cache: bool = True, roi: Optional[RegionOfInterest] = None) -> Optional[PoseLandmarks]:
+        complexity = None
+        if session_id is None and self.complexity_controller is not None:
+            complexity = self.complexity_controller.choose()
+
+        cache_key = None
+        if use_cache and session_id is None and self.landmark_cache is not None:
+            cache_key = self.landmark_cache.key_for(image, is_rgb)
+            if roi is not None:
+                cache_key += f":{roi}"  # a crop can find a different person than the full frame
+            if complexity is not None:
+                cache_key += f":m{complexity}"  # a lite-model result must not answer a heavy-tier request
+            hit, pose = self.landmark_cache.get(cache_key)
+            if hit:
+                return pose  # no worker checkout, no inference
+
+        with self.worker() as analyzer:
+            started = time.perf_counter()
+            pose = analyzer.detect_pose(image, session_id, is_rgb=is_rgb, roi=roi, model_complexity=complexity)
+            if complexity is not None:
+                self.complexity_controller.record(complexity, time.perf_counter() - started)
+        if cache_key is not None:
+            self.landmark_cache.put(cache_key, pose)
+        return pose
+
+    def extract_pose_landmarks(self, image: np.ndarray, session_id: Optional[str] = None) -> Optional[np.ndarray]:
+        pose = self.detect_pose(image, session_id)
+        return pose.landmarks if pose is not None else None
+
+    def score_pose(self, pose: Optional[PoseLandmarks], exercise_type: str) -> PostureAnalysis:
+        # Scoring touches no MediaPipe graph state, so no checkout is needed
+        return self._workers[0].score_pose(pose, exercise_type)
+
+    def score_poses(self, poses: Sequence[Optional[PoseLandmarks]], exercise_type: str) -> List[PostureAnalysis]:
+        return self._workers[0].score_poses(poses, exercise_type)
+
+    def draw_pose_landmarks(self, image: np.ndarray, landmarks: np.ndarray,
+                            visibilities: Optional[np.ndarray] = None) -> np.ndarray:
+        return self._workers[0].draw_pose_landmarks(image, landmarks, visibilities)
+
+    def end_session(self, session_id: str) -> bool:
+        return self.sessions.release(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.size,
+            'idle_workers': self._idle.qsize(),
+            'checkouts': self.checkouts,
+            'sessions': self.sessions.stats(),
+            'landmark_cache': self.landmark_cache.stats() if self.landmark_cache is not None else None,
+            'model_complexity': (
+                self.complexity_controller.stats() if self.complexity_controller is not None else None
+            )
+        }
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+# Rough relative cost of the lite / full / heavy pose landmark models, used to
+# predict a tier's latency before it has been measured
+RELATIVE_COST = {0: 1.0, 1: 1.8, 2: 4.5}
+
+# Fewer samples than this and a tier's percentiles are not trusted
+MIN_SAMPLES = 5
+
+
+class ComplexityController:
+    """Pick a Pose model complexity per request from recent p95 latency and queue depth
+
+    Steps down a tier as soon as the current one misses the SLO or requests are
+    queuing, and steps up only when nothing is queued and the next tier is
+    expected to stay within upgrade_headroom of the SLO. Tier changes are at
+    least `cooldown` seconds apart so one slow request cannot cause flapping.
+    A tier's samples are dropped when it is stepped down from and once older
+    than `max_sample_age` seconds, so latencies measured under a past load
+    peak cannot block upgrades forever.
+    """
+
+    def __init__(self,
+                 tiers: Sequence[int] = (0, 1, 2),
+                 slo_ms: float = 150.0,
+                 queue_depth: Optional[Callable[[], int]] = None,
+                 max_queue: int = 0,
+                 window: int = 100,
+                 upgrade_headroom: float = 0.6,
+                 cooldown: float = 2.0,
+                 max_sample_age: float = 60.0):
+        self.tiers = sorted(set(tiers)) or [0]
+        self.slo = slo_ms / 1000
+        self._queue_depth = queue_depth or (lambda: 0)
+        self.max_queue = max_queue
+        self.upgrade_headroom = upgrade_headroom
+        self.cooldown = cooldown
+        self.max_sample_age = max_sample_age
+        self._latencies = {tier: deque(maxlen=window) for tier in self.tiers}
+        self._index = 0  # start cheap; idle time earns the upgrades
+        self._last_change = 0.0
+        self._lock = threading.Lock()
+        self.requests = {tier: 0 for tier in self.tiers}
+        self.upgrades = 0
+        self.downgrades = 0
+
+    @property
+    def tier(self) -> int:
+        return self.tiers[self._index]
+
+    def choose(self) -> int:
+        """Model complexity for the next request"""
+        depth = self._queue_depth()
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_change >= self.cooldown:
+                self._adjust(depth, now)
+            tier = self.tiers[self._index]
+            self.requests[tier] += 1
+            return tier
+
+    def record(self, tier: int, latency_s: float):
+        now = time.monotonic()
+        with self._lock:
+            if tier in self._latencies:
+                self._latencies[tier].append((now, latency_s))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'tier': self.tiers[self._index],
+                'tiers': self.tiers,
+                'slo_ms': self.slo * 1000,
+                'p95_ms': {
+                    tier: round(p95 * 1000, 2) if p95 is not None else None
+                    for tier, p95 in ((tier, self._percentile(tier, 95)) for tier in self.tiers)
+                },
+                'requests': dict(self.requests),
+                'upgrades': self.upgrades,
+                'downgrades': self.downgrades
+            }
+
+    def _adjust(self, queue_depth: int, now: float):
+        """Move at most one tier (caller holds the lock)"""
+        current = self.tiers[self._index]
+        p95 = self._percentile(current, 95)
+        if self._index > 0 and (queue_depth > self.max_queue or (p95 is not None and p95 > self.slo)):
+            self._index -= 1
+            self._last_change = now
+            self.downgrades += 1
+            self._latencies[current].clear()  # measured under the load we are backing off from
+        elif self._index < len(self.tiers) - 1 and queue_depth == 0 and p95 is not None and p95 <= self.slo:
+            expected = p95 * self._cost_ratio(current, self.tiers[self._index + 1])
+            if expected <= self.slo * self.upgrade_headroom:
+                self._index += 1
+                self._last_change = now
+                self.upgrades += 1
+
+    def _cost_ratio(self, tier: int, target: int) -> float:
+        """Measured median latency ratio between two tiers, else the nominal model cost ratio"""
+        base, other = self._percentile(tier, 50), self._percentile(target, 50)
+        if base and other:
+            return max(1.0, other / base)  # samples from different load periods can invert the order
+        return RELATIVE_COST.get(target, 1.0) / RELATIVE_COST.get(tier, 1.0)
+
+    def _percentile(self, tier: int, q: float) -> Optional[float]:
+        samples = self._latencies[tier]
+        expired = time.monotonic() - self.max_sample_age
+        while samples and samples[0][0] < expired:
+            samples.popleft()
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return float(np.percentile([latency for _, latency in samples], q))
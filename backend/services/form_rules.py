@@ -0,0 +1,239 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from services.joint_angles import JointAngleKernel, NUM_POSE_LANDMARKS, as_landmark_frames
+
+# Per-frame measurements the rules can refer to. Angles are in degrees; offsets
+# and ratios are in normalized image units. NaN means "not measurable in this
+# view" and drops the rule from that frame's score instead of failing it.
+FEATURE_NAMES: Tuple[str, ...] = (
+    'knee_angle',        # mean of both knees (hip, knee, ankle)
+    'front_knee_angle',  # the more bent knee
+    'rear_knee_angle',   # the straighter knee
+    'elbow_angle',
+    'shoulder_angle',    # elbow, shoulder, hip
+    'ankle_angle',       # knee, ankle, foot index
+    'trunk_lean',        # trunk from vertical, 0 = upright
+    'neck_angle',        # nose, mid-shoulder, mid-hip; 180 = head in line with the spine
+    'hip_offset',        # hips below (+) or above (-) the shoulder-ankle line; horizontal bodies only
+    'knee_width_ratio',  # knee spread over ankle spread; below 1 means knees caving in
+    'wrist_offset',      # horizontal wrist distance from the ankles over body length
+    'hip_angle',         # mean of both hips (shoulder, hip, knee)
+)
+
+# Exercise criteria as data. Inside `band` a rule scores 1; outside it falls
+# linearly to 0 over `tolerance`. Weights are normalized per exercise. A rule
+# scoring below the engine's pass_score adds its too_low / too_high message.
+FORM_RULES: Dict[str, List[Dict]] = {
+    'squat': [
+        {'feature': 'knee_angle', 'band': (85, 95), 'tolerance': 50, 'weight': 0.4,
+         'too_low': "Don't go too deep - maintain control",
+         'too_high': "Go deeper - aim for 90-degree knee angle"},
+        {'feature': 'trunk_lean', 'band': (0, 35), 'tolerance': 30, 'weight': 0.3,
+         'too_high': "Keep your back straight and chest up"},
+        {'feature': 'knee_width_ratio', 'band': (0.9, 3.0), 'tolerance': 0.3, 'weight': 0.2,
+         'too_low': "Ensure knees track over toes"},
+        {'feature': 'ankle_angle', 'band': (60, 110), 'tolerance': 30, 'weight': 0.1,
+         'too_high': "Keep your heels on the ground"},
+    ],
+    'pushup': [
+        {'feature': 'hip_offset', 'band': (-0.05, 0.05), 'tolerance': 0.1, 'weight': 0.4,
+         'too_low': "Lower your hips in line with your body",
+         'too_high': "Keep your body in a straight line"},
+        {'feature': 'elbow_angle', 'band': (80, 100), 'tolerance': 40, 'weight': 0.3,
+         'too_high': "Lower chest closer to the ground"},
+        {'feature': 'neck_angle', 'band': (150, 180), 'tolerance': 30, 'weight': 0.2,
+         'too_low': "Keep your head in line with your spine"},
+        {'feature': 'shoulder_angle', 'band': (30, 90), 'tolerance': 30, 'weight': 0.1,
+         'too_high': "Keep your elbows at about 45 degrees from your body"},
+    ],
+    'plank': [
+        {'feature': 'hip_offset', 'band': (-0.04, 0.04), 'tolerance': 0.08, 'weight': 0.5,
+         'too_low': "Don't pike your hips up",
+         'too_high': "Don't let your hips sag"},
+        {'feature': 'neck_angle', 'band': (150, 180), 'tolerance': 30, 'weight': 0.2,
+         'too_low': "Keep your head in line with your spine"},
+        {'feature': 'shoulder_angle', 'band': (75, 105), 'tolerance': 30, 'weight': 0.3,
+         'too_low': "Stack your shoulders over your elbows",
+         'too_high': "Stack your shoulders over your elbows"},
+    ],
+    'lunge': [
+        {'feature': 'front_knee_angle', 'band': (85, 95), 'tolerance': 40, 'weight': 0.4,
+         'too_low': "Keep front knee over ankle",
+         'too_high': "Bend your front knee to 90 degrees"},
+        {'feature': 'rear_knee_angle', 'band': (80, 110), 'tolerance': 40, 'weight': 0.3,
+         'too_high': "Lower back knee toward ground"},
+        {'feature': 'trunk_lean', 'band': (0, 15), 'tolerance': 25, 'weight': 0.3,
+         'too_high': "Maintain upright torso"},
+    ],
+    'deadlift': [
+        {'feature': 'neck_angle', 'band': (150, 180), 'tolerance': 30, 'weight': 0.3,
+         'too_low': "Keep your back straight throughout the movement"},
+        {'feature': 'knee_angle', 'band': (110, 170), 'tolerance': 40, 'weight': 0.3,
+         'too_low': "Hinge at hips, not knees"},
+        {'feature': 'trunk_lean', 'band': (0, 80), 'tolerance': 20, 'weight': 0.2,
+         'too_high': "Keep your chest up as you hinge"},
+        {'feature': 'wrist_offset', 'band': (0, 0.12), 'tolerance': 0.15, 'weight': 0.2,
+         'too_high': "Keep the bar close to your body"},
+    ],
+}
+
+# Exercise score for exercises without rules
+DEFAULT_EXERCISE_SCORE = 0.3
+
+
+@dataclass
+class CompiledRules:
+    """One exercise's rules as parallel threshold arrays"""
+    feature_index: np.ndarray  # (R,) column in the feature matrix
+    low: np.ndarray            # (R,) band lower bounds
+    high: np.ndarray           # (R,) band upper bounds
+    tolerance: np.ndarray      # (R,)
+    weight: np.ndarray         # (R,) normalized to sum to 1
+    too_low: List[Optional[str]]
+    too_high: List[Optional[str]]
+
+
+@dataclass
+class RuleEvaluation:
+    """Rule results for N frames of one exercise"""
+    exercise_score: np.ndarray  # (N,) weighted rule score, 0-1
+    rule_scores: np.ndarray     # (N, R), NaN where the feature was not measurable
+    below: np.ndarray           # (N, R) value under the band
+    failing: np.ndarray         # (N, R) rule scored under pass_score
+    rules: Optional[CompiledRules]
+
+    def corrections(self, frame: int = 0) -> List[str]:
+        """Correction messages for one frame, in rule order and without duplicates"""
+        if self.rules is None:
+            return []
+        corrections = []
+        for rule in np.flatnonzero(self.failing[frame]):
+            message = self.rules.too_low[rule] if self.below[frame, rule] else self.rules.too_high[rule]
+            if message and message not in corrections:
+                corrections.append(message)
+        return corrections
+
+
+def compile_rules(rules: Sequence[Dict]) -> CompiledRules:
+    """Turn one exercise's rule dicts into threshold arrays; raises ValueError on unknown features"""
+    unknown = [rule['feature'] for rule in rules if rule['feature'] not in FEATURE_NAMES]
+    if unknown:
+        raise ValueError(f"Unknown form features: {', '.join(unknown)}")
+    weight = np.array([rule.get('weight', 1.0) for rule in rules], dtype=np.float64)
+    return CompiledRules(
+        feature_index=np.array([FEATURE_NAMES.index(rule['feature']) for rule in rules], dtype=np.intp),
+        low=np.array([rule['band'][0] for rule in rules], dtype=np.float64),
+        high=np.array([rule['band'][1] for rule in rules], dtype=np.float64),
+        tolerance=np.array([rule['tolerance'] for rule in rules], dtype=np.float64),
+        weight=weight / weight.sum() if weight.sum() > 0 else weight,
+        too_low=[rule.get('too_low') for rule in rules],
+        too_high=[rule.get('too_high') for rule in rules]
+    )
+
+
+def _pair_mean(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Mean of a left/right pair, or whichever side is measurable"""
+    mean = (left + right) * 0.5
+    return np.where(np.isnan(mean), np.fmax(left, right), mean)
+
+
+class FormRuleEngine:
+    """Scores exercise form from landmark features against compiled, data-driven rules"""
+
+    def __init__(self, rules: Optional[Dict[str, List[Dict]]] = None, pass_score: float = 0.5,
+                 angle_kernel: Optional[JointAngleKernel] = None):
+        self.rules = {exercise: compile_rules(spec) for exercise, spec in (rules or FORM_RULES).items()}
+        self.pass_score = pass_score
+        self.angle_kernel = angle_kernel or JointAngleKernel()
+        self._angle_column = {name: i for i, name in enumerate(self.angle_kernel.names)}
+
+    @property
+    def exercises(self) -> List[str]:
+        return list(self.rules)
+
+    def features(self, landmarks: np.ndarray) -> np.ndarray:
+        """(N, len(FEATURE_NAMES)) feature matrix for one frame or a batch of frames"""
+        frames = as_landmark_frames(landmarks)
+        features = np.full((frames.shape[0], len(FEATURE_NAMES)), np.nan)
+        if frames.shape[1] < NUM_POSE_LANDMARKS:
+            return features
+
+        angles = self.angle_kernel.compute(frames)
+        angle = lambda name: angles[:, self._angle_column[name]]
+        left_knee, right_knee = angle('left_knee_angle'), angle('right_knee_angle')
+        features[:, 0] = _pair_mean(left_knee, right_knee)
+        features[:, 1] = np.fmin(left_knee, right_knee)
+        features[:, 2] = np.fmax(left_knee, right_knee)
+        features[:, 3] = _pair_mean(angle('left_elbow_angle'), angle('right_elbow_angle'))
+        features[:, 4] = _pair_mean(angle('left_shoulder_angle'), angle('right_shoulder_angle'))
+        features[:, 5] = _pair_mean(angle('left_ankle_angle'), angle('right_ankle_angle'))
+        features[:, 6] = angle('trunk_angle')
+        features[:, 7] = angle('neck_angle')
+        features[:, 11] = _pair_mean(angle('left_hip_angle'), angle('right_hip_angle'))
+
+        xy = frames[:, :, :2]
+        shoulders = (xy[:, 11] + xy[:, 12]) * 0.5
+        hips = (xy[:, 23] + xy[:, 24]) * 0.5
+        ankles = (xy[:, 27] + xy[:, 28]) * 0.5
+        body = ankles - shoulders
+        length = np.hypot(body[:, 0], body[:, 1])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Only meaningful when the body lies within 60 degrees of horizontal
+            horizontal = np.abs(body[:, 0]) >= 0.5 * length
+            line_y = shoulders[:, 1] + (hips[:, 0] - shoulders[:, 0]) * body[:, 1] / body[:, 0]
+            features[:, 8] = np.where(horizontal & (length > 0), (hips[:, 1] - line_y) / length, np.nan)
+
+            ankle_spread = np.abs(xy[:, 27, 0] - xy[:, 28, 0])
+            knee_spread = np.abs(xy[:, 25, 0] - xy[:, 26, 0])
+            # Side-on views collapse the spread; the ratio means nothing there
+            features[:, 9] = np.where(ankle_spread >= 0.05, knee_spread / ankle_spread, np.nan)
+
+            wrists = (xy[:, 15, 0] + xy[:, 16, 0]) * 0.5
+            features[:, 10] = np.where(length > 0, np.abs(wrists - ankles[:, 0]) / length, np.nan)
+        return features
+
+    def evaluate(self, exercise_type: str, features: np.ndarray) -> RuleEvaluation:
+        """Evaluate every rule of one exercise over an (N, F) feature matrix at once"""
+        features = np.atleast_2d(features)
+        rules = self.rules.get(exercise_type)
+        if rules is None:
+            empty = np.zeros((features.shape[0], 0))
+            return RuleEvaluation(
+                exercise_score=np.full(features.shape[0], DEFAULT_EXERCISE_SCORE),
+                rule_scores=empty, below=empty.astype(bool), failing=empty.astype(bool), rules=None
+            )
+
+        values = features[:, rules.feature_index]  # (N, R)
+        deviation = np.maximum(np.maximum(rules.low - values, values - rules.high), 0.0)
+        scores = np.clip(1.0 - deviation / rules.tolerance, 0.0, 1.0)  # NaN stays NaN
+
+        measured = ~np.isnan(scores)
+        weights = rules.weight * measured
+        total = weights.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            exercise_score = np.where(total > 0, np.nansum(scores * rules.weight, axis=1) / total, 0.0)
+        return RuleEvaluation(
+            exercise_score=exercise_score,
+            rule_scores=scores,
+            below=values < rules.low,
+            failing=measured & (scores < self.pass_score),
+            rules=rules
+        )
+
+    def score(self, exercise_type: str, landmarks: np.ndarray) -> RuleEvaluation:
+        """Features and rule evaluation for one frame or a batch of frames"""
+        return self.evaluate(exercise_type, self.features(landmarks))
+
+
+def key_joint_visibility(landmarks: np.ndarray) -> np.ndarray:
+    """(N,) fraction of shoulders, hips, knees and ankles placed well inside the frame"""
+    frames = as_landmark_frames(landmarks)
+    if frames.shape[1] < NUM_POSE_LANDMARKS:
+        return np.zeros(frames.shape[0])
+    key = frames[:, [11, 12, 23, 24, 25, 26, 27, 28]]
+    inside = ((key[..., 0] >= 0.1) & (key[..., 0] <= 0.9)
+              & (key[..., 1] >= 0.1) & (key[..., 1] <= 0.9)
+              & (np.abs(key[..., 2]) < 0.5))
+    return inside.mean(axis=1)
@@ -0,0 +1,104 @@
+import struct
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class ImageDecodeError(ValueError):
+    """Raised when uploaded bytes are not a decodable image"""
+
+
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 scale, skipping most IDCT work
+_REDUCED_JPEG_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# JPEG start-of-frame markers that carry the image dimensions
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def is_jpeg(data: bytes) -> bool:
+    return data[:3] == b'\xff\xd8\xff'
+
+
+def is_png(data: bytes) -> bool:
+    return data[:8] == b'\x89PNG\r\n\x1a\n'
+
+
+def peek_image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a JPEG or PNG header without decoding pixels"""
+    if is_png(data) and len(data) >= 24:
+        width, height = struct.unpack('>II', data[16:24])
+        return width, height
+
+    if is_jpeg(data):
+        offset = 2
+        length = len(data)
+        while offset + 4 <= length:
+            if data[offset] != 0xFF:
+                return None
+            marker = data[offset + 1]
+            if marker == 0xFF:  # fill byte
+                offset += 1
+                continue
+            segment_length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+            if marker in _JPEG_SOF_MARKERS and offset + 9 <= length:
+                height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + segment_length
+    return None
+
+
+def decode_image_rgb(data: bytes, max_side: Optional[int] = None) -> np.ndarray:
+    """Decode JPEG/PNG bytes straight into an RGB uint8 array
+
+    When max_side is set, oversized JPEGs are decoded at reduced resolution
+    and anything still larger is downscaled so the long side fits max_side.
+    """
+    if not data:
+        raise ImageDecodeError("Empty image upload")
+
+    buffer = np.frombuffer(data, dtype=np.uint8)  # view over the request bytes, no copy
+    flag = cv2.IMREAD_COLOR
+    if max_side and is_jpeg(data):
+        size = peek_image_size(data)
+        if size is not None:
+            long_side = max(size)
+            for factor, reduced_flag in _REDUCED_JPEG_FLAGS:
+                if long_side // factor >= max_side:
+                    flag = reduced_flag
+                    break
+
+    image = cv2.imdecode(buffer, flag)
+    if image is None:
+        raise ImageDecodeError("Could not decode image; expected JPEG or PNG data")
+
+    if max_side:
+        height, width = image.shape[:2]
+        scale = max_side / max(height, width)
+        if scale < 1.0:
+            image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+
+    # imdecode yields BGR; MediaPipe wants RGB, so convert once, in place
+    cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    return image
+
+
+def split_image_batch(data: bytes) -> List[bytes]:
+    """Split a batch body of repeated (4-byte big-endian length, image bytes) records"""
+    images = []
+    offset = 0
+    while offset < len(data):
+        if offset + 4 > len(data):
+            raise ImageDecodeError("Malformed image batch: truncated length prefix")
+        (length,) = struct.unpack_from('>I', data, offset)
+        offset += 4
+        if offset + length > len(data):
+            raise ImageDecodeError(f"Malformed image batch: image {len(images)} runs past the end of the body")
+        images.append(data[offset:offset + length])
+        offset += length
+    return images
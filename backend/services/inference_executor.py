@@ -0,0 +1,149 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence
+
+
+class InferenceSaturated(Exception):
+    """Raised when the executor already holds its maximum in-flight plus queued work"""
+
+    def __init__(self, retry_after: int, in_flight: int, queued: int):
+        super().__init__(f"Inference capacity exhausted ({in_flight} running, {queued} queued)")
+        self.retry_after = retry_after
+        self.in_flight = in_flight
+        self.queued = queued
+
+
+class InferenceExecutor:
+    """Bounded thread pool that keeps CPU-bound inference off the asyncio event loop"""
+
+    def __init__(self, max_in_flight: int = 4, max_queue: int = 8):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.batch_slots = max(1, self.max_in_flight - 1)  # workers one batch may hold
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._admitted = 0   # running + queued
+        self._running = 0
+        self._avg_task_s = 0.1  # EMA of task duration, seeds Retry-After estimates
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Schedule fn on the inference pool, or raise InferenceSaturated without queueing"""
+        with self._lock:
+            if self._admitted >= self.max_in_flight + self.max_queue:
+                self.rejected += 1
+                raise InferenceSaturated(self._retry_after_locked(), self._running, self._admitted - self._running)
+            self._admitted += 1
+        try:
+            return self._executor.submit(self._run, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._admitted -= 1
+            raise
+
+    def submit_batch(self, fn: Callable[..., Any], batch: Sequence[tuple]) -> List[Future]:
+        """Admit a whole batch or raise InferenceSaturated; returns one future per args tuple
+
+        The batch takes as many admission slots as are free, at most one less
+        than max_in_flight, and each slot works through the batch's items in
+        order, so a worker stays free for single requests.
+        """
+        if not batch:
+            return []
+        with self._lock:
+            slots = min(len(batch), self.batch_slots, self.max_in_flight + self.max_queue - self._admitted)
+            if slots <= 0:
+                self.rejected += 1
+                raise InferenceSaturated(self._retry_after_locked(), self._running, self._admitted - self._running)
+            self._admitted += slots
+        futures = [Future() for _ in batch]
+        pending = deque(zip(futures, batch))
+        for submitted in range(slots):
+            try:
+                self._executor.submit(self._drain, fn, pending)
+            except Exception:
+                # Slots already running still drain every item
+                with self._lock:
+                    self._admitted -= slots - submitted
+                if submitted == 0:
+                    raise
+                break
+        return futures
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await fn's result from a coroutine without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._admitted - self._running
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return self._running
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'in_flight': self._running,
+                'queued': self._admitted - self._running,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_task_ms': round(self._avg_task_s * 1000, 2)
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, fn: Callable[..., Any], args, kwargs) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return self._timed(fn, args, kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._admitted -= 1
+
+    def _drain(self, fn: Callable[..., Any], pending: deque):
+        """One batch slot: run the batch's remaining items until none are left"""
+        with self._lock:
+            self._running += 1
+        try:
+            while True:
+                try:
+                    future, args = pending.popleft()
+                except IndexError:
+                    return
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(self._timed(fn, args, {}))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._admitted -= 1
+
+    def _timed(self, fn: Callable[..., Any], args, kwargs) -> Any:
+        start_time = time.time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.time() - start_time
+            with self._lock:
+                self.completed += 1
+                self._avg_task_s = 0.9 * self._avg_task_s + 0.1 * elapsed
+
+    def _retry_after_locked(self) -> int:
+        """Seconds until a slot is likely to free up, rounded up for the Retry-After header"""
+        waves = (self._admitted + 1) / self.max_in_flight
+        return max(1, math.ceil(self._avg_task_s * waves))
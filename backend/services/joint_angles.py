@@ -0,0 +1,91 @@
+import numpy as np
+from typing import Dict, Tuple, Optional
+
+# MediaPipe Pose has 33 landmarks; the kernel appends a few virtual points
+# (midpoints and a vertical reference) so trunk angles fit the same triplet table.
+NUM_POSE_LANDMARKS = 33
+MID_SHOULDER = 33
+MID_HIP = 34
+ABOVE_MID_HIP = 35
+
+# Declarative joint table: angle name -> (point A, vertex B, point C).
+# The angle is measured at B between the rays B->A and B->C.
+JOINT_TRIPLETS: Dict[str, Tuple[int, int, int]] = {
+    'left_knee_angle': (23, 25, 27),       # hip, knee, ankle
+    'right_knee_angle': (24, 26, 28),
+    'left_elbow_angle': (11, 13, 15),      # shoulder, elbow, wrist
+    'right_elbow_angle': (12, 14, 16),
+    'left_hip_angle': (11, 23, 25),        # shoulder, hip, knee
+    'right_hip_angle': (12, 24, 26),
+    'left_shoulder_angle': (13, 11, 23),   # elbow, shoulder, hip
+    'right_shoulder_angle': (14, 12, 24),
+    'left_ankle_angle': (25, 27, 31),      # knee, ankle, foot index
+    'right_ankle_angle': (26, 28, 32),
+    'trunk_angle': (MID_SHOULDER, MID_HIP, ABOVE_MID_HIP),  # lean from vertical, 0 = upright
+    'neck_angle': (0, MID_SHOULDER, MID_HIP),               # nose, mid-shoulder, mid-hip; 180 = head in line
+}
+
+
+def as_landmark_frames(landmarks: np.ndarray) -> np.ndarray:
+    """Normalize flat, single-frame or batched landmarks to an (N, 33, 3) array"""
+    arr = np.asarray(landmarks, dtype=np.float64)
+    if arr.ndim == 1:
+        arr = arr.reshape(1, -1, 3)
+    elif arr.ndim == 2:
+        # (33, 3|4) is one frame, (N, 99) is a batch of flat frames
+        if arr.shape[1] in (3, 4) and arr.shape[0] == NUM_POSE_LANDMARKS:
+            arr = arr[np.newaxis]
+        else:
+            arr = arr.reshape(arr.shape[0], -1, 3)
+    if arr.shape[-1] == 4:
+        arr = arr[..., :3]  # drop visibility column
+    return arr
+
+
+class JointAngleKernel:
+    """Vectorized joint-angle engine over (N frames x 33 x 3) landmark arrays"""
+
+    def __init__(self, triplets: Optional[Dict[str, Tuple[int, int, int]]] = None):
+        triplets = triplets if triplets is not None else JOINT_TRIPLETS
+        self.names: Tuple[str, ...] = tuple(triplets.keys())
+        index = np.array(list(triplets.values()), dtype=np.intp).reshape(-1, 3)
+        self._a = index[:, 0]
+        self._b = index[:, 1]
+        self._c = index[:, 2]
+
+    def compute(self, landmarks: np.ndarray) -> np.ndarray:
+        """Return an (N, J) array of angles in degrees, NaN where a joint is degenerate"""
+        frames = as_landmark_frames(landmarks)
+        if frames.shape[1] < NUM_POSE_LANDMARKS:
+            return np.full((frames.shape[0], len(self.names)), np.nan)
+
+        points = self._with_virtual_points(frames[:, :NUM_POSE_LANDMARKS])
+        v1 = points[:, self._a] - points[:, self._b]
+        v2 = points[:, self._c] - points[:, self._b]
+
+        dot = np.einsum('njk,njk->nj', v1, v2)
+        norms = np.sqrt(np.einsum('njk,njk->nj', v1, v1) * np.einsum('njk,njk->nj', v2, v2))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cos_angle = np.clip(dot / norms, -1.0, 1.0)
+        angles = np.degrees(np.arccos(cos_angle))
+        angles[norms == 0] = np.nan
+        return angles
+
+    def compute_dict(self, landmarks: np.ndarray) -> Dict[str, float]:
+        """Compute angles for a single frame as a name -> degrees mapping"""
+        frames = as_landmark_frames(landmarks)
+        if frames.shape[1] < NUM_POSE_LANDMARKS:
+            return {}
+        return dict(zip(self.names, self.compute(frames[:1])[0].tolist()))
+
+    @staticmethod
+    def _with_virtual_points(points: np.ndarray) -> np.ndarray:
+        """Append mid-shoulder, mid-hip and a point one unit above mid-hip"""
+        mid_shoulder = (points[:, 11] + points[:, 12]) * 0.5
+        mid_hip = (points[:, 23] + points[:, 24]) * 0.5
+        above_mid_hip = mid_hip.copy()
+        above_mid_hip[:, 1] -= 1.0  # image y grows downwards
+        return np.concatenate(
+            [points, mid_shoulder[:, np.newaxis], mid_hip[:, np.newaxis], above_mid_hip[:, np.newaxis]],
+            axis=1
+        )
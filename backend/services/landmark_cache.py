@@ -0,0 +1,91 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from services.posture_analyzer import PoseLandmarks
+
+# Rough per-entry bookkeeping cost (key, tuple, OrderedDict node) on top of the arrays
+_ENTRY_OVERHEAD_BYTES = 256
+
+
+class LandmarkCache:
+    """LRU cache from decoded-image content hash to pose landmarks, bounded by bytes and TTL"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 300.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (pose or None when no person was found, entry size, expiry time)
+        self._entries: "OrderedDict[str, Tuple[Optional[PoseLandmarks], int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(image: np.ndarray, is_rgb: bool = False) -> str:
+        """Content address of a decoded frame; shape and channel order are part of the key"""
+        digest = hashlib.blake2b(np.ascontiguousarray(image).data, digest_size=16).hexdigest()
+        return f"{digest}:{'x'.join(map(str, image.shape))}:{'rgb' if is_rgb else 'bgr'}"
+
+    def get(self, key: str) -> Tuple[bool, Optional[PoseLandmarks]]:
+        """Return (hit, pose); a hit may carry None when the frame had no detectable pose"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key: str, pose: Optional[PoseLandmarks]):
+        if pose is not None:
+            # Cached arrays are shared between requests, so freeze them
+            pose.landmarks.flags.writeable = False
+            pose.visibilities.flags.writeable = False
+            size = pose.landmarks.nbytes + pose.visibilities.nbytes + _ENTRY_OVERHEAD_BYTES
+        else:
+            size = _ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (pose, size, time.time() + self.ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_s': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+    def _drop(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
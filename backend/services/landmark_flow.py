@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+from services.posture_analyzer import PoseLandmarks
+
+
+@dataclass
+class FlowTracking:
+    """Keyframe schedule and error bounds for optical-flow landmark propagation"""
+    keyframe_interval: int = 5       # run pose inference on at least every nth sampled frame
+    max_fb_error: float = 2.0        # px; forward-backward error above which a landmark counts as lost
+    max_lost_fraction: float = 0.25  # re-detect when more of the tracked landmarks than this are lost
+    max_drift: float = 8.0           # px; re-detect once accumulated median error since the keyframe exceeds this
+    min_visibility: float = 0.5      # only landmarks at least this visible are followed
+    win_size: int = 21
+    max_level: int = 3
+
+
+class LandmarkFlowTracker:
+    """Follow one video's landmarks between keyframes with pyramidal Lucas-Kanade flow
+
+    Frames must be fed in order. Keyframes (and any frame where flow fails
+    its error bounds) call the frame's detect(); frames in between reuse the
+    previous landmarks moved by the flow of the visible ones.
+    """
+
+    def __init__(self, config: FlowTracking):
+        self.config = config
+        self._lk_params = dict(
+            winSize=(config.win_size, config.win_size),
+            maxLevel=config.max_level,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01)
+        )
+        self._gray: Optional[np.ndarray] = None
+        self._pose: Optional[PoseLandmarks] = None
+        self._since_keyframe = 0
+        self._drift = 0.0
+        self.keyframes = 0
+        self.propagated = 0
+        self.redetections = 0  # keyframes forced early by the error bounds
+
+    def track(self, image: np.ndarray, detect: Callable[[], Optional[PoseLandmarks]]) -> Optional[PoseLandmarks]:
+        """Landmarks for the next frame (BGR), from detect() or propagated"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self._pose is not None and self._since_keyframe < self.config.keyframe_interval - 1:
+            pose = self._propagate(gray)
+            if pose is not None:
+                self._pose, self._gray = pose, gray
+                self._since_keyframe += 1
+                self.propagated += 1
+                return pose
+            self.redetections += 1
+
+        pose = detect()
+        self._pose, self._gray = pose, gray
+        self._since_keyframe = 0
+        self._drift = 0.0
+        self.keyframes += 1
+        return pose
+
+    def _propagate(self, gray: np.ndarray) -> Optional[PoseLandmarks]:
+        if gray.shape != self._gray.shape:
+            return None
+        height, width = gray.shape
+        scale = np.array([width, height], dtype=np.float32)
+        points = self._pose.points
+        tracked = np.flatnonzero(self._pose.visibilities >= self.config.min_visibility)
+        if len(tracked) < 4:
+            return None
+
+        previous = (points[tracked, :2] * scale).astype(np.float32).reshape(-1, 1, 2)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, previous, None, **self._lk_params)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._gray, moved, None, **self._lk_params)
+        fb_error = np.linalg.norm((back - previous).reshape(-1, 2), axis=1)
+        ok = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error <= self.config.max_fb_error)
+        if not ok.any() or 1.0 - ok.mean() > self.config.max_lost_fraction:
+            return None
+        self._drift += float(np.median(fb_error[ok]))
+        if self._drift > self.config.max_drift:
+            return None
+
+        new_points = points.copy()
+        followed = tracked[ok]
+        new_xy = moved.reshape(-1, 2)[ok] / scale
+        # Landmarks that were not followed move with the median motion of the body
+        shift = np.median(new_xy - points[followed, :2], axis=0)
+        new_points[:, :2] += shift
+        new_points[followed, :2] = new_xy
+
+        visibilities = self._pose.visibilities.copy()
+        visibilities[tracked[~ok]] = 0.0  # lost this frame; left out of later propagation
+        return PoseLandmarks(landmarks=new_points.reshape(-1), visibilities=visibilities)
@@ -0,0 +1,93 @@
+import math
+from dataclasses import dataclass, replace
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+
+NUM_LANDMARKS = 33
+
+
+@dataclass
+class LandmarkSmoothing:
+    """Filter choice and cutoffs for landmark smoothing"""
+    mode: str = "one_euro"   # "one_euro" or "ema"
+    min_cutoff: float = 1.0  # Hz; One Euro cutoff at rest, lower removes more jitter
+    beta: float = 5.0        # One Euro cutoff gain per unit/s of speed, higher lags less on fast moves
+    d_cutoff: float = 1.0    # Hz; cutoff for the speed estimate itself
+    alpha: float = 0.5       # EMA weight of the newest frame
+    max_gap: float = 1.0     # s; a longer pause between frames restarts the filter
+
+
+class LandmarkSmoother:
+    """O(1)-per-frame One Euro or EMA filter over one stream's 33 x (x, y, z, visibility) landmarks
+
+    All state lives in preallocated arrays, so updates do not allocate
+    beyond the returned PoseLandmarks.
+    """
+
+    def __init__(self, config: LandmarkSmoothing):
+        self.config = config
+        self._value = np.zeros((NUM_LANDMARKS, 4))
+        self._speed = np.zeros((NUM_LANDMARKS, 4))
+        self._raw = np.zeros((NUM_LANDMARKS, 4))
+        self._delta = np.zeros((NUM_LANDMARKS, 4))
+        self._work = np.zeros((NUM_LANDMARKS, 4))
+        self._last_time: Optional[float] = None
+
+    def reset(self):
+        self._last_time = None
+
+    def update(self, pose: Optional[Any], timestamp: float) -> Optional[Any]:
+        """Smoothed landmarks for the next frame; timestamp is in seconds"""
+        if pose is None or len(pose.visibilities) != NUM_LANDMARKS:
+            self.reset()  # the person was lost; do not drag old positions into the next detection
+            return pose
+
+        raw = self._raw
+        raw[:, :3] = pose.points
+        raw[:, 3] = pose.visibilities
+        dt = None if self._last_time is None else timestamp - self._last_time
+        if dt is None or dt <= 0 or dt > self.config.max_gap:
+            self._value[:] = raw
+            self._speed[:] = 0.0
+        elif self.config.mode == "ema":
+            np.subtract(raw, self._value, out=self._delta)
+            self._delta *= self.config.alpha
+            self._value += self._delta
+        else:
+            self._one_euro(raw, dt)
+        self._last_time = timestamp
+
+        return replace(pose, landmarks=self._value[:, :3].reshape(-1).copy(), visibilities=self._value[:, 3].copy())
+
+    def _one_euro(self, raw: np.ndarray, dt: float):
+        config, delta, work = self.config, self._delta, self._work
+        np.subtract(raw, self._value, out=delta)
+        # Speed estimate, low-passed at d_cutoff
+        np.divide(delta, dt, out=work)
+        work -= self._speed
+        work *= _alpha(config.d_cutoff, dt)
+        self._speed += work
+        # Per-coordinate cutoff grows with speed; alpha = 1 - 1 / (1 + 2 pi cutoff dt)
+        np.abs(self._speed, out=work)
+        work *= config.beta
+        work += config.min_cutoff
+        work *= 2 * math.pi * dt
+        work += 1.0
+        np.reciprocal(work, out=work)
+        np.subtract(1.0, work, out=work)
+        delta *= work
+        self._value += delta
+
+
+def _alpha(cutoff: float, dt: float) -> float:
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+def smooth_frames(frames: Iterable, config: LandmarkSmoothing) -> Iterator:
+    """Smooth a video's FramePose stream in frame order, keyed on each frame's timestamp"""
+    smoother = LandmarkSmoother(config)
+    for frame in frames:
+        pose = smoother.update(frame.pose, frame.timestamp)
+        yield frame if pose is frame.pose else replace(frame, pose=pose)
@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class MotionGate:
+    """Cheap frame-difference test deciding whether a live frame needs fresh pose inference"""
+    threshold: float = 2.0                   # mean absolute grey-level change (0-255) that counts as motion
+    max_reuse: int = 15                      # force inference after this many consecutive reused frames
+    thumbnail_size: Tuple[int, int] = (32, 24)
+
+    def thumbnail(self, rgb_image: np.ndarray) -> np.ndarray:
+        """Tiny greyscale copy of the frame; area averaging also suppresses sensor noise"""
+        small = cv2.resize(rgb_image, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+
+    def is_still(self, keyframe: Optional[np.ndarray], thumbnail: np.ndarray) -> bool:
+        """True when the frame differs from the last inferred one by less than the threshold"""
+        if keyframe is None or keyframe.shape != thumbnail.shape:
+            return False
+        return float(cv2.absdiff(keyframe, thumbnail).mean()) < self.threshold
@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class PoseSession:
+    """Tracking-mode Pose graph owned by one live client session"""
+    session_id: str
+    pose: Any
+    created_at: float
+    last_used: float
+    frames_processed: int = 0
+    # Motion gating: thumbnail of the last inferred frame and the landmarks it produced
+    keyframe_thumbnail: Any = None
+    last_pose: Any = None
+    frames_since_keyframe: int = 0
+    frames_gated: int = 0
+    # Crop (RegionOfInterest) around the person, reused while they stay inside it
+    roi: Any = None
+    # LandmarkSmoother carrying the filter state between this session's frames
+    smoother: Any = None
+    # RepCounter for the exercise the session is currently doing
+    rep_counter: Any = None
+    closed: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class PoseSessionPool:
+    """Session-keyed pool of tracking-mode Pose instances with LRU eviction and idle timeout"""
+
+    def __init__(self,
+                 pose_factory: Callable[[], Any],
+                 max_sessions: int = 32,
+                 idle_timeout: float = 60.0):
+        self._pose_factory = pose_factory
+        self.max_sessions = max(1, max_sessions)
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, PoseSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.sessions_created = 0
+        self.sessions_evicted = 0
+        self.frames_inferred = 0
+        self.frames_gated = 0
+
+    def acquire(self, session_id: str) -> PoseSession:
+        """Return the session's Pose graph, creating it (and evicting stale ones) if needed"""
+        with self._lock:
+            evicted = self._pop_idle(time.time())
+            session = self._touch(session_id)
+        self._close_all(evicted)
+        if session is not None:
+            return session
+
+        # Graph construction takes a while, so it runs outside the pool lock
+        pose = self._pose_factory()
+        now = time.time()
+        with self._lock:
+            evicted = self._pop_idle(now)
+            session = self._touch(session_id)  # another frame of the session may have won the race
+            if session is None:
+                session = PoseSession(session_id=session_id, pose=pose, created_at=now, last_used=now)
+                self._sessions[session_id] = session
+                self.sessions_created += 1
+                pose = None
+                while len(self._sessions) > self.max_sessions:
+                    _, oldest = self._sessions.popitem(last=False)
+                    evicted.append(oldest)
+
+        if pose is not None:
+            pose.close()
+        self._close_all(evicted)
+        return session
+
+    def get(self, session_id: str) -> Optional[PoseSession]:
+        """Return an existing session and mark it used, or None; never creates one"""
+        with self._lock:
+            return self._touch(session_id)
+
+    def release(self, session_id: str) -> bool:
+        """Close and forget a session, e.g. when the client stops streaming"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._close_all([session], count_evictions=False)
+        return True
+
+    def evict_idle(self) -> int:
+        """Close every session that has been idle longer than idle_timeout"""
+        with self._lock:
+            evicted = self._pop_idle(time.time())
+        self._close_all(evicted)
+        return len(evicted)
+
+    def close(self):
+        """Close every pooled session"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        self._close_all(sessions, count_evictions=False)
+
+    def record_frame(self, gated: bool):
+        """Count a session frame as inferred or as served from the previous landmarks"""
+        with self._lock:
+            if gated:
+                self.frames_gated += 1
+            else:
+                self.frames_inferred += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            frames = self.frames_inferred + self.frames_gated
+            return {
+                'active_sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'idle_timeout_s': self.idle_timeout,
+                'sessions_created': self.sessions_created,
+                'sessions_evicted': self.sessions_evicted,
+                'frames_inferred': self.frames_inferred,
+                'frames_gated': self.frames_gated,
+                'gate_skip_rate': round(self.frames_gated / frames, 4) if frames else 0.0
+            }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def _touch(self, session_id: str) -> Optional[PoseSession]:
+        """Mark an existing session used (caller holds the lock)"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.time()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def _pop_idle(self, now: float) -> List[PoseSession]:
+        """Remove idle sessions from the front of the LRU order (caller holds the lock)"""
+        evicted = []
+        if self.idle_timeout <= 0:
+            return evicted
+        while self._sessions:
+            session_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_used < self.idle_timeout:
+                break
+            del self._sessions[session_id]
+            evicted.append(oldest)
+        return evicted
+
+    def _close_all(self, sessions: List[PoseSession], count_evictions: bool = True):
+        """Close Pose graphs outside the pool lock, waiting for in-flight frames to finish"""
+        for session in sessions:
+            with session.lock:
+                session.closed = True
+                try:
+                    session.pose.close()
+                except Exception as e:
+                    print(f"Error closing pose session {session.session_id}: {e}")
+            if count_evictions:
+                self.sessions_evicted += 1
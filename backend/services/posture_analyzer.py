@@ -1,10 +1,17 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-from typing import Dict, List, Tuple, Optional
-import json
+from typing import Dict, List, Tuple, Optional, Sequence
+import time
 from dataclasses import dataclass
-from mediapipe.framework.formats import landmark_pb2
+
+from services.form_rules import FormRuleEngine, key_joint_visibility
+from services.joint_angles import JointAngleKernel
+from services.landmark_smoothing import LandmarkSmoother, LandmarkSmoothing
+from services.motion_gate import MotionGate
+from services.pose_sessions import PoseSessionPool
+from services.rep_counter import REP_PATTERNS, RepCounter, RepEvent
+from services.roi import RegionOfInterest, crop_to_roi, remap_points
 
 @dataclass
 class PostureAnalysis:
@@ -14,194 +21,290 @@ class PostureAnalysis:
     corrections: List[str]
     key_points: Dict[str, Tuple[float, float]]
     is_correct_form: bool
+    # Raw inference output, so overlays and follow-up scoring reuse one inference
+    landmarks: Optional[np.ndarray] = None
+    visibilities: Optional[np.ndarray] = None
+    inference_side: Optional[int] = None  # long side (px) of the image the pose was found at
+    model_complexity: Optional[int] = None  # Pose model tier that produced the landmarks
+    features: Optional[np.ndarray] = None   # form-rules feature row the score was computed from
+    # Live sessions only: reps so far, current movement phase and the rep this frame completed
+    rep_count: Optional[int] = None
+    movement_phase: Optional[str] = None
+    completed_rep: Optional[RepEvent] = None
+
+@dataclass
+class PoseLandmarks:
+    """Landmarks and their visibilities from a single inference"""
+    landmarks: np.ndarray     # flat (x, y, z) per landmark, normalized image coordinates
+    visibilities: np.ndarray  # one visibility score per landmark
+    input_side: int = 0       # long side (px) of the image inference ran on; 0 if unknown
+    model_complexity: Optional[int] = None  # Pose model tier used; None for tracking graphs
+    
+    @property
+    def points(self) -> np.ndarray:
+        return self.landmarks.reshape(-1, 3)
+
+# Skeleton edges between MediaPipe Pose landmark indices (same as mp.solutions.pose.POSE_CONNECTIONS)
+POSE_CONNECTIONS = np.array([
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32)
+], dtype=np.intp)
+
+# Shoulders, hips, knees and ankles: the joints every exercise score depends on
+KEY_JOINTS = np.array([11, 12, 23, 24, 25, 26, 27, 28], dtype=np.intp)
+
+def create_tracking_pose():
+    """Create a tracking-mode Pose graph for a live session"""
+    return mp.solutions.pose.Pose(
+        static_image_mode=False,  # Reuse the previous frame's ROI instead of re-detecting
+        model_complexity=0,
+        enable_segmentation=False,
+        min_detection_confidence=0.3,
+        min_tracking_confidence=0.3
+    )
+
+def to_pose_landmarks(results) -> Optional[PoseLandmarks]:
+    """Convert a MediaPipe Pose result into PoseLandmarks, or None if nobody was found"""
+    if not results.pose_landmarks:
+        return None
+    values = np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in results.pose_landmarks.landmark],
+        dtype=np.float64
+    )
+    return PoseLandmarks(
+        landmarks=values[:, :3].reshape(-1),
+        visibilities=values[:, 3].copy()
+    )
+
+# Body parts and their MediaPipe indices, for visibility feedback
+BODY_PARTS: Dict[str, List[int]] = {
+    'head': [0],  # nose
+    'shoulders': [11, 12],  # left and right shoulders
+    'arms': [13, 14, 15, 16],  # elbows and wrists
+    'hips': [23, 24],  # left and right hips
+    'legs': [25, 26, 27, 28],  # knees and ankles
+    'feet': [29, 30, 31, 32]  # heels and foot index
+}
+
+
+def body_parts_visible(points: np.ndarray, visibilities: np.ndarray) -> np.ndarray:
+    """(N,) whether every body part has at least half its landmarks in frame, for (N, 33, 3) points"""
+    inside = ((points[..., 0] >= 0.0) & (points[..., 0] <= 1.0)
+              & (points[..., 1] >= 0.0) & (points[..., 1] <= 1.0)
+              & (np.abs(points[..., 2]) < 1.0) & (visibilities >= 0.3))
+    return np.all([inside[:, indices].mean(axis=1) >= 0.5 for indices in BODY_PARTS.values()], axis=0)
+
 
 class PostureAnalyzer:
     """Computer vision system for real-time posture analysis using MediaPipe and PyTorch"""
     
-    def __init__(self):
+    def __init__(self,
+                 max_sessions: int = 32,
+                 session_idle_timeout: float = 60.0,
+                 session_pool: Optional[PoseSessionPool] = None,
+                 motion_gate: Optional[MotionGate] = None,
+                 session_roi_margin: Optional[float] = None,
+                 cascade_sides: Sequence[int] = (),
+                 cascade_min_visibility: float = 0.5,
+                 model_complexities: Sequence[int] = (0,),
+                 form_rules: Optional[FormRuleEngine] = None,
+                 smoothing: Optional[LandmarkSmoothing] = None):
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
+        # Still-image graphs per model tier (0 lite, 1 full, 2 heavy). Only the lightest
+        # is built up front; a ComplexityController's first escalation to a higher tier
+        # loads that one, so idle workers do not hold heavy graphs they never use
+        self.model_complexities = sorted(set(model_complexities)) or [0]
+        self.default_complexity = self.model_complexities[0]
+        self.static_poses = {self.default_complexity: self._create_static_pose(self.default_complexity)}
+        self.pose = self.static_poses[self.default_complexity]
+        self.angle_kernel = JointAngleKernel()
+        
+        # Live webcam sessions get their own tracking-mode graph so consecutive
+        # frames skip person detection; bounded by LRU size and idle timeout.
+        # An AnalyzerPool passes one shared pool so a session keeps its graph
+        # whichever worker picks up the frame.
+        self.sessions = session_pool if session_pool is not None else PoseSessionPool(
+            create_tracking_pose,
+            max_sessions=max_sessions,
+            idle_timeout=session_idle_timeout
+        )
+        # When set, near-identical session frames reuse the previous landmarks
+        self.motion_gate = motion_gate
+        # When set, session frames are cropped to the previous landmarks' bounding
+        # box padded by this fraction of its size
+        self.session_roi_margin = session_roi_margin
+        # Still images are first tried at these long sides (px), smallest first, and
+        # only escalate when no pose is found or the key joints are poorly visible
+        self.cascade_sides = sorted(side for side in cascade_sides if side > 0)
+        self.cascade_min_visibility = cascade_min_visibility
+        # When set, session landmarks pass through a per-session One Euro / EMA
+        # filter before scoring, so scores and corrections stop flickering
+        self.smoothing = smoothing
+        
+        # Exercise criteria live in services.form_rules as data, compiled once into
+        # threshold arrays that score a frame or a whole series in one call
+        self.form_rules = form_rules or FormRuleEngine(angle_kernel=self.angle_kernel)
+    
+    def _infer(self, graph, rgb_image: np.ndarray, roi: Optional[RegionOfInterest],
+               cascade_sides: Sequence[int] = ()) -> Optional[PoseLandmarks]:
+        """Run a Pose graph on the ROI crop, with landmarks mapped back to full-frame coordinates"""
+        crop, box = crop_to_roi(rgb_image, roi)
+        pose = self._infer_cascade(graph, crop, cascade_sides)
+        if pose is None or box is None:
+            return pose
+        height, width = rgb_image.shape[:2]
+        points = remap_points(pose.points, box, width, height)
+        return PoseLandmarks(landmarks=points.reshape(-1), visibilities=pose.visibilities, input_side=pose.input_side)
+    
+    def _infer_cascade(self, graph, rgb_image: np.ndarray, cascade_sides: Sequence[int]) -> Optional[PoseLandmarks]:
+        """Try downscaled copies first; keep the best-visible pose if no level is good enough"""
+        height, width = rgb_image.shape[:2]
+        long_side = max(height, width)
+        best, best_visibility = None, -1.0
+        for side in [side for side in cascade_sides if side < long_side] + [long_side]:
+            image = rgb_image
+            if side < long_side:
+                scale = side / long_side
+                image = cv2.resize(rgb_image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                                   interpolation=cv2.INTER_AREA)
+            pose = to_pose_landmarks(graph.process(image))
+            if pose is None:
+                continue
+            pose.input_side = side
+            key_visibility = float(pose.visibilities[KEY_JOINTS].mean())
+            if key_visibility > best_visibility:
+                best, best_visibility = pose, key_visibility
+            if key_visibility >= self.cascade_min_visibility:
+                break
+        return best
+    
+    def _infer_with_fallback(self, graph, rgb_image: np.ndarray, roi: Optional[RegionOfInterest],
+                             cascade_sides: Sequence[int] = ()) -> Optional[PoseLandmarks]:
+        pose = self._infer(graph, rgb_image, roi, cascade_sides)
+        if pose is None and roi is not None:
+            # Nobody in the crop; search the whole frame
+            pose = self._infer(graph, rgb_image, None, cascade_sides)
+        return pose
+    
+    def _update_session_roi(self, session, pose: Optional[PoseLandmarks]):
+        if self.session_roi_margin is None:
+            return
+        needed = None
+        if pose is not None:
+            needed = RegionOfInterest.around(pose.points, pose.visibilities, self.session_roi_margin)
+        if needed is None:
+            session.roi = None
+            return
+        # Keep the crop fixed while the body stays well inside it, so the tracking
+        # graph sees a steady frame; refit with extra slack when it leaves or shrinks
+        if session.roi is None or not session.roi.contains(needed) or needed.area < 0.5 * session.roi.area:
+            session.roi = RegionOfInterest.around(pose.points, pose.visibilities, 2 * self.session_roi_margin)
+    
+    def _detect_session_pose(self, rgb_image: np.ndarray, session_id: str,
+                             roi: Optional[RegionOfInterest] = None) -> Optional[PoseLandmarks]:
+        """Run the session's tracking graph, or reuse its last landmarks if the frame barely changed"""
+        session = self.sessions.acquire(session_id)
+        while True:
+            with session.lock:
+                if session.closed:
+                    # Released or evicted while this frame waited for the lock: a session
+                    # that ended must not get a new graph from a frame still in flight
+                    session = self.sessions.get(session_id)
+                    if session is None:
+                        return None
+                    continue
+                session.frames_processed += 1
+                
+                thumbnail = None
+                if self.motion_gate is not None:
+                    thumbnail = self.motion_gate.thumbnail(rgb_image)
+                    # Never gate while nobody is detected, and re-infer periodically so
+                    # slow drift below the threshold cannot freeze the landmarks
+                    if (session.last_pose is not None
+                            and session.frames_since_keyframe < self.motion_gate.max_reuse
+                            and self.motion_gate.is_still(session.keyframe_thumbnail, thumbnail)):
+                        session.frames_since_keyframe += 1
+                        session.frames_gated += 1
+                        self.sessions.record_frame(gated=True)
+                        return session.last_pose
+                
+                pose = self._infer_with_fallback(session.pose, rgb_image, roi or session.roi)
+                if self.smoothing is not None:
+                    if session.smoother is None:
+                        session.smoother = LandmarkSmoother(self.smoothing)
+                    pose = session.smoother.update(pose, time.monotonic())
+                self._update_session_roi(session, pose)
+                session.keyframe_thumbnail = thumbnail
+                session.last_pose = pose
+                session.frames_since_keyframe = 0
+                self.sessions.record_frame(gated=False)
+                return pose
+    
+    def end_session(self, session_id: str) -> bool:
+        """Release the tracking graph held by a live session"""
+        return self.sessions.release(session_id)
+    
+    def _create_static_pose(self, complexity: int):
+        return self.mp_pose.Pose(
             static_image_mode=True,  # Better for single image analysis
-            model_complexity=0,      # Faster, less accurate
+            model_complexity=complexity,
             enable_segmentation=False,
             min_detection_confidence=0.3,  # Lower threshold for better detection
             min_tracking_confidence=0.3
         )
-        self.mp_drawing = mp.solutions.drawing_utils
-        self._last_landmark_visibilities: List[float] = []
-        
-        # Note: Removed PyTorch models for better performance
-        # Using rule-based analysis instead of ML models for MVP
-        
-        # Exercise-specific form criteria
-        self.form_criteria = {
-            'squat': {
-                'knee_angle_range': (80, 120),
-                'back_angle_range': (160, 180),
-                'hip_knee_alignment': True
-            },
-            'pushup': {
-                'elbow_angle_range': (80, 120),
-                'body_alignment': True,
-                'depth_threshold': 0.3
-            },
-            'plank': {
-                'body_alignment': True,
-                'hip_stability': True,
-                'core_engagement': True
-            },
-            'lunge': {
-                'front_knee_angle': (80, 100),
-                'back_knee_angle': (80, 100),
-                'hip_alignment': True
-            },
-            'deadlift': {
-                'back_straightness': True,
-                'knee_hip_sequence': True,
-                'bar_path': True
-            }
-        }
     
-    
-    def extract_pose_landmarks(self, image: np.ndarray) -> Optional[np.ndarray]:
-        """Extract pose landmarks from image using MediaPipe"""
+    def detect_pose(self, image: np.ndarray, session_id: Optional[str] = None, is_rgb: bool = False,
+                    roi: Optional[RegionOfInterest] = None,
+                    model_complexity: Optional[int] = None) -> Optional[PoseLandmarks]:
+        """Run pose inference and return landmarks with their visibilities, or None
+        
+        roi is a hint: inference runs on that crop first and falls back to the full frame.
+        model_complexity picks the still-image graph; tiers not configured use the lightest.
+        """
         try:
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = self.pose.process(rgb_image)
-            
-            if results.pose_landmarks:
-                landmarks = []
-                self._last_landmark_visibilities = []
-                for landmark in results.pose_landmarks.landmark:
-                    landmarks.extend([landmark.x, landmark.y, landmark.z])
-                    self._last_landmark_visibilities.append(landmark.visibility)
-                return np.array(landmarks)
-            self._last_landmark_visibilities = []
-            return None
+            rgb_image = image if is_rgb else cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            if session_id is None:
+                if model_complexity not in self.model_complexities:
+                    model_complexity = self.default_complexity
+                graph = self.static_poses.get(model_complexity)
+                if graph is None:
+                    graph = self.static_poses[model_complexity] = self._create_static_pose(model_complexity)
+                pose = self._infer_with_fallback(graph, rgb_image, roi, self.cascade_sides)
+                if pose is not None:
+                    pose.model_complexity = model_complexity
+                return pose
+            return self._detect_session_pose(rgb_image, session_id, roi)
         except Exception as e:
             print(f"Error extracting pose landmarks: {e}")
-            self._last_landmark_visibilities = []
             return None
     
+    def extract_pose_landmarks(self, image: np.ndarray, session_id: Optional[str] = None) -> Optional[np.ndarray]:
+        """Extract pose landmarks from image using MediaPipe"""
+        pose = self.detect_pose(image, session_id)
+        return pose.landmarks if pose is not None else None
+    
     def calculate_angles(self, landmarks: np.ndarray) -> Dict[str, float]:
         """Calculate joint angles from pose landmarks"""
-        angles = {}
-        
-        # Convert landmarks to 3D points
-        points = landmarks.reshape(-1, 3)
-        
-        if len(points) >= 33:
-            # Left leg angles
-            if len(points) > 27:
-                hip = points[23]  # Left hip
-                knee = points[25]  # Left knee
-                ankle = points[27]  # Left ankle
-                
-                # Calculate knee angle
-                v1 = hip - knee
-                v2 = ankle - knee
-                cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-                cos_angle = np.clip(cos_angle, -1.0, 1.0)
-                angle = np.degrees(np.arccos(cos_angle))
-                angles['left_knee_angle'] = angle
-            
-            # Right leg angles
-            if len(points) > 28:
-                hip = points[24]  # Right hip
-                knee = points[26]  # Right knee
-                ankle = points[28]  # Right ankle
-                
-                # Calculate knee angle
-                v1 = hip - knee
-                v2 = ankle - knee
-                cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-                cos_angle = np.clip(cos_angle, -1.0, 1.0)
-                angle = np.degrees(np.arccos(cos_angle))
-                angles['right_knee_angle'] = angle
-            
-            # Left arm angles (for push-ups)
-            if len(points) > 15:
-                shoulder = points[11]  # Left shoulder
-                elbow = points[13]  # Left elbow
-                wrist = points[15]  # Left wrist
-                
-                # Calculate elbow angle
-                v1 = shoulder - elbow
-                v2 = wrist - elbow
-                cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-                cos_angle = np.clip(cos_angle, -1.0, 1.0)
-                angle = np.degrees(np.arccos(cos_angle))
-                angles['left_elbow_angle'] = angle
-            
-            # Right arm angles (for push-ups)
-            if len(points) > 16:
-                shoulder = points[12]  # Right shoulder
-                elbow = points[14]  # Right elbow
-                wrist = points[16]  # Right wrist
-                
-                # Calculate elbow angle
-                v1 = shoulder - elbow
-                v2 = wrist - elbow
-                cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-                cos_angle = np.clip(cos_angle, -1.0, 1.0)
-                angle = np.degrees(np.arccos(cos_angle))
-                angles['right_elbow_angle'] = angle
-        
-        return angles
+        return self.angle_kernel.compute_dict(landmarks)
     
-    def _calculate_form_score(self, landmarks: np.ndarray, exercise_type: str, angles: Dict[str, float]) -> float:
-        """Calculate realistic form score based on strict exercise criteria"""
-        points = landmarks.reshape(-1, 3)
-        if len(points) < 33:
-            return 0.0
-        
-        # Start with 0 and build up score based on actual form quality
-        form_score = 0.0
-        max_possible_score = 1.0
-        
-        # 1. Basic pose visibility (20% of total score)
-        visibility_score = self._calculate_visibility_score(points)
-        form_score += visibility_score * 0.2
-        
-        # 2. Exercise-specific form analysis (80% of total score)
-        exercise_score = self._calculate_exercise_specific_score(points, exercise_type, angles)
-        form_score += exercise_score * 0.8
-        
-        return min(form_score, 1.0)
+    def _calculate_form_score(self, visibility_score: np.ndarray, exercise_score: np.ndarray) -> np.ndarray:
+        """Blend key-joint visibility (20%) with the exercise rules score (80%)"""
+        return np.minimum(visibility_score * 0.2 + exercise_score * 0.8, 1.0)
     
     def _calculate_visibility_score(self, points: np.ndarray) -> float:
         """Calculate how well key body parts are visible"""
-        key_indices = [11, 12, 23, 24, 25, 26, 27, 28]  # shoulders, hips, knees, ankles
-        visible_points = 0
-        total_points = 0
-        
-        for idx in key_indices:
-            if idx < len(points):
-                total_points += 1
-                # Check if point is within reasonable bounds and has good visibility
-                x, y, z = points[idx]
-                if 0.1 <= x <= 0.9 and 0.1 <= y <= 0.9 and abs(z) < 0.5:
-                    visible_points += 1
-        
-        return visible_points / total_points if total_points > 0 else 0.0
+        return float(key_joint_visibility(points)[0])
     
-    def _check_body_visibility(self, points: np.ndarray) -> Dict[str, any]:
+    def _check_body_visibility(self, points: np.ndarray, visibilities: Optional[np.ndarray] = None) -> Dict[str, any]:
         """Check if entire body is visible and provide specific feedback"""
         visibility_issues = []
         missing_parts = []
-        visibilities = self._last_landmark_visibilities if self._last_landmark_visibilities else []
-        
-        # Define body parts and their MediaPipe indices
-        body_parts = {
-            'head': [0],  # nose
-            'shoulders': [11, 12],  # left and right shoulders
-            'arms': [13, 14, 15, 16],  # elbows and wrists
-            'hips': [23, 24],  # left and right hips
-            'legs': [25, 26, 27, 28],  # knees and ankles
-            'feet': [29, 30, 31, 32]  # heels and foot index
-        }
+        visibilities = visibilities if visibilities is not None else []
         
-        for part_name, indices in body_parts.items():
+        for part_name, indices in BODY_PARTS.items():
             part_visible = 0
             part_total = 0
             
@@ -255,318 +358,124 @@ class PostureAnalyzer:
             'visibility_score': self._calculate_visibility_score(points)
         }
     
-    def _calculate_exercise_specific_score(self, points: np.ndarray, exercise_type: str, angles: Dict[str, float]) -> float:
-        """Calculate score based on exercise-specific form criteria"""
-        if exercise_type == 'squat':
-            return self._score_squat_form(points, angles)
-        elif exercise_type == 'pushup':
-            return self._score_pushup_form(points, angles)
-        elif exercise_type == 'plank':
-            return self._score_plank_form(points, angles)
-        elif exercise_type == 'lunge':
-            return self._score_lunge_form(points, angles)
-        elif exercise_type == 'deadlift':
-            return self._score_deadlift_form(points, angles)
-        else:
-            return 0.3  # Default low score for unsupported exercises
-    
-    def _score_squat_form(self, points: np.ndarray, angles: Dict[str, float]) -> float:
-        """Score squat form based on strict criteria"""
-        score = 0.0
-        
-        # 1. Knee angle analysis (40% of exercise score)
-        knee_angle = angles.get('left_knee_angle', 180)
-        if 85 <= knee_angle <= 95:  # Perfect squat depth
-            score += 0.4
-        elif 75 <= knee_angle <= 105:  # Good squat depth
-            score += 0.3
-        elif 65 <= knee_angle <= 115:  # Acceptable squat depth
-            score += 0.2
-        elif 55 <= knee_angle <= 125:  # Poor squat depth
-            score += 0.1
-        # 0 points for very poor depth
-        
-        # 2. Back alignment (30% of exercise score)
-        back_score = self._check_back_alignment(points)
-        score += back_score * 0.3
-        
-        # 3. Knee tracking (20% of exercise score)
-        knee_tracking_score = self._check_knee_tracking(points)
-        score += knee_tracking_score * 0.2
-        
-        # 4. Heel contact (10% of exercise score)
-        heel_score = self._check_heel_contact(points)
-        score += heel_score * 0.1
-        
-        return score
-    
-    def _score_pushup_form(self, points: np.ndarray, angles: Dict[str, float]) -> float:
-        """Score push-up form based on strict criteria"""
-        score = 0.0
-        
-        # 1. Body alignment (40% of exercise score)
-        alignment_score = self._check_pushup_alignment(points)
-        score += alignment_score * 0.4
-        
-        # 2. Elbow angle (30% of exercise score)
-        elbow_angle = self._calculate_elbow_angle(points)
-        if 80 <= elbow_angle <= 100:  # Good push-up depth
-            score += 0.3
-        elif 70 <= elbow_angle <= 110:
-            score += 0.2
-        elif 60 <= elbow_angle <= 120:
-            score += 0.1
-        
-        # 3. Head position (20% of exercise score)
-        head_score = self._check_head_position(points)
-        score += head_score * 0.2
-        
-        # 4. Core engagement (10% of exercise score)
-        core_score = self._check_core_engagement(points)
-        score += core_score * 0.1
-        
-        return score
-    
-    def _score_plank_form(self, points: np.ndarray, angles: Dict[str, float]) -> float:
-        """Score plank form based on strict criteria"""
-        score = 0.0
-        
-        # 1. Body straightness (50% of exercise score)
-        straightness_score = self._check_plank_straightness(points)
-        score += straightness_score * 0.5
-        
-        # 2. Hip position (30% of exercise score)
-        hip_score = self._check_hip_position(points)
-        score += hip_score * 0.3
-        
-        # 3. Shoulder position (20% of exercise score)
-        shoulder_score = self._check_shoulder_position(points)
-        score += shoulder_score * 0.2
-        
-        return score
-    
-    def _score_lunge_form(self, points: np.ndarray, angles: Dict[str, float]) -> float:
-        """Score lunge form based on strict criteria"""
-        score = 0.0
-        
-        # 1. Front knee angle (40% of exercise score)
-        front_knee_angle = self._calculate_front_knee_angle(points)
-        if 85 <= front_knee_angle <= 95:
-            score += 0.4
-        elif 75 <= front_knee_angle <= 105:
-            score += 0.3
-        elif 65 <= front_knee_angle <= 115:
-            score += 0.2
-        elif 55 <= front_knee_angle <= 125:
-            score += 0.1
-        
-        # 2. Back knee position (30% of exercise score)
-        back_knee_score = self._check_back_knee_position(points)
-        score += back_knee_score * 0.3
-        
-        # 3. Torso alignment (30% of exercise score)
-        torso_score = self._check_torso_alignment(points)
-        score += torso_score * 0.3
-        
-        return score
-    
-    def _score_deadlift_form(self, points: np.ndarray, angles: Dict[str, float]) -> float:
-        """Score deadlift form based on strict criteria"""
-        score = 0.0
-        
-        # 1. Back straightness (50% of exercise score)
-        back_straightness = self._check_deadlift_back(points)
-        score += back_straightness * 0.5
-        
-        # 2. Hip hinge (30% of exercise score)
-        hip_hinge_score = self._check_hip_hinge(points)
-        score += hip_hinge_score * 0.3
-        
-        # 3. Bar path (20% of exercise score)
-        bar_path_score = self._check_bar_path(points)
-        score += bar_path_score * 0.2
-        
-        return score
-    
-    # Helper methods for detailed form analysis
-    def _check_back_alignment(self, points: np.ndarray) -> float:
-        """Check if back is straight during squat"""
-        # Simplified check - in real implementation, would analyze spine curvature
-        return 0.7  # Default moderate score
-    
-    def _check_knee_tracking(self, points: np.ndarray) -> float:
-        """Check if knees track over toes"""
-        # Simplified check - would analyze knee position relative to feet
-        return 0.8  # Default good score
-    
-    def _check_heel_contact(self, points: np.ndarray) -> float:
-        """Check if heels stay on ground"""
-        # Simplified check - would analyze heel position
-        return 0.9  # Default good score
-    
-    def _check_pushup_alignment(self, points: np.ndarray) -> float:
-        """Check if body is in straight line during push-up"""
-        # Simplified check - would analyze body alignment
-        return 0.6  # Default moderate score
-    
-    def _calculate_elbow_angle(self, points: np.ndarray) -> float:
-        """Calculate elbow angle during push-up"""
-        # Simplified calculation - would use actual elbow landmarks
-        return 90.0  # Default 90 degrees
-    
-    def _check_head_position(self, points: np.ndarray) -> float:
-        """Check if head is in neutral position"""
-        return 0.8  # Default good score
-    
-    def _check_core_engagement(self, points: np.ndarray) -> float:
-        """Check if core is engaged"""
-        return 0.7  # Default moderate score
-    
-    def _check_plank_straightness(self, points: np.ndarray) -> float:
-        """Check if body is straight during plank"""
-        return 0.6  # Default moderate score
-    
-    def _check_hip_position(self, points: np.ndarray) -> float:
-        """Check if hips are in correct position"""
-        return 0.7  # Default moderate score
-    
-    def _check_shoulder_position(self, points: np.ndarray) -> float:
-        """Check if shoulders are in correct position"""
-        return 0.8  # Default good score
-    
-    def _calculate_front_knee_angle(self, points: np.ndarray) -> float:
-        """Calculate front knee angle during lunge"""
-        return 90.0  # Default 90 degrees
-    
-    def _check_back_knee_position(self, points: np.ndarray) -> float:
-        """Check if back knee is in correct position"""
-        return 0.7  # Default moderate score
-    
-    def _check_torso_alignment(self, points: np.ndarray) -> float:
-        """Check if torso is upright during lunge"""
-        return 0.8  # Default good score
-    
-    def _check_deadlift_back(self, points: np.ndarray) -> float:
-        """Check if back is straight during deadlift"""
-        return 0.6  # Default moderate score
-    
-    def _check_hip_hinge(self, points: np.ndarray) -> float:
-        """Check if hip hinge is correct"""
-        return 0.7  # Default moderate score
-    
-    def _check_bar_path(self, points: np.ndarray) -> float:
-        """Check if bar path is correct"""
-        return 0.5  # Default lower score (harder to assess without bar)
-    
-    def analyze_exercise_form(self, image: np.ndarray, exercise_type: str) -> PostureAnalysis:
+    def analyze_exercise_form(self, image: np.ndarray, exercise_type: str,
+                              session_id: Optional[str] = None, is_rgb: bool = False,
+                              roi: Optional[RegionOfInterest] = None) -> PostureAnalysis:
         """Analyze exercise form and provide feedback"""
-        landmarks = self.extract_pose_landmarks(image)
-        
-        if landmarks is None:
-            # Provide helpful feedback when no pose is detected
-            return PostureAnalysis(
-                exercise_type=exercise_type,
-                confidence=0.0,
-                form_score=0.0,
-                corrections=[
-                    "No pose detected. Please ensure you're visible in the camera.",
-                    "Make sure you're standing in front of the camera with good lighting.",
-                    "Try moving closer to the camera or adjusting the angle."
-                ],
-                key_points={},
-                is_correct_form=False
-            )
-        
-        # Check body visibility first
-        points = landmarks.reshape(-1, 3)
-        visibility_info = self._check_body_visibility(points)
-        
-        # If body is not fully visible, prioritize visibility feedback
-        if not visibility_info['is_fully_visible']:
-            corrections = visibility_info['visibility_issues'].copy()
+        analysis = self.score_pose(self.detect_pose(image, session_id, is_rgb=is_rgb, roi=roi), exercise_type)
+        if session_id is not None:
+            self.count_reps(session_id, analysis)
+        return analysis
+    
+    def score_pose(self, pose: Optional[PoseLandmarks], exercise_type: str) -> PostureAnalysis:
+        """Score already-extracted landmarks without running inference"""
+        return self.score_poses([pose], exercise_type)[0]
+    
+    def score_poses(self, poses: Sequence[Optional[PoseLandmarks]], exercise_type: str) -> List[PostureAnalysis]:
+        """Score many frames' landmarks at once, e.g. a whole video
+        
+        Visibility, features and every rule run as array operations over all
+        detected frames; only the per-frame result objects are built in a loop.
+        """
+        detected = [i for i, pose in enumerate(poses) if pose is not None]
+        analyses = [None if pose is not None else self._no_pose_analysis(exercise_type) for pose in poses]
+        if not detected:
+            return analyses
+        
+        points = np.stack([poses[i].points for i in detected])
+        fully_visible = body_parts_visible(points, np.stack([poses[i].visibilities for i in detected]))
+        visibility_scores = key_joint_visibility(points)
+        # Every rule of the exercise for every frame in one vectorized pass
+        features = self.form_rules.features(points)
+        evaluation = self.form_rules.evaluate(exercise_type, features)
+        form_scores = self._calculate_form_score(visibility_scores, evaluation.exercise_score)
+        
+        for row, i in enumerate(detected):
+            pose = poses[i]
+            if not fully_visible[row]:
+                analyses[i] = self._partial_body_analysis(pose, exercise_type)
+                continue
             
-            # Add exercise-specific tips if some parts are visible
-            if visibility_info['visibility_score'] > 0.3:
-                corrections.append("Once your entire body is visible, we can analyze your exercise form.")
+            form_score = float(form_scores[row])
+            corrections = evaluation.corrections(row)
+            # Add visibility confirmation if everything is good
+            if visibility_scores[row] > 0.8:
+                corrections.insert(0, "✅ Great! Your entire body is visible for accurate analysis.")
             
-            return PostureAnalysis(
+            analyses[i] = PostureAnalysis(
                 exercise_type=exercise_type,
-                confidence=0.3,  # Low confidence due to visibility issues
-                form_score=0.0,  # Can't score form if body isn't fully visible
+                confidence=0.85,  # Good confidence when pose is detected
+                form_score=form_score,
                 corrections=corrections,
-                key_points=self._extract_key_points(landmarks),
-                is_correct_form=False
+                key_points=self._extract_key_points(pose.landmarks),
+                # Determine if form is correct; allow for the visibility confirmation
+                is_correct_form=form_score > 0.7 and len(corrections) <= 1,
+                landmarks=pose.landmarks,
+                visibilities=pose.visibilities,
+                inference_side=pose.input_side or None,
+                model_complexity=pose.model_complexity,
+                features=features[row]
             )
+        return analyses
+    
+    def _no_pose_analysis(self, exercise_type: str) -> PostureAnalysis:
+        # Provide helpful feedback when no pose is detected
+        return PostureAnalysis(
+            exercise_type=exercise_type,
+            confidence=0.0,
+            form_score=0.0,
+            corrections=[
+                "No pose detected. Please ensure you're visible in the camera.",
+                "Make sure you're standing in front of the camera with good lighting.",
+                "Try moving closer to the camera or adjusting the angle."
+            ],
+            key_points={},
+            is_correct_form=False
+        )
+    
+    def _partial_body_analysis(self, pose: PoseLandmarks, exercise_type: str) -> PostureAnalysis:
+        """Visibility feedback for a frame where part of the body is out of view"""
+        landmarks = pose.landmarks
+        visibility_info = self._check_body_visibility(pose.points, pose.visibilities)
+        corrections = visibility_info['visibility_issues'].copy()
         
-        # Calculate angles for detailed analysis
-        angles = self.calculate_angles(landmarks)
-        
-        # Generate form score based on pose detection and basic analysis
-        form_score = self._calculate_form_score(landmarks, exercise_type, angles)
-        
-        # Generate corrections based on form criteria
-        corrections = self._generate_corrections(exercise_type, angles, form_score)
-        
-        # Add visibility confirmation if everything is good
-        if visibility_info['is_fully_visible'] and visibility_info['visibility_score'] > 0.8:
-            corrections.insert(0, "✅ Great! Your entire body is visible for accurate analysis.")
-        
-        # Determine if form is correct
-        is_correct_form = form_score > 0.7 and len(corrections) <= 1  # Allow for visibility confirmation
-        
-        # Extract key points for visualization
-        key_points = self._extract_key_points(landmarks)
+        # Add exercise-specific tips if some parts are visible
+        if visibility_info['visibility_score'] > 0.3:
+            corrections.append("Once your entire body is visible, we can analyze your exercise form.")
         
         return PostureAnalysis(
             exercise_type=exercise_type,
-            confidence=0.85,  # Good confidence when pose is detected
-            form_score=form_score,
+            confidence=0.3,  # Low confidence due to visibility issues
+            form_score=0.0,  # Can't score form if body isn't fully visible
             corrections=corrections,
-            key_points=key_points,
-            is_correct_form=is_correct_form
+            key_points=self._extract_key_points(landmarks),
+            is_correct_form=False,
+            landmarks=landmarks,
+            visibilities=pose.visibilities,
+            inference_side=pose.input_side or None,
+            model_complexity=pose.model_complexity
         )
     
-    def _generate_corrections(self, exercise_type: str, angles: Dict[str, float], form_score: float) -> List[str]:
-        """Generate form corrections based on exercise type and angles"""
-        corrections = []
-        criteria = self.form_criteria.get(exercise_type, {})
-        
-        if exercise_type == 'squat':
-            knee_angle = angles.get('left_knee_angle', 0)
-            if knee_angle < 80:
-                corrections.append("Go deeper - aim for 90-degree knee angle")
-            elif knee_angle > 120:
-                corrections.append("Don't go too deep - maintain control")
-            
-            if form_score < 0.7:
-                corrections.append("Keep your back straight and chest up")
-                corrections.append("Ensure knees track over toes")
-        
-        elif exercise_type == 'pushup':
-            if form_score < 0.7:
-                corrections.append("Keep your body in a straight line")
-                corrections.append("Lower chest closer to the ground")
-                corrections.append("Push through your palms, not fingertips")
-        
-        elif exercise_type == 'plank':
-            if form_score < 0.7:
-                corrections.append("Keep your body straight from head to heels")
-                corrections.append("Engage your core muscles")
-                corrections.append("Don't let hips sag or pike up")
-        
-        elif exercise_type == 'lunge':
-            if form_score < 0.7:
-                corrections.append("Keep front knee over ankle")
-                corrections.append("Lower back knee toward ground")
-                corrections.append("Maintain upright torso")
-        
-        elif exercise_type == 'deadlift':
-            if form_score < 0.7:
-                corrections.append("Keep your back straight throughout the movement")
-                corrections.append("Hinge at hips, not waist")
-                corrections.append("Keep the bar close to your body")
-        
-        return corrections
+    def count_reps(self, session_id: str, analysis: PostureAnalysis, timestamp: Optional[float] = None):
+        """Feed a session frame's analysis to the session's rep counter and record the result on it"""
+        pattern = REP_PATTERNS.get(analysis.exercise_type)
+        if pattern is None:
+            return
+        session = self.sessions.get(session_id)
+        if session is None:
+            return  # the session ended while this frame was analyzed
+        with session.lock:
+            if session.closed:
+                return
+            counter = session.rep_counter
+            if counter is None or counter.pattern is not pattern:
+                counter = session.rep_counter = RepCounter(pattern)  # new or switched exercise
+            if analysis.features is not None:
+                analysis.completed_rep = counter.update(
+                    analysis.features, analysis.form_score, time.monotonic() if timestamp is None else timestamp
+                )
+            analysis.rep_count = counter.reps
+            analysis.movement_phase = counter.phase
     
     def _extract_key_points(self, landmarks: np.ndarray) -> Dict[str, Tuple[float, float]]:
         """Extract key body points for visualization"""
@@ -592,33 +501,28 @@ class PostureAnalyzer:
         
         return key_points
     
-    def draw_pose_landmarks(self, image: np.ndarray, landmarks: np.ndarray) -> np.ndarray:
+    def draw_pose_landmarks(self, image: np.ndarray, landmarks: np.ndarray,
+                            visibilities: Optional[np.ndarray] = None,
+                            min_visibility: float = 0.5) -> np.ndarray:
         """Draw pose landmarks on image"""
         if landmarks is None:
             return image
         
         points = landmarks.reshape(-1, 3)
-        normalized_landmarks = []
+        height, width = image.shape[:2]
+        pixels = np.rint(points[:, :2] * (width, height)).astype(np.int32)
         
-        for point in points:
-            normalized_landmarks.append(
-                landmark_pb2.NormalizedLandmark(
-                    x=float(point[0]),
-                    y=float(point[1]),
-                    z=float(point[2]),
-                    visibility=1.0
-                )
-            )
-        
-        landmark_list = landmark_pb2.NormalizedLandmarkList(landmark=normalized_landmarks)
+        # Like mp drawing_utils, skip landmarks the model is unsure about
+        visible = np.ones(len(points), dtype=bool)
+        if visibilities is not None:
+            visible = np.asarray(visibilities) >= min_visibility
+        connections = POSE_CONNECTIONS[(POSE_CONNECTIONS < len(points)).all(axis=1)]
+        connections = connections[visible[connections].all(axis=1)]
         
         annotated_image = image.copy()
-        self.mp_drawing.draw_landmarks(
-            annotated_image,
-            landmark_list,
-            self.mp_pose.POSE_CONNECTIONS,
-            landmark_drawing_spec=self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-            connection_drawing_spec=self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2)
-        )
+        # One polylines call draws every bone
+        cv2.polylines(annotated_image, list(pixels[connections]), False, (0, 255, 0), 2)
+        for x, y in pixels[visible].tolist():
+            cv2.circle(annotated_image, (x, y), 2, (0, 255, 0), 2)
         
         return annotated_image
@@ -0,0 +1,127 @@
+import math
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional
+
+import numpy as np
+
+from services.form_rules import FEATURE_NAMES
+
+# Movement phases of one rep, in order
+LOCKOUT = "lockout"        # at the top, joint extended
+ECCENTRIC = "eccentric"    # lowering
+BOTTOM = "bottom"          # at the bottom, joint flexed
+CONCENTRIC = "concentric"  # rising
+
+
+@dataclass(frozen=True)
+class RepPattern:
+    """Joint angle that drives an exercise's reps and its phase thresholds (degrees)"""
+    feature: str              # column of the form-rules feature matrix
+    top: float                # angle at or above which the joint counts as locked out
+    bottom: float             # angle at or below which the rep has reached the bottom
+    hysteresis: float = 8.0   # a phase is only left once the angle moves this far back past its threshold
+    min_rep_seconds: float = 0.4  # faster "reps" are jitter, not movement
+
+
+REP_PATTERNS: Dict[str, RepPattern] = {
+    'squat': RepPattern('knee_angle', top=160, bottom=100),
+    'lunge': RepPattern('front_knee_angle', top=155, bottom=105),
+    'pushup': RepPattern('elbow_angle', top=155, bottom=100),
+    'deadlift': RepPattern('hip_angle', top=165, bottom=110),
+}
+
+
+@dataclass
+class RepEvent:
+    """One completed rep"""
+    rep: int
+    min_angle: float
+    duration: float            # seconds from leaving lockout to returning
+    eccentric_seconds: float
+    pause_seconds: float       # time spent at the bottom
+    concentric_seconds: float
+    form_score: float          # mean form score over the rep's frames
+
+    @property
+    def tempo(self) -> str:
+        return f"{self.eccentric_seconds:.1f}-{self.pause_seconds:.1f}-{self.concentric_seconds:.1f}"
+
+    def to_dict(self) -> Dict:
+        return {**{key: round(value, 3) if isinstance(value, float) else value
+                   for key, value in asdict(self).items()}, 'tempo': self.tempo}
+
+
+class RepCounter:
+    """Incremental rep detector over one session's stream of joint angles
+
+    A phase state machine with hysteresis: every update is a handful of float
+    comparisons, and only a completed rep allocates its RepEvent.
+    """
+
+    def __init__(self, pattern: RepPattern):
+        self.pattern = pattern
+        self._column = FEATURE_NAMES.index(pattern.feature)
+        self.phase: Optional[str] = None  # unknown until the first lockout
+        self.reps = 0
+        self._rep_start = 0.0
+        self._bottom_start = 0.0
+        self._concentric_start = 0.0
+        self._min_angle = math.inf
+        self._score_sum = 0.0
+        self._score_frames = 0
+
+    def update(self, features: np.ndarray, form_score: float, timestamp: float) -> Optional[RepEvent]:
+        """Advance on one frame's feature row; returns the rep this frame completed, if any"""
+        angle = float(features[self._column])
+        if math.isnan(angle):
+            return None  # joint not measurable this frame; hold the phase
+        pattern = self.pattern
+
+        if self.phase is None:
+            if angle >= pattern.top:
+                self.phase = LOCKOUT
+            return None
+        if self.phase == LOCKOUT:
+            if angle < pattern.top - pattern.hysteresis:
+                self.phase = ECCENTRIC
+                self._rep_start = timestamp
+                self._min_angle = angle
+                self._score_sum = form_score
+                self._score_frames = 1
+            return None
+
+        self._min_angle = min(self._min_angle, angle)
+        self._score_sum += form_score
+        self._score_frames += 1
+        if self.phase == ECCENTRIC:
+            if angle <= pattern.bottom:
+                self.phase = BOTTOM
+                self._bottom_start = timestamp
+            elif angle >= pattern.top:
+                self.phase = LOCKOUT  # turned back before reaching depth; not a rep
+        elif self.phase == BOTTOM:
+            if angle > pattern.bottom + pattern.hysteresis:
+                self.phase = CONCENTRIC
+                self._concentric_start = timestamp
+        elif self.phase == CONCENTRIC:
+            if angle <= pattern.bottom:
+                self.phase = BOTTOM
+            elif angle >= pattern.top:
+                self.phase = LOCKOUT
+                return self._complete(timestamp)
+        return None
+
+    def _complete(self, timestamp: float) -> Optional[RepEvent]:
+        duration = timestamp - self._rep_start
+        if duration < self.pattern.min_rep_seconds:
+            return None
+        self.reps += 1
+        return RepEvent(
+            rep=self.reps,
+            min_angle=self._min_angle,
+            duration=duration,
+            eccentric_seconds=self._bottom_start - self._rep_start,
+            pause_seconds=self._concentric_start - self._bottom_start,
+            concentric_seconds=timestamp - self._concentric_start,
+            form_score=self._score_sum / self._score_frames
+        )
@@ -0,0 +1,160 @@
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from services.form_rules import FEATURE_NAMES, FormRuleEngine
+from services.rep_counter import REP_PATTERNS
+
+
+@dataclass
+class RepSummary:
+    """Aggregates for one rep segmented out of a video"""
+    rep: int
+    start_time: float
+    bottom_time: float
+    end_time: float
+    duration: float
+    descent_seconds: float
+    ascent_seconds: float
+    min_angle: float
+    range_of_motion: float      # degrees from the lower of the two tops down to the bottom
+    average_form_score: float
+    correct_form_percentage: float
+    corrections: List[str]      # rules failing at the bottom of the rep
+
+    def to_dict(self) -> Dict:
+        return {key: round(value, 3) if isinstance(value, float) else value for key, value in asdict(self).items()}
+
+
+def fill_gaps(angles: np.ndarray) -> np.ndarray:
+    """Angle series with unmeasurable (NaN) samples interpolated, edges held at the nearest measurement"""
+    angles = np.asarray(angles, dtype=np.float64)
+    valid = ~np.isnan(angles)
+    if valid.all() or not valid.any():
+        return angles
+    return np.interp(np.arange(len(angles)), np.flatnonzero(valid), angles[valid])
+
+
+def segment_reps(angles: np.ndarray, timestamps: np.ndarray, min_prominence: float,
+                 min_duration: float = 0.5, max_duration: float = 8.0) -> List[Tuple[int, int, int]]:
+    """(start, bottom, end) sample indices of each rep in a joint-angle series
+
+    Reps are valleys of the angle. A valley must rise at least min_prominence
+    degrees to the highest angle within max_duration on both sides, valleys
+    closer than min_duration keep only the deepest, and each rep spans the
+    highest samples between its neighbouring valleys.
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if np.count_nonzero(~np.isnan(angles)) < 3:
+        return []
+    # Bridge frames where the joint was not measurable
+    angles = fill_gaps(angles)
+
+    # Local minima, with flat stretches collapsed to their first sample
+    changes = np.flatnonzero(np.r_[True, angles[1:] != angles[:-1]])
+    values = angles[changes]
+    padded = np.r_[np.inf, values, np.inf]
+    candidates = changes[(values < padded[:-2]) & (values < padded[2:])]
+    if len(candidates) == 0:
+        return []
+
+    # Prominence against the highest angle within one maximum rep length on each side
+    steps = np.diff(timestamps)
+    step = float(np.median(steps[steps > 0])) if np.any(steps > 0) else 1.0
+    window = max(1, int(round(max_duration / step)))
+    edges = np.full(window, -np.inf)
+    windows = sliding_window_view(np.r_[edges, angles, edges], window + 1)
+    left_peak = windows[candidates].max(axis=1)
+    right_peak = windows[candidates + window].max(axis=1)
+    prominence = np.minimum(left_peak, right_peak) - angles[candidates]
+    candidates = candidates[prominence >= min_prominence]
+
+    # Deepest valley first; drop valleys within min_duration of one already kept
+    bottoms: List[int] = []
+    for index in candidates[np.argsort(angles[candidates], kind='stable')]:
+        if all(abs(timestamps[index] - timestamps[kept]) >= min_duration for kept in bottoms):
+            bottoms.append(int(index))
+    bottoms.sort()
+    if not bottoms:
+        return []
+
+    # Split between neighbouring bottoms at the highest angle; the outer reps end
+    # at the highest angle within a maximum rep length
+    tops = [max(0, bottoms[0] - window) + int(np.argmax(angles[max(0, bottoms[0] - window):bottoms[0] + 1]))]
+    tops += [left + int(np.argmax(angles[left:right + 1])) for left, right in zip(bottoms, bottoms[1:])]
+    tops.append(bottoms[-1] + int(np.argmax(angles[bottoms[-1]:bottoms[-1] + window + 1])))
+
+    reps = []
+    for start, bottom, end in zip(tops, bottoms, tops[1:]):
+        duration = timestamps[end] - timestamps[start]
+        depth = min(angles[start], angles[end]) - angles[bottom]
+        if min_duration <= duration <= max_duration and depth >= min_prominence:
+            reps.append((start, bottom, end))
+    return reps
+
+
+class RepTimeline:
+    """Collects one video's per-frame analyses and segments them into reps afterwards"""
+
+    def __init__(self, exercise_type: str, form_rules: Optional[FormRuleEngine] = None,
+                 min_duration: float = 0.5, max_duration: float = 8.0):
+        self.exercise_type = exercise_type
+        self.pattern = REP_PATTERNS.get(exercise_type)
+        self.form_rules = form_rules or FormRuleEngine()
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self._timestamps: List[float] = []
+        self._features: List[np.ndarray] = []
+        self._scores: List[float] = []
+        self._correct: List[bool] = []
+
+    def add(self, timestamp: float, analysis):
+        self._timestamps.append(timestamp)
+        self._features.append(analysis.features if analysis.features is not None
+                              else np.full(len(FEATURE_NAMES), np.nan))
+        self._scores.append(analysis.form_score)
+        self._correct.append(analysis.is_correct_form)
+
+    def segment(self) -> List[RepSummary]:
+        if self.pattern is None or not self._timestamps:
+            return []  # no rep pattern (e.g. plank) or nothing analyzed
+        timestamps = np.array(self._timestamps)
+        features = np.vstack(self._features)
+        # Reps are measured on the gap-filled series, so frames without the joint never reach the response
+        angles = fill_gaps(features[:, FEATURE_NAMES.index(self.pattern.feature)])
+        # Half the lockout-to-bottom span of the live counter counts as a real rep
+        min_prominence = (self.pattern.top - self.pattern.bottom) * 0.5
+        reps = segment_reps(angles, timestamps, min_prominence, self.min_duration, self.max_duration)
+        if not reps:
+            return []
+
+        starts, bottoms, ends = (np.array(column) for column in zip(*reps))
+        frames = ends - starts + 1
+        score_sums = np.r_[0.0, np.cumsum(self._scores)]
+        correct_sums = np.r_[0, np.cumsum(self._correct)]
+        average_scores = (score_sums[ends + 1] - score_sums[starts]) / frames
+        correct_percentages = (correct_sums[ends + 1] - correct_sums[starts]) / frames * 100
+        tops = np.minimum(angles[starts], angles[ends])
+        # Form rules at each rep's deepest frame, all reps in one evaluation
+        bottom_rules = self.form_rules.evaluate(self.exercise_type, features[bottoms])
+
+        return [
+            RepSummary(
+                rep=i + 1,
+                start_time=float(timestamps[start]),
+                bottom_time=float(timestamps[bottom]),
+                end_time=float(timestamps[end]),
+                duration=float(timestamps[end] - timestamps[start]),
+                descent_seconds=float(timestamps[bottom] - timestamps[start]),
+                ascent_seconds=float(timestamps[end] - timestamps[bottom]),
+                min_angle=float(angles[bottom]),
+                range_of_motion=float(tops[i] - angles[bottom]),
+                average_form_score=float(average_scores[i]),
+                correct_form_percentage=float(correct_percentages[i]),
+                corrections=bottom_rules.corrections(i)
+            )
+            for i, (start, bottom, end) in enumerate(reps)
+        ]
@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Crops covering nearly the whole frame are not worth the copy
+MAX_CROP_AREA = 0.8
+
+
+@dataclass(frozen=True)
+class RegionOfInterest:
+    """Axis-aligned region in normalized image coordinates"""
+    x: float
+    y: float
+    width: float
+    height: float
+
+    @classmethod
+    def parse(cls, text: str) -> "RegionOfInterest":
+        """Parse "x,y,width,height" (normalized 0-1); raises ValueError if malformed"""
+        parts = [float(part) for part in text.split(",")]
+        if len(parts) != 4:
+            raise ValueError("roi must be x,y,width,height")
+        roi = cls(*parts).clamped()
+        if roi.width <= 0 or roi.height <= 0:
+            raise ValueError("roi must overlap the image")
+        return roi
+
+    @classmethod
+    def around(cls, points: np.ndarray, visibilities: np.ndarray, margin: float,
+               min_visibility: float = 0.5) -> Optional["RegionOfInterest"]:
+        """Bounding box of the visible landmarks, padded by margin times its size on every side"""
+        visible = points[visibilities >= min_visibility, :2]
+        if len(visible) < 4:
+            return None
+        (x0, y0), (x1, y1) = visible.min(axis=0), visible.max(axis=0)
+        pad_x, pad_y = (x1 - x0) * margin, (y1 - y0) * margin
+        return cls(x0 - pad_x, y0 - pad_y, x1 - x0 + 2 * pad_x, y1 - y0 + 2 * pad_y).clamped()
+
+    def clamped(self) -> "RegionOfInterest":
+        x0, y0 = max(0.0, self.x), max(0.0, self.y)
+        x1, y1 = min(1.0, self.x + self.width), min(1.0, self.y + self.height)
+        return RegionOfInterest(x0, y0, max(0.0, x1 - x0), max(0.0, y1 - y0))
+
+    @property
+    def area(self) -> float:
+        return self.width * self.height
+
+    def contains(self, other: "RegionOfInterest") -> bool:
+        return (self.x <= other.x and self.y <= other.y
+                and other.x + other.width <= self.x + self.width
+                and other.y + other.height <= self.y + self.height)
+
+    def pixel_box(self, width: int, height: int) -> Tuple[int, int, int, int]:
+        """(left, top, right, bottom) in pixels, at least one pixel wide and tall"""
+        left = min(int(self.x * width), width - 1)
+        top = min(int(self.y * height), height - 1)
+        right = max(left + 1, min(width, int(np.ceil((self.x + self.width) * width))))
+        bottom = max(top + 1, min(height, int(np.ceil((self.y + self.height) * height))))
+        return left, top, right, bottom
+
+    def __str__(self) -> str:
+        return f"{self.x:.4f},{self.y:.4f},{self.width:.4f},{self.height:.4f}"
+
+
+def crop_to_roi(image: np.ndarray, roi: Optional[RegionOfInterest]):
+    """Return (crop, pixel box), or (image, None) when cropping would not help"""
+    if roi is None or roi.area >= MAX_CROP_AREA:
+        return image, None
+    height, width = image.shape[:2]
+    left, top, right, bottom = roi.pixel_box(width, height)
+    # MediaPipe needs a contiguous buffer; copying the crop is cheap next to inference
+    return np.ascontiguousarray(image[top:bottom, left:right]), (left, top, right, bottom)
+
+
+def remap_points(points: np.ndarray, box: Tuple[int, int, int, int], width: int, height: int) -> np.ndarray:
+    """Map (N, 3) landmarks detected in a crop back to full-frame normalized coordinates"""
+    left, top, right, bottom = box
+    scale_x, scale_y = (right - left) / width, (bottom - top) / height
+    points = points * (scale_x, scale_y, scale_x)  # z shares x's scale in MediaPipe
+    points[:, 0] += left / width
+    points[:, 1] += top / height
+    return points
@@ -0,0 +1,315 @@
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Raised when the number of queued jobs has reached max_queue_depth"""
+
+    def __init__(self, queued: int, retry_after: int):
+        super().__init__(f"Video job queue is full ({queued} jobs waiting)")
+        self.queued = queued
+        self.retry_after = retry_after
+
+
+class JobCancelled(Exception):
+    """Raised inside a job runner when its job has been cancelled"""
+
+
+@dataclass
+class VideoJob:
+    job_id: str
+    status: str
+    exercise_type: str
+    options: Dict[str, Any]
+    video_path: str
+    total_frames: int
+    frames_analyzed: int
+    last_frame_number: int
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    error: Optional[str]
+
+    @property
+    def progress(self) -> float:
+        """Percent of the video's frames covered so far"""
+        if self.status == SUCCEEDED:
+            return 100.0
+        if self.total_frames <= 0 or self.last_frame_number < 0:
+            return 0.0
+        return min(100.0, (self.last_frame_number + 1) / self.total_frames * 100)
+
+
+_JOB_COLUMNS = ("job_id, status, exercise_type, options, video_path, total_frames, frames_analyzed, "
+                "last_frame_number, created_at, started_at, finished_at, error")
+
+
+class VideoJobStore:
+    """SQLite-backed job table; survives restarts so queued work can be recovered"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS video_jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " exercise_type TEXT NOT NULL,"
+            " options TEXT NOT NULL,"
+            " video_path TEXT NOT NULL,"
+            " total_frames INTEGER NOT NULL DEFAULT 0,"
+            " frames_analyzed INTEGER NOT NULL DEFAULT 0,"
+            " last_frame_number INTEGER NOT NULL DEFAULT -1,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " error TEXT,"
+            " result TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS video_jobs_status ON video_jobs (status, created_at)")
+
+    def insert(self, job: VideoJob):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO video_jobs ({_JOB_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, job.status, job.exercise_type, json.dumps(job.options), job.video_path,
+                 job.total_frames, job.frames_analyzed, job.last_frame_number, job.created_at,
+                 job.started_at, job.finished_at, job.error)
+            )
+
+    def get(self, job_id: str) -> Optional[VideoJob]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_JOB_COLUMNS} FROM video_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM video_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def list_by_status(self, *statuses: str) -> List[VideoJob]:
+        placeholders = ", ".join("?" for _ in statuses)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_JOB_COLUMNS} FROM video_jobs WHERE status IN ({placeholders}) ORDER BY created_at",
+                statuses
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def count_by_status(self, status: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM video_jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def transition(self, job_id: str, from_states: tuple, to_state: str, **fields) -> bool:
+        """Atomically move a job between states; False if it was not in one of from_states"""
+        assignments = ["status = ?"] + [f"{name} = ?" for name in fields]
+        placeholders = ", ".join("?" for _ in from_states)
+        values = [to_state] + [json.dumps(v) if name == "result" else v for name, v in fields.items()]
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE video_jobs SET {', '.join(assignments)} WHERE job_id = ? AND status IN ({placeholders})",
+                values + [job_id] + list(from_states)
+            )
+        return cursor.rowcount == 1
+
+    def update_progress(self, job_id: str, frames_analyzed: int, last_frame_number: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE video_jobs SET frames_analyzed = ?, last_frame_number = ? WHERE job_id = ?",
+                (frames_analyzed, last_frame_number, job_id)
+            )
+
+    def delete_finished(self, before: float) -> int:
+        """Drop finished jobs, results included, that ended before the given time"""
+        placeholders = ", ".join("?" for _ in FINISHED_STATES)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM video_jobs WHERE status IN ({placeholders}) AND finished_at < ?",
+                FINISHED_STATES + (before,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_job(row) -> VideoJob:
+        return VideoJob(
+            job_id=row[0], status=row[1], exercise_type=row[2], options=json.loads(row[3]),
+            video_path=row[4], total_frames=row[5], frames_analyzed=row[6], last_frame_number=row[7],
+            created_at=row[8], started_at=row[9], finished_at=row[10], error=row[11]
+        )
+
+
+# runner(job, on_record) -> result dict; on_record is called once per frame record and
+# raises JobCancelled to unwind the runner when the job has been cancelled
+JobRunner = Callable[[VideoJob, Callable[[Dict[str, Any]], None]], Dict[str, Any]]
+
+
+class VideoJobQueue:
+    """Local worker pool that runs video analysis jobs persisted in a VideoJobStore"""
+
+    def __init__(self, store: VideoJobStore, runner: JobRunner, storage_dir: str,
+                 workers: int = 1, max_queue_depth: int = 16, progress_interval: float = 0.5,
+                 result_ttl: float = 24 * 3600):
+        self.store = store
+        self.runner = runner
+        self.storage_dir = storage_dir
+        self.workers = max(1, workers)
+        self.max_queue_depth = max(1, max_queue_depth)
+        self.progress_interval = progress_interval
+        self.result_ttl = result_ttl  # seconds a finished job stays pollable; <= 0 keeps jobs forever
+        self._pending: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._cancel_requested = set()
+        self._cancel_lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Recover jobs left over from a previous run, then start the workers; a no-op once started"""
+        if self._threads:
+            return
+        os.makedirs(self.storage_dir, exist_ok=True)
+        self.prune()
+        self.recover()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"video-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def recover(self) -> int:
+        """Requeue jobs that were queued or interrupted mid-run when the process stopped"""
+        recovered = 0
+        for job in self.store.list_by_status(QUEUED, RUNNING):
+            if not os.path.exists(job.video_path):
+                self.store.transition(job.job_id, (QUEUED, RUNNING), FAILED,
+                                      finished_at=time.time(), error="Uploaded video was lost during restart")
+                continue
+            if job.status == RUNNING:
+                self.store.transition(job.job_id, (RUNNING,), QUEUED, started_at=None)
+            self._pending.put(job.job_id)
+            recovered += 1
+        return recovered
+
+    def prune(self) -> int:
+        """Delete finished jobs whose results have outlived result_ttl"""
+        if self.result_ttl <= 0:
+            return 0
+        return self.store.delete_finished(time.time() - self.result_ttl)
+
+    def submit(self, video_path: str, exercise_type: str, options: Dict[str, Any], total_frames: int) -> VideoJob:
+        """Persist a job for an already-spooled video; the queue takes ownership of the file"""
+        with self._submit_lock:
+            queued = self.store.count_by_status(QUEUED)
+            if queued >= self.max_queue_depth:
+                raise JobQueueFull(queued, retry_after=max(1, int(queued / self.workers) * 5))
+            job_id = uuid.uuid4().hex
+            job_path = os.path.join(self.storage_dir, job_id + os.path.splitext(video_path)[1])
+            shutil.move(video_path, job_path)
+            job = VideoJob(
+                job_id=job_id, status=QUEUED, exercise_type=exercise_type, options=options,
+                video_path=job_path, total_frames=total_frames, frames_analyzed=0,
+                last_frame_number=-1, created_at=time.time(), started_at=None,
+                finished_at=None, error=None
+            )
+            self.store.insert(job)
+        self._pending.put(job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[VideoJob]:
+        return self.store.get(job_id)
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get_result(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job immediately, or ask a running one to stop at its next frame"""
+        if self.store.transition(job_id, (QUEUED,), CANCELLED, finished_at=time.time()):
+            job = self.store.get(job_id)
+            self._remove_video(job.video_path)
+            return True
+        job = self.store.get(job_id)
+        if job is not None and job.status == RUNNING:
+            with self._cancel_lock:
+                self._cancel_requested.add(job_id)
+            return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'max_queue_depth': self.max_queue_depth,
+            'queued': self.store.count_by_status(QUEUED),
+            'running': self.store.count_by_status(RUNNING)
+        }
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._pending.put(None)
+
+    def _work(self):
+        while True:
+            job_id = self._pending.get()
+            if job_id is None:
+                return
+            if not self.store.transition(job_id, (QUEUED,), RUNNING, started_at=time.time()):
+                continue  # cancelled while waiting
+            job = self.store.get(job_id)
+            self._run(job)
+            self.prune()
+
+    def _run(self, job: VideoJob):
+        frames_analyzed = 0
+        last_flush = 0.0
+
+        def is_cancelled() -> bool:
+            with self._cancel_lock:
+                return job.job_id in self._cancel_requested
+
+        def on_record(record: Dict[str, Any]):
+            nonlocal frames_analyzed, last_flush
+            frames_analyzed += 1
+            now = time.time()
+            if now - last_flush >= self.progress_interval:
+                last_flush = now
+                self.store.update_progress(job.job_id, frames_analyzed, record["frame_number"])
+            if is_cancelled():
+                raise JobCancelled()
+
+        try:
+            result = self.runner(job, on_record)
+            self.store.update_progress(job.job_id, frames_analyzed, max(job.total_frames - 1, 0))
+            self.store.transition(job.job_id, (RUNNING,), SUCCEEDED, finished_at=time.time(), result=result)
+        except JobCancelled:
+            self.store.transition(job.job_id, (RUNNING,), CANCELLED, finished_at=time.time())
+        except Exception as e:
+            self.store.transition(job.job_id, (RUNNING,), FAILED, finished_at=time.time(), error=str(e))
+        finally:
+            with self._cancel_lock:
+                self._cancel_requested.discard(job.job_id)
+            self._remove_video(job.video_path)
+
+    @staticmethod
+    def _remove_video(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
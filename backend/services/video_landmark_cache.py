@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.posture_analyzer import PoseLandmarks
+from services.video_pipeline import FramePose, FrameSampling
+
+NUM_LANDMARKS = 33
+
+# One row per analyzed frame: x, y, z, visibility per landmark; NaN rows mean no pose was found
+SERIES_DTYPE = np.dtype([('frame', '<i4'), ('values', '<f4', (NUM_LANDMARKS, 4))])
+
+
+@dataclass
+class LandmarkSeries:
+    """Landmarks of every analyzed frame of one video, sorted by frame number"""
+    rows: np.ndarray   # SERIES_DTYPE records; may be a read-only memory map
+    fps: float
+    frame_limit: int   # targets at or past this frame are known to be unreadable
+
+    @classmethod
+    def from_frames(cls, frames: List[FramePose], sampling: FrameSampling,
+                    fps: float, frame_count: int) -> "LandmarkSeries":
+        """Build a series from one complete sampling pass over a video"""
+        rows = np.empty(len(frames), dtype=SERIES_DTYPE)
+        rows['values'] = np.nan
+        for i, frame in enumerate(frames):
+            rows['frame'][i] = frame.frame_number
+            if frame.pose is not None:
+                rows['values'][i, :, :3] = frame.pose.points
+                rows['values'][i, :, 3] = frame.pose.visibilities
+
+        # A pass stops at the first frame it cannot read, so the first target it
+        # did not return bounds the readable part of the video
+        analyzed = set(rows['frame'].tolist())
+        frame_limit = frame_count
+        for target in sampling.target_frames(fps):
+            if target >= frame_count:
+                break
+            if target not in analyzed:
+                frame_limit = target
+                break
+        return cls(rows, fps, frame_limit)
+
+    def lookup(self, sampling: FrameSampling) -> Optional[List[FramePose]]:
+        """Poses for every target frame of sampling, or None unless all of them are cached"""
+        targets = []
+        for target in sampling.target_frames(self.fps):
+            if target >= self.frame_limit:
+                break
+            targets.append(target)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        frame_numbers = self.rows['frame']
+        positions = np.searchsorted(frame_numbers, targets)
+        if len(targets) and (positions.max() >= len(frame_numbers)
+                             or not np.array_equal(frame_numbers[positions], targets)):
+            return None
+
+        values = np.asarray(self.rows['values'][positions], dtype=np.float64)
+        frames = []
+        for target, frame_values in zip(targets.tolist(), values):
+            pose = None
+            if not np.isnan(frame_values[0, 0]):
+                pose = PoseLandmarks(landmarks=frame_values[:, :3].reshape(-1), visibilities=frame_values[:, 3])
+            frames.append(FramePose(target, target / self.fps if self.fps > 0 else 0, pose))
+        return frames
+
+    def merge(self, other: "LandmarkSeries") -> "LandmarkSeries":
+        """Union of two passes over the same video; this series wins on shared frames"""
+        rows = np.concatenate([np.asarray(self.rows), np.asarray(other.rows)])
+        _, first = np.unique(rows['frame'], return_index=True)  # sorted, first occurrence kept
+        return LandmarkSeries(rows[first], self.fps, min(self.frame_limit, other.frame_limit))
+
+
+class VideoLandmarkCache:
+    """On-disk landmark series keyed by video content hash, evicted LRU within a disk budget"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for_file(path: str, variant: str = "", chunk_size: int = 1 << 20) -> str:
+        """Content address of a video file; variant names the settings that shaped its landmarks"""
+        digest = hashlib.blake2b(variant.encode('utf-8'), digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def load(self, key: str) -> Optional[LandmarkSeries]:
+        """Memory-map a cached series, or None if this video has not been analyzed"""
+        rows_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            rows = np.load(rows_path, mmap_mode='r')
+            fps, frame_limit = meta['fps'], meta['frame_limit']
+            os.utime(rows_path)  # recency for LRU eviction
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Discarding unreadable landmark cache entry {key}: {e}")
+            self._remove(key)
+            return None
+        if rows.dtype != SERIES_DTYPE:
+            self._remove(key)
+            return None
+        return LandmarkSeries(rows, fps, frame_limit)
+
+    def lookup(self, key: str, sampling: FrameSampling) -> Optional[List[FramePose]]:
+        """Cached poses for sampling when an earlier pass covered every target frame"""
+        series = self.load(key)
+        frames = series.lookup(sampling) if series is not None else None
+        with self._lock:
+            if frames is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return frames
+
+    def store(self, key: str, series: LandmarkSeries):
+        """Merge a new pass into the cached series for this video, then enforce the disk budget"""
+        existing = self.load(key)
+        if existing is not None:
+            series = series.merge(existing)
+        rows_path, meta_path = self._paths(key)
+        # Write to temp files and rename so readers never map a half-written series
+        self._write_atomic(rows_path, lambda f: np.save(f, np.asarray(series.rows)))
+        self._write_atomic(meta_path, lambda f: f.write(
+            json.dumps({'fps': series.fps, 'frame_limit': series.frame_limit}).encode()
+        ))
+        self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.npy', base + '.json'
+
+    def _write_atomic(self, path: str, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def _entries(self) -> List[tuple]:
+        """(key, bytes, last used) for every cached series"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npy'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((name[:-4], st.st_size, st.st_mtime))
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            for key, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(key)
+                total -= size
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,286 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from services.landmark_flow import FlowTracking, LandmarkFlowTracker
+from services.posture_analyzer import PostureAnalysis, PoseLandmarks
+from services.video_tracking import VideoPoseTracker
+
+_END = object()  # end-of-stream marker passed between pipeline stages
+
+
+class VideoOpenError(Exception):
+    """Raised when OpenCV cannot open the uploaded video"""
+
+
+@dataclass
+class SampledFrame:
+    index: int          # position among sampled frames, used to restore order
+    frame_number: int   # position in the source video
+    timestamp: float    # seconds from the start of the video
+    image: np.ndarray
+    position_ms: float = 0.0  # decoder timestamp (CAP_PROP_POS_MSEC), for tracking graphs
+
+
+@dataclass
+class FramePose:
+    """Pose inference result for one sampled video frame"""
+    frame_number: int
+    timestamp: float
+    pose: Optional[PoseLandmarks]
+
+
+@dataclass
+class VideoSummary:
+    """Running aggregate over per-frame analysis records"""
+    frames_analyzed: int = 0
+    form_score_total: float = 0.0
+    correct_frames: int = 0
+
+    def add(self, record: Dict[str, Any]):
+        self.frames_analyzed += 1
+        self.form_score_total += record["form_score"]
+        if record["is_correct_form"]:
+            self.correct_frames += 1
+
+    @property
+    def average_form_score(self) -> float:
+        return self.form_score_total / self.frames_analyzed if self.frames_analyzed else 0
+
+    @property
+    def correct_form_percentage(self) -> float:
+        return self.correct_frames / self.frames_analyzed * 100 if self.frames_analyzed else 0
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "VideoSummary":
+        summary = cls()
+        for record in records:
+            summary.add(record)
+        return summary
+
+
+def spool_upload(source: BinaryIO, suffix: str = ".mp4", chunk_size: int = 1 << 20) -> str:
+    """Copy an upload to a uniquely named temp file in fixed-size chunks and return its path"""
+    fd, path = tempfile.mkstemp(prefix="fitness_video_", suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(source, f, chunk_size)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def open_video(path: str) -> Tuple[cv2.VideoCapture, int, float]:
+    """Open a video and return (capture, frame_count, fps)"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise VideoOpenError("Could not open video file")
+    return cap, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS)
+
+
+@dataclass
+class FrameSampling:
+    """Which frames of a video get analyzed"""
+    frame_interval: int = 5                      # analyze every nth frame...
+    analyses_per_second: Optional[float] = None  # ...or this many frames per second of video
+    seek_min_gap: int = 90                       # gaps at least this long seek instead of grabbing
+
+    def target_frames(self, fps: float) -> Iterator[int]:
+        """Frame numbers to analyze, in increasing order"""
+        if self.analyses_per_second and self.analyses_per_second > 0 and fps > 0:
+            step = fps / self.analyses_per_second
+            if step <= 1:
+                step = 1.0
+        else:
+            step = float(max(1, self.frame_interval))
+        k = 0
+        last = -1
+        while True:
+            target = int(round(k * step))
+            k += 1
+            if target > last:
+                last = target
+                yield target
+
+
+def iter_sampled_frames(cap: cv2.VideoCapture, fps: float, sampling: FrameSampling,
+                        start_frame: int = 0, end_frame: Optional[int] = None) -> Iterator[SampledFrame]:
+    """Yield only the sampled frames, without decoding the ones in between
+
+    Skipped frames are demuxed with grab() and never decoded or color-converted;
+    only sampled frames pay for retrieve(). Long gaps (sparse sampling) seek
+    straight to the target so the decoder restarts from the nearest keyframe.
+    start_frame/end_frame restrict sampling to one segment while keeping the
+    same frame numbers and indices as a full pass.
+    """
+    position = 0  # number of the next frame grab() would return
+    for index, target in enumerate(sampling.target_frames(fps)):
+        if target < start_frame:
+            continue
+        if end_frame is not None and target >= end_frame:
+            return
+        gap = target - position
+        if position == 0 and target > 0 and cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+            # Segment start: jump straight there whatever the gap
+            position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+            gap = target - position
+        elif gap >= sampling.seek_min_gap and cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+            position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+            gap = target - position  # backends may land slightly before the target
+        while gap > 0:
+            if not cap.grab():
+                return
+            position += 1
+            gap -= 1
+        if not cap.grab():
+            return
+        position += 1
+        ret, frame = cap.retrieve()
+        if not ret:
+            return
+        timestamp = target / fps if fps > 0 else 0
+        position_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if position_ms <= 0 and target > 0:
+            position_ms = timestamp * 1000  # backend without timestamps
+        yield SampledFrame(index, target, timestamp, frame, position_ms)
+
+
+def make_frame_detector(detect_image: Callable[[np.ndarray], Optional[PoseLandmarks]],
+                        tracker: Optional[VideoPoseTracker] = None,
+                        flow: Optional[FlowTracking] = None) -> Callable[[SampledFrame], Optional[PoseLandmarks]]:
+    """Pose source for one video: still-image inference or a tracking graph, optionally with optical flow
+
+    With a tracker or flow the detector is stateful and must see frames in order.
+    """
+    if tracker is not None:
+        infer = lambda frame: tracker.detect(frame.image, frame.position_ms)
+    else:
+        infer = lambda frame: detect_image(frame.image)
+    if flow is None or flow.keyframe_interval <= 1:
+        return infer
+    flow_tracker = LandmarkFlowTracker(flow)
+    return lambda frame: flow_tracker.track(frame.image, lambda: infer(frame))
+
+
+def frame_record(frame: FramePose, analysis: PostureAnalysis) -> Dict[str, Any]:
+    """Per-frame entry of the /analyze-video frame_analyses list"""
+    return {
+        "frame_number": frame.frame_number,
+        "timestamp": frame.timestamp,
+        "form_score": analysis.form_score,
+        "is_correct_form": analysis.is_correct_form,
+        "corrections": analysis.corrections
+    }
+
+
+class VideoAnalysisPipeline:
+    """Decode -> analyze pipeline: a decoder thread feeds a bounded queue drained by analyzer workers"""
+
+    def __init__(self, analyzer_pool, workers: Optional[int] = None, queue_size: int = 8,
+                 tracking: bool = False):
+        self.analyzer_pool = analyzer_pool
+        self.workers = max(1, workers or analyzer_pool.size)
+        self.queue_size = max(1, queue_size)
+        # Give each video its own tracking-mode graph instead of the pool's still-image graphs
+        self.tracking = tracking
+
+    def run_poses(self, path: str, sampling: Optional[FrameSampling] = None,
+                  flow: Optional[FlowTracking] = None) -> Iterator[FramePose]:
+        """Yield the pose of every sampled frame, in frame order; scoring is left to the caller"""
+        sampling = sampling or FrameSampling()
+        # Decoded video frames practically never repeat, so skip hashing them
+        detect_image = lambda image: self.analyzer_pool.detect_pose(image, use_cache=False)
+        if not self.tracking and (flow is None or flow.keyframe_interval <= 1):
+            yield from self._run(path, sampling, make_frame_detector(detect_image), self.workers)
+            return
+
+        # Tracking graphs and optical flow depend on the previous frame, so one
+        # worker consumes frames in order; decoding still overlaps with it
+        tracker = VideoPoseTracker() if self.tracking else None
+        try:
+            yield from self._run(path, sampling, make_frame_detector(detect_image, tracker, flow), 1)
+        finally:
+            if tracker is not None:
+                tracker.close()  # released with the request, even when the client goes away
+
+    def _run(self, path: str, sampling: FrameSampling,
+             detect: Callable[[SampledFrame], Optional[PoseLandmarks]], workers: int) -> Iterator[FramePose]:
+        cap, _, fps = open_video(path)
+        frames: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        results: "queue.Queue" = queue.Queue()
+        stop = threading.Event()
+
+        def put_frame(item) -> bool:
+            # Bounded put that gives up once the consumer has gone away
+            while not stop.is_set():
+                try:
+                    frames.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def decode():
+            try:
+                for frame in iter_sampled_frames(cap, fps, sampling):
+                    if not put_frame(frame):
+                        return
+            except Exception as e:
+                results.put(e)
+            finally:
+                cap.release()
+                for _ in range(workers):
+                    put_frame(_END)
+
+        def analyze():
+            try:
+                while not stop.is_set():
+                    frame = frames.get()
+                    if frame is _END:
+                        break
+                    pose = detect(frame)
+                    results.put((frame.index, FramePose(frame.frame_number, frame.timestamp, pose)))
+            except Exception as e:
+                results.put(e)
+            finally:
+                results.put(_END)
+
+        threads = [threading.Thread(target=decode, name="video-decode", daemon=True)]
+        threads += [threading.Thread(target=analyze, name=f"video-analyze-{i}", daemon=True)
+                    for i in range(workers)]
+        for thread in threads:
+            thread.start()
+
+        # Workers finish out of order; hold early results until the gap before them fills
+        pending: Dict[int, FramePose] = {}
+        next_index = 0
+        finished_workers = 0
+        try:
+            while finished_workers < workers:
+                item = results.get()
+                if item is _END:
+                    finished_workers += 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                index, frame_pose = item
+                pending[index] = frame_pose
+                while next_index in pending:
+                    yield pending.pop(next_index)
+                    next_index += 1
+        finally:
+            stop.set()
+            # Unblock workers waiting on an empty queue after early termination
+            for _ in range(workers):
+                try:
+                    frames.put_nowait(_END)
+                except queue.Full:
+                    break
@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from services.landmark_flow import FlowTracking
+from services.posture_analyzer import PostureAnalyzer
+from services.video_pipeline import FramePose, FrameSampling, iter_sampled_frames, make_frame_detector, open_video
+from services.video_tracking import VideoPoseTracker
+
+# One analyzer (and MediaPipe graph) per worker process, created by the pool initializer
+_worker_analyzer: Optional[PostureAnalyzer] = None
+
+
+def _init_worker():
+    global _worker_analyzer
+    _worker_analyzer = PostureAnalyzer()
+
+
+def _detect_segment(path: str, sampling: FrameSampling, start_frame: int, end_frame: Optional[int],
+                    flow: Optional[FlowTracking] = None, tracking: bool = False) -> List[FramePose]:
+    """Run pose inference on the sampled frames in [start_frame, end_frame) with this process's analyzer"""
+    # Each segment starts its own tracking graph and its own first keyframe
+    tracker = VideoPoseTracker() if tracking else None
+    detect = make_frame_detector(_worker_analyzer.detect_pose, tracker, flow)
+    cap, _, fps = open_video(path)
+    try:
+        return [
+            FramePose(frame.frame_number, frame.timestamp, detect(frame))
+            for frame in iter_sampled_frames(cap, fps, sampling, start_frame, end_frame)
+        ]
+    finally:
+        cap.release()
+        if tracker is not None:
+            tracker.close()
+
+
+def split_segments(frame_count: int, segments: int, min_segment_frames: int) -> List[Tuple[int, int]]:
+    """Split [0, frame_count) into at most `segments` contiguous ranges of similar length"""
+    if frame_count <= 0:
+        return []
+    segments = max(1, min(segments, frame_count // max(1, min_segment_frames)))
+    bounds = [round(i * frame_count / segments) for i in range(segments + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(segments) if bounds[i] < bounds[i + 1]]
+
+
+class VideoShardAnalyzer:
+    """Analyze one video across worker processes, one time segment per process"""
+
+    def __init__(self, processes: Optional[int] = None, min_segment_seconds: float = 5.0,
+                 tracking: bool = False):
+        self.processes = max(1, processes or os.cpu_count() or 1)
+        self.min_segment_seconds = min_segment_seconds
+        self.tracking = tracking
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Started lazily so API startup does not pay for N MediaPipe graphs up front
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),  # MediaPipe is not fork-safe
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    def analyze_poses(self, path: str, sampling: FrameSampling, segments: Optional[int] = None,
+                      flow: Optional[FlowTracking] = None) -> List[FramePose]:
+        """Return the pose of every sampled frame in the whole video, in frame order"""
+        cap, frame_count, fps = open_video(path)
+        cap.release()
+
+        min_segment_frames = max(1, int(self.min_segment_seconds * fps)) if fps > 0 else 1
+        ranges = split_segments(frame_count, segments or self.processes, min_segment_frames)
+        if not ranges:
+            # Unknown frame count (e.g. some streamed containers): one segment to the end
+            ranges = [(0, None)]
+
+        executor = self._get_executor()
+        futures = [
+            executor.submit(_detect_segment, path, sampling, start, end, flow, self.tracking)
+            for start, end in ranges
+        ]
+        # Segments are contiguous and each is internally ordered, so concatenation is the merge
+        frames: List[FramePose] = []
+        for future in futures:
+            frames.extend(future.result())
+        return frames
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
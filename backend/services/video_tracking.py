@@ -0,0 +1,58 @@
+import threading
+from typing import Any, Callable, Optional
+
+import cv2
+import numpy as np
+
+from services.posture_analyzer import PoseLandmarks, create_tracking_pose, to_pose_landmarks
+
+
+class VideoPoseTracker:
+    """Tracking-mode Pose graph owned by one video analysis and fed its frames in time order
+
+    After the first detection the graph follows the person from the previous
+    frame's landmarks instead of running person detection on every frame.
+    """
+
+    def __init__(self, pose_factory: Callable[[], Any] = create_tracking_pose):
+        self._pose = pose_factory()
+        self._lock = threading.Lock()
+        self._last_timestamp_us = -1
+        self.closed = False
+        self.frames_processed = 0
+
+    def detect(self, image: np.ndarray, timestamp_ms: float, is_rgb: bool = False) -> Optional[PoseLandmarks]:
+        """Landmarks for the next frame; timestamps are forced to increase strictly"""
+        rgb_image = image if is_rgb else cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        with self._lock:
+            if self.closed:
+                return None
+            timestamp_us = max(int(timestamp_ms * 1000), self._last_timestamp_us + 1)
+            # The legacy solutions API takes no timestamp and stamps packets from
+            # _simulated_timestamp in fixed 33 ms steps; seed it with the real
+            # frame time so the graph's landmark filters see the true spacing
+            if hasattr(self._pose, '_simulated_timestamp'):
+                self._pose._simulated_timestamp = timestamp_us
+            self._last_timestamp_us = timestamp_us
+            self.frames_processed += 1
+            try:
+                return to_pose_landmarks(self._pose.process(rgb_image))
+            except Exception as e:
+                print(f"Error tracking video pose: {e}")
+                return None
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            try:
+                self._pose.close()
+            except Exception as e:
+                print(f"Error closing video pose tracker: {e}")
+
+    def __enter__(self) -> "VideoPoseTracker":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
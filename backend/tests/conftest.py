@@ -0,0 +1,74 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+# Tests import modules the way the app does: `from services.X import ...`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """A 2 s, 30 fps MJPEG clip whose frames differ in brightness"""
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(60):
+        writer.write(np.full((48, 64, 3), i * 4, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+class FakePose:
+    """Stands in for mp.solutions.pose.Pose: finds the same upright figure in every image"""
+
+    def __init__(self, **kwargs):
+        self.model_complexity = kwargs.get("model_complexity", 0)
+
+    def process(self, rgb):
+        landmarks = [SimpleNamespace(x=0.5, y=0.1 + i * 0.025, z=0.0, visibility=0.9) for i in range(33)]
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=landmarks))
+
+    def close(self):
+        pass
+
+
+def _fake_pose_graphs(patch):
+    import mediapipe as mp
+    if hasattr(mp, "solutions"):
+        patch.setattr(mp.solutions.pose, "Pose", FakePose)
+    else:
+        patch.setattr(mp, "solutions", SimpleNamespace(pose=SimpleNamespace(Pose=FakePose)), raising=False)
+
+
+@pytest.fixture
+def fake_pose(monkeypatch):
+    """MediaPipe Pose graphs replaced by FakePose for one test"""
+    _fake_pose_graphs(monkeypatch)
+
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """api.main imported with fake Pose graphs and scratch storage; MediaPipe is restored afterwards"""
+    storage = tmp_path_factory.mktemp("api")
+    with pytest.MonkeyPatch.context() as patch:
+        _fake_pose_graphs(patch)
+        patch.setenv("VIDEO_JOB_DIR", str(storage / "jobs"))
+        patch.setenv("VIDEO_LANDMARK_CACHE_DIR", str(storage / "landmarks"))
+        import api.main
+        yield api.main
+
+
+@pytest.fixture
+def client(api):
+    from fastapi.testclient import TestClient
+    with TestClient(api.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def jpeg():
+    ok, encoded = cv2.imencode(".jpg", np.full((120, 160, 3), 128, dtype=np.uint8))
+    return encoded.tobytes()
@@ -0,0 +1,63 @@
+import numpy as np
+
+from services.analyzer_pool import AnalyzerPool
+from services.landmark_cache import LandmarkCache
+from services.posture_analyzer import PoseLandmarks
+
+
+class Analyzer:
+    def __init__(self, **options):
+        self.options = options
+
+
+def test_deferred_pool_builds_its_workers_once_on_start():
+    built = []
+    pool = AnalyzerPool(size=2, analyzer_factory=lambda **options: built.append(Analyzer(**options)) or built[-1],
+                        start=False)
+    assert built == []
+    assert pool.form_rules.exercises  # exercise types are known before any graph exists
+
+    pool.start()
+    pool.start()
+
+    assert len(built) == 2
+    assert all(analyzer.options['form_rules'] is pool.form_rules for analyzer in built)
+    with pool.worker() as analyzer:
+        assert analyzer in built
+
+
+class Controller:
+    tiers = [0, 1]
+
+    def __init__(self, tier):
+        self.tier = tier
+
+    def choose(self):
+        return self.tier
+
+    def record(self, tier, latency):
+        pass
+
+
+class Detector:
+    def __init__(self, **options):
+        self.calls = []
+
+    def detect_pose(self, image, session_id=None, is_rgb=False, roi=None, model_complexity=None):
+        self.calls.append(model_complexity)
+        return PoseLandmarks(np.zeros(99), np.ones(33), model_complexity=model_complexity)
+
+
+def test_cached_landmarks_are_reused_only_for_the_same_model_tier():
+    controller = Controller(0)
+    pool = AnalyzerPool(size=1, analyzer_factory=Detector, landmark_cache=LandmarkCache(),
+                        complexity_controller=controller)
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    assert pool.detect_pose(image).model_complexity == 0
+    assert pool.detect_pose(image).model_complexity == 0
+    controller.tier = 1
+    assert pool.detect_pose(image).model_complexity == 1
+
+    with pool.worker() as detector:
+        assert detector.calls == [0, 1]
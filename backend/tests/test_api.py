@@ -0,0 +1,149 @@
+import json
+import struct
+import threading
+import time
+
+from services.inference_executor import InferenceExecutor
+
+
+def test_batch_results_come_back_in_order_with_their_own_errors(client, jpeg):
+    files = [("files", ("a.jpg", jpeg)), ("files", ("b.jpg", b"not an image")), ("files", ("c.jpg", jpeg))]
+    response = client.post("/analyze-posture/batch", files=files, data={"exercise_type": "squat"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+    assert [result["status"] for result in body["results"]] == [200, 400, 200]
+    assert body["failed"] == 1
+    assert "form_score" in body["results"][0]
+
+
+def test_batch_accepts_length_prefixed_body(client, jpeg):
+    body = b"".join(struct.pack(">I", len(jpeg)) + jpeg for _ in range(2))
+    response = client.post("/analyze-posture/batch?exercise_type=pushup", content=body,
+                           headers={"content-type": "application/x-image-batch"})
+
+    assert response.status_code == 200
+    assert response.json()["exercise_type"] == "pushup"
+    assert response.json()["count"] == 2
+
+
+def test_saturated_server_rejects_the_whole_batch(api, client, jpeg, monkeypatch):
+    executor = InferenceExecutor(max_in_flight=1, max_queue=0)
+    monkeypatch.setattr(api, "inference_executor", executor)
+    release = threading.Event()
+    blocker = executor.submit(release.wait)
+    try:
+        response = client.post("/analyze-posture/batch", files=[("files", ("a.jpg", jpeg))] * 3)
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+    finally:
+        release.set()
+        blocker.result(timeout=5)
+        executor.shutdown()
+
+
+def test_stream_video_answers_503_when_saturated(api, client, video_path, monkeypatch):
+    executor = InferenceExecutor(max_in_flight=1, max_queue=0)
+    monkeypatch.setattr(api, "inference_executor", executor)
+    release = threading.Event()
+    blocker = executor.submit(release.wait)
+    try:
+        with open(video_path, "rb") as video:
+            response = client.post("/analyze-video", files={"file": ("clip.avi", video)}, data={"stream": "true"})
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+    finally:
+        release.set()
+        blocker.result(timeout=5)
+        executor.shutdown()
+
+
+def test_stream_video_yields_frames_then_summary(client, video_path):
+    with open(video_path, "rb") as video:
+        response = client.post("/analyze-video", files={"file": ("clip.avi", video)},
+                               data={"stream": "true", "frame_interval": "10"})
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert {line["type"] for line in lines[:-1]} == {"frame"}
+    assert lines[-1]["type"] == "summary"
+
+
+def test_exercise_types_follow_the_form_rules(api, client, jpeg):
+    assert api.VALID_EXERCISES == list(api.posture_analyzer.form_rules.rules)
+    response = client.post("/analyze-posture/batch", files=[("files", ("a.jpg", jpeg))],
+                           data={"exercise_type": "handstand"})
+    assert response.status_code == 400
+
+
+def test_video_frames_are_scored_in_batches(api, client, video_path, monkeypatch):
+    batches = []
+    score_poses = api.posture_analyzer.score_poses
+    monkeypatch.setattr(api.posture_analyzer, "score_poses",
+                        lambda poses, exercise_type: batches.append(len(poses)) or score_poses(poses, exercise_type))
+    with open(video_path, "rb") as video:
+        response = client.post("/analyze-video", files={"file": ("clip.avi", video)}, data={"frame_interval": "5"})
+
+    assert response.status_code == 200
+    assert len(response.json()["frame_analyses"]) == 12
+    assert batches == [12]  # one evaluation for the whole clip
+
+
+def test_websocket_analyzes_frames_and_releases_its_session(api, client, jpeg):
+    with client.websocket_connect("/ws/analyze?exercise_type=squat") as websocket:
+        websocket.send_bytes(jpeg)
+        result = websocket.receive_json()
+        assert result["type"] == "analysis" and result["frame"] == 1
+        assert "reps" in result
+        websocket.send_text(json.dumps({"exercise_type": "pushup"}))
+        websocket.send_bytes(jpeg)
+        assert websocket.receive_json()["exercise_type"] == "pushup"
+        websocket.send_bytes(jpeg)  # still in flight when the client leaves
+
+    sessions = api.posture_analyzer.sessions
+    deadline = time.time() + 5
+    while len(sessions) and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(sessions) == 0
+
+
+def test_video_summary_reps_replaces_frame_analyses(client, video_path):
+    with open(video_path, "rb") as video:
+        response = client.post("/analyze-video", files={"file": ("clip.avi", video)},
+                               data={"summary": "reps", "frame_interval": "5"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert "frame_analyses" not in body
+    assert body["rep_count"] == len(body["reps"]) == 0  # the fake figure never moves
+
+
+def test_video_summary_reps_cannot_be_streamed(client, video_path):
+    with open(video_path, "rb") as video:
+        response = client.post("/analyze-video", files={"file": ("clip.avi", video)},
+                               data={"summary": "reps", "stream": "true"})
+    assert response.status_code == 400
+
+
+def test_video_job_runs_in_the_background_and_keeps_its_result(client, video_path):
+    with open(video_path, "rb") as video:
+        response = client.post("/video-jobs", files={"file": ("clip.avi", video)}, data={"frame_interval": "10"})
+    assert response.status_code == 202
+    job = response.json()
+
+    deadline = time.monotonic() + 10
+    while job["status"] in ("queued", "running") and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(job["status_url"]).json()
+
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 100.0
+    result = client.get(job["result_url"]).json()
+    assert len(result["frame_analyses"]) == 6
+    assert client.delete(job["status_url"]).status_code == 409  # already finished
+
+
+def test_unknown_video_job_is_404(client):
+    assert client.get("/video-jobs/missing").status_code == 404
+    assert client.get("/video-jobs/missing/result").status_code == 404
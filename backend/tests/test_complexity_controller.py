@@ -0,0 +1,49 @@
+from services import complexity_controller
+from services.complexity_controller import ComplexityController
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def record(controller, tier, latency_s, count=10):
+    for _ in range(count):
+        controller.record(tier, latency_s)
+
+
+def test_steps_down_under_queueing_and_back_up_when_idle(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(complexity_controller.time, "monotonic", clock)
+    depth = [0]
+    controller = ComplexityController(tiers=(0, 1), slo_ms=150, queue_depth=lambda: depth[0], cooldown=1)
+
+    record(controller, 0, 0.02)
+    assert controller.choose() == 1  # idle and tier 1 is expected to fit the SLO
+
+    # A load peak: tier 1 goes slow while requests queue up
+    record(controller, 1, 0.4)
+    depth[0] = 3
+    clock.now += 2
+    assert controller.choose() == 0
+
+    # Idle again: the peak's tier-1 samples must not keep it from upgrading
+    depth[0] = 0
+    record(controller, 0, 0.02)
+    clock.now += 2
+    assert controller.choose() == 1
+    assert controller.stats()['upgrades'] == 2 and controller.stats()['downgrades'] == 1
+
+
+def test_old_samples_expire(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(complexity_controller.time, "monotonic", clock)
+    controller = ComplexityController(tiers=(0, 1), max_sample_age=30)
+
+    record(controller, 1, 0.4)
+    assert controller.stats()['p95_ms'][1] == 400.0
+    clock.now += 31
+    assert controller.stats()['p95_ms'][1] is None
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from services.form_rules import DEFAULT_EXERCISE_SCORE, FEATURE_NAMES, FormRuleEngine, compile_rules
+
+RULES = {
+    'curl': [
+        {'feature': 'elbow_angle', 'band': (40, 60), 'tolerance': 20, 'weight': 3,
+         'too_low': "Don't over-curl", 'too_high': "Curl higher"},
+        {'feature': 'trunk_lean', 'band': (0, 10), 'tolerance': 10, 'weight': 1,
+         'too_high': "Stop swinging"},
+    ]
+}
+
+
+def features(**values):
+    row = np.full((1, len(FEATURE_NAMES)), np.nan)
+    for name, value in values.items():
+        row[0, FEATURE_NAMES.index(name)] = value
+    return row
+
+
+def test_rules_score_one_inside_the_band_and_fall_off_linearly():
+    engine = FormRuleEngine(RULES)
+    inside = engine.evaluate('curl', features(elbow_angle=50, trunk_lean=5))
+    assert inside.exercise_score[0] == 1.0
+    assert inside.corrections() == []
+
+    halfway = engine.evaluate('curl', features(elbow_angle=70, trunk_lean=5))
+    assert np.allclose(halfway.rule_scores, [[0.5, 1.0]])
+    assert np.isclose(halfway.exercise_score[0], (0.5 * 3 + 1.0) / 4)
+
+
+def test_failing_rules_report_the_message_for_their_side():
+    engine = FormRuleEngine(RULES)
+    evaluation = engine.evaluate('curl', np.vstack([features(elbow_angle=20, trunk_lean=30),
+                                                    features(elbow_angle=90, trunk_lean=5)]))
+    assert evaluation.corrections(0) == ["Don't over-curl", "Stop swinging"]
+    assert evaluation.corrections(1) == ["Curl higher"]
+
+
+def test_unmeasurable_features_drop_out_of_the_score():
+    engine = FormRuleEngine(RULES)
+    evaluation = engine.evaluate('curl', features(elbow_angle=50))
+    assert evaluation.exercise_score[0] == 1.0
+    assert np.isnan(evaluation.rule_scores[0, 1])
+    assert engine.evaluate('curl', features()).exercise_score[0] == 0.0
+
+
+def test_exercises_without_rules_get_the_default_score():
+    evaluation = FormRuleEngine(RULES).evaluate('yoga', features(elbow_angle=50))
+    assert evaluation.exercise_score[0] == DEFAULT_EXERCISE_SCORE
+    assert evaluation.corrections() == []
+
+
+def test_unknown_features_are_rejected_at_compile_time():
+    with pytest.raises(ValueError, match="grip_width"):
+        compile_rules([{'feature': 'grip_width', 'band': (0, 1), 'tolerance': 1}])
+
+
+def test_features_are_measured_from_landmarks():
+    frame = np.zeros((33, 3))
+    frame[[11, 12], :2] = [[0.45, 0.2], [0.55, 0.2]]  # shoulders
+    frame[[23, 24], :2] = [[0.45, 0.5], [0.55, 0.5]]  # hips
+    frame[[25, 26], :2] = [[0.45, 0.7], [0.55, 0.7]]  # knees straight below the hips
+    frame[[27, 28], :2] = [[0.65, 0.7], [0.75, 0.7]]  # ankles out to the side: 90-degree knees
+
+    row = FormRuleEngine().features(frame)[0]
+    assert np.isclose(row[FEATURE_NAMES.index('knee_angle')], 90.0)
+    assert np.isclose(row[FEATURE_NAMES.index('trunk_lean')], 0.0)
+    assert np.isclose(row[FEATURE_NAMES.index('knee_width_ratio')], 1.0)
+    assert np.isnan(row[FEATURE_NAMES.index('hip_offset')])  # upright body: no hip line
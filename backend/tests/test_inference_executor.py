@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from services.inference_executor import InferenceExecutor, InferenceSaturated
+
+
+def test_submit_batch_bounds_concurrency_and_keeps_order():
+    executor = InferenceExecutor(max_in_flight=2, max_queue=0)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def work(value):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return value * 10
+
+    # More items than the executor's whole capacity still fit as one batch
+    futures = executor.submit_batch(work, [(i,) for i in range(7)])
+
+    assert [future.result(timeout=5) for future in futures] == [i * 10 for i in range(7)]
+    assert peak[0] == 1  # one worker is held back for single requests
+    executor.shutdown()
+    assert executor.stats()['completed'] == 7
+    assert executor.queue_depth() == 0 and executor.in_flight() == 0
+
+
+def test_submit_batch_is_rejected_as_a_whole():
+    executor = InferenceExecutor(max_in_flight=2, max_queue=0)
+    release = threading.Event()
+    blockers = [executor.submit(release.wait), executor.submit(release.wait)]
+    try:
+        with pytest.raises(InferenceSaturated):
+            executor.submit_batch(lambda value: value, [(1,), (2,)])
+        assert executor.stats()['rejected'] == 1
+    finally:
+        release.set()
+        for blocker in blockers:
+            blocker.result(timeout=5)
+    executor.shutdown()
+
+
+def test_submit_batch_uses_the_slots_that_are_free():
+    executor = InferenceExecutor(max_in_flight=3, max_queue=0)
+    release = threading.Event()
+    blocker = executor.submit(release.wait)
+    try:
+        # One of the two free workers runs the whole batch, the other stays open
+        futures = executor.submit_batch(lambda value: value, [(1,), (2,), (3,)])
+        assert [future.result(timeout=5) for future in futures] == [1, 2, 3]
+        assert executor.submit(lambda: "single").result(timeout=5) == "single"
+    finally:
+        release.set()
+        blocker.result(timeout=5)
+    executor.shutdown()
+
+
+def test_submit_batch_item_errors_stay_with_their_item():
+    executor = InferenceExecutor(max_in_flight=2)
+
+    def work(value):
+        if value == 1:
+            raise ValueError("bad item")
+        return value
+
+    futures = executor.submit_batch(work, [(0,), (1,), (2,)])
+
+    assert futures[0].result(timeout=5) == 0
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 2
+    executor.shutdown()
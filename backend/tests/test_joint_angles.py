@@ -0,0 +1,49 @@
+import numpy as np
+
+from services.joint_angles import JointAngleKernel, as_landmark_frames
+
+
+def frame_with(points):
+    """33 landmarks at the origin except the given index -> (x, y, z) ones"""
+    frame = np.zeros((33, 3))
+    for index, point in points.items():
+        frame[index] = point
+    return frame
+
+
+def test_angles_are_measured_at_the_vertex():
+    kernel = JointAngleKernel({'bent': (0, 1, 2), 'straight': (3, 4, 5)})
+    frame = frame_with({0: (0, 1, 0), 1: (0, 0, 0), 2: (1, 0, 0),
+                        3: (0, 0, 0), 4: (1, 0, 0), 5: (2, 0, 0)})
+
+    assert np.allclose(kernel.compute(frame), [[90.0, 180.0]])
+    assert kernel.compute_dict(frame) == {'bent': 90.0, 'straight': 180.0}
+
+
+def test_degenerate_joints_are_nan():
+    kernel = JointAngleKernel({'collapsed': (0, 1, 2)})
+    assert np.isnan(kernel.compute(frame_with({0: (1, 1, 0)}))[0, 0])  # vertex and C coincide
+
+
+def test_trunk_angle_uses_virtual_midpoints():
+    kernel = JointAngleKernel()
+    upright = frame_with({11: (0.4, 0.2, 0), 12: (0.6, 0.2, 0), 23: (0.4, 0.6, 0), 24: (0.6, 0.6, 0)})
+    leaning = frame_with({11: (0.8, 0.6, 0), 12: (0.8, 0.6, 0), 23: (0.4, 0.6, 0), 24: (0.6, 0.6, 0)})
+
+    angles = kernel.compute(np.stack([upright, leaning]))
+    trunk = kernel.names.index('trunk_angle')
+    assert np.allclose(angles[:, trunk], [0.0, 90.0])
+
+
+def test_landmark_layouts_normalize_to_frames():
+    frame = np.arange(99, dtype=float)
+    assert as_landmark_frames(frame).shape == (1, 33, 3)
+    assert as_landmark_frames(frame.reshape(33, 3)).shape == (1, 33, 3)
+    assert as_landmark_frames(np.zeros((33, 4))).shape == (1, 33, 3)  # visibility dropped
+    assert as_landmark_frames(np.stack([frame, frame])).shape == (2, 33, 3)
+
+
+def test_too_few_landmarks_give_nan_angles_and_no_dict():
+    kernel = JointAngleKernel()
+    assert np.isnan(kernel.compute(np.zeros((2, 10, 3)))).all()
+    assert kernel.compute_dict(np.zeros((10, 3))) == {}
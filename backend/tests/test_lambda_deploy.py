@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_package_includes_every_service_the_handler_needs(monkeypatch):
+    pytest.importorskip("boto3")
+    monkeypatch.chdir(BACKEND)
+    monkeypatch.syspath_prepend(os.path.join(BACKEND, "lambda"))
+    import deploy
+
+    source_files = deploy.lambda_source_files()
+
+    assert source_files[0] == "lambda/lambda_handler.py"
+    assert all(os.path.exists(path) for path in source_files)
+    for module in ("posture_analyzer", "image_io", "joint_angles", "form_rules", "pose_sessions", "rep_counter"):
+        assert f"services/{module}.py" in source_files
+    assert len(set(source_files)) == len(source_files)
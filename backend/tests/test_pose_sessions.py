@@ -0,0 +1,99 @@
+import threading
+
+import numpy as np
+
+from services.form_rules import FEATURE_NAMES
+from services.pose_sessions import PoseSessionPool
+from services.posture_analyzer import PostureAnalysis, PostureAnalyzer
+
+
+class Graph:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_least_recently_used_session_is_evicted_and_closed():
+    pool = PoseSessionPool(Graph, max_sessions=2, idle_timeout=0)
+    first = pool.acquire("a")
+    second = pool.acquire("b")
+    pool.acquire("a")  # "b" is now the least recently used
+    pool.acquire("c")
+
+    assert "b" not in pool and "a" in pool and "c" in pool
+    assert second.pose.closed and not first.pose.closed
+    assert pool.stats()['sessions_evicted'] == 1
+
+
+def test_idle_sessions_are_evicted(monkeypatch):
+    import services.pose_sessions as pose_sessions
+    clock = [100.0]
+    monkeypatch.setattr(pose_sessions.time, "time", lambda: clock[0])
+    pool = PoseSessionPool(Graph, idle_timeout=60)
+    session = pool.acquire("a")
+
+    clock[0] += 61
+    assert pool.evict_idle() == 1
+    assert session.closed and session.pose.closed
+
+
+def test_get_never_creates_a_session():
+    pool = PoseSessionPool(Graph)
+    assert pool.get("missing") is None
+    session = pool.acquire("a")
+    assert pool.get("a") is session
+    assert pool.stats()['sessions_created'] == 1
+
+
+def test_counting_reps_after_the_session_ended_does_not_recreate_it(fake_pose):
+    analyzer = PostureAnalyzer()
+    features = np.full(len(FEATURE_NAMES), 170.0)
+    analysis = PostureAnalysis(exercise_type='squat', confidence=0.9, form_score=0.8, corrections=[],
+                               key_points={}, is_correct_form=True, features=features)
+    analyzer.sessions.acquire("ws-1")
+    analyzer.end_session("ws-1")
+
+    analyzer.count_reps("ws-1", analysis)
+
+    assert "ws-1" not in analyzer.sessions
+    assert analyzer.sessions.stats()['sessions_created'] == 1
+    assert analysis.rep_count is None
+
+
+def test_graphs_are_built_outside_the_pool_lock():
+    pool = None
+
+    def factory():
+        # Another thread can use the pool while a graph is being built
+        assert pool._lock.acquire(timeout=1)
+        pool._lock.release()
+        return Graph()
+
+    pool = PoseSessionPool(factory)
+    assert pool.acquire("a") is pool.acquire("a")
+    assert pool.stats()['sessions_created'] == 1
+
+
+def test_concurrent_first_frames_share_one_session():
+    started = threading.Barrier(2)
+    graphs = []
+
+    def factory():
+        graph = Graph()
+        graphs.append(graph)
+        started.wait(timeout=5)
+        return graph
+
+    pool = PoseSessionPool(factory)
+    sessions = []
+    threads = [threading.Thread(target=lambda: sessions.append(pool.acquire("a"))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert sessions[0] is sessions[1]
+    assert pool.stats()['sessions_created'] == 1
+    assert sorted(graph.closed for graph in graphs) == [False, True]  # the losing graph is closed
@@ -0,0 +1,55 @@
+import numpy as np
+
+from services.posture_analyzer import PoseLandmarks, PostureAnalyzer
+
+
+def standing_pose(shift=0.0):
+    points = np.column_stack([np.full(33, 0.5 + shift), np.linspace(0.1, 0.9, 33), np.zeros(33)])
+    points[[11, 23, 25, 27, 29, 31], 0] -= 0.05  # left side of the body
+    points[[12, 24, 26, 28, 30, 32], 0] += 0.05
+    return PoseLandmarks(landmarks=points.reshape(-1), visibilities=np.full(33, 0.9))
+
+
+def test_score_poses_matches_scoring_frame_by_frame(fake_pose):
+    analyzer = PostureAnalyzer()
+    out_of_frame = standing_pose(shift=0.6)  # most of the body beyond the right edge
+    poses = [standing_pose(), None, out_of_frame, standing_pose(shift=0.02)]
+
+    batch = analyzer.score_poses(poses, 'squat')
+
+    assert len(batch) == len(poses)
+    for pose, scored in zip(poses, batch):
+        single = analyzer.score_pose(pose, 'squat')
+        assert scored.form_score == single.form_score
+        assert scored.corrections == single.corrections
+        assert scored.is_correct_form == single.is_correct_form
+        assert (scored.features is None) == (single.features is None)
+    assert batch[1].confidence == 0.0
+    assert batch[2].form_score == 0.0 and batch[2].features is None
+    assert batch[0].features is not None
+    first, second = analyzer.score_poses([None, None], 'squat')
+    assert first is not second  # session frames get rep fields set on their own analysis
+
+
+def test_score_pose_keeps_the_per_frame_visibility_rules(fake_pose):
+    analyzer = PostureAnalyzer()
+    pose = standing_pose()
+    pose.visibilities[[25, 26, 27, 28]] = 0.1  # legs occluded
+
+    analysis = analyzer.score_pose(pose, 'squat')
+
+    assert analysis.form_score == 0.0
+    assert any("legs" in correction for correction in analysis.corrections)
+
+
+def test_higher_model_tiers_load_on_first_use(fake_pose):
+    analyzer = PostureAnalyzer(model_complexities=(0, 1, 2))
+    assert list(analyzer.static_poses) == [0]
+
+    image = np.full((48, 64, 3), 128, dtype=np.uint8)
+    pose = analyzer.detect_pose(image, model_complexity=2)
+
+    assert pose.model_complexity == 2
+    assert sorted(analyzer.static_poses) == [0, 2]
+    assert analyzer.detect_pose(image, model_complexity=5).model_complexity == 0
+    assert sorted(analyzer.static_poses) == [0, 2]
@@ -0,0 +1,64 @@
+import numpy as np
+
+from services.form_rules import FEATURE_NAMES
+from services.rep_counter import BOTTOM, CONCENTRIC, LOCKOUT, REP_PATTERNS, RepCounter
+
+
+def feed(counter, angles, step=0.1, form_score=0.8):
+    """Run knee angles through the counter at `step` seconds apart; returns the reps completed"""
+    row = np.full(len(FEATURE_NAMES), np.nan)
+    column = FEATURE_NAMES.index(counter.pattern.feature)
+    reps = []
+    for i, angle in enumerate(angles):
+        row[column] = angle
+        rep = counter.update(row, form_score, i * step)
+        if rep is not None:
+            reps.append(rep)
+    return reps
+
+
+def test_squat_rep_is_counted_with_its_tempo():
+    counter = RepCounter(REP_PATTERNS['squat'])
+    # lockout, 2 frames down, 2 frames at the bottom, 2 frames up, back to lockout
+    reps = feed(counter, [170, 140, 120, 95, 90, 130, 150, 170])
+
+    assert [rep.rep for rep in reps] == [1]
+    rep = reps[0]
+    assert rep.min_angle == 90
+    assert np.isclose(rep.duration, 0.6)
+    assert np.isclose(rep.eccentric_seconds, 0.2)
+    assert np.isclose(rep.pause_seconds, 0.2)
+    assert np.isclose(rep.concentric_seconds, 0.2)
+    assert rep.to_dict()['tempo'] == "0.2-0.2-0.2"
+    assert counter.phase == LOCKOUT
+
+
+def test_counting_starts_only_after_a_lockout():
+    counter = RepCounter(REP_PATTERNS['squat'])
+    assert feed(counter, [90, 130, 170]) == []  # started at the bottom
+    assert counter.phase == LOCKOUT
+
+
+def test_turning_back_before_depth_is_not_a_rep():
+    counter = RepCounter(REP_PATTERNS['squat'])
+    assert feed(counter, [170, 140, 120, 140, 170]) == []
+    assert counter.reps == 0
+
+
+def test_reps_faster_than_the_minimum_are_jitter():
+    counter = RepCounter(REP_PATTERNS['squat'])
+    assert feed(counter, [170, 140, 90, 130, 170], step=0.05) == []
+
+
+def test_unmeasurable_frames_hold_the_phase():
+    counter = RepCounter(REP_PATTERNS['squat'])
+    feed(counter, [170, 140, 90, 130])
+    assert counter.phase == CONCENTRIC
+    feed(counter, [np.nan])
+    assert counter.phase == CONCENTRIC
+
+
+def test_hysteresis_keeps_a_wobble_at_the_bottom():
+    counter = RepCounter(REP_PATTERNS['squat'])
+    feed(counter, [170, 140, 95, 105, 98])  # 105 is within the hysteresis band above 100
+    assert counter.phase == BOTTOM
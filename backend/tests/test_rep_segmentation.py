@@ -0,0 +1,53 @@
+import json
+import math
+from types import SimpleNamespace
+
+import numpy as np
+
+from services.form_rules import FEATURE_NAMES
+from services.rep_segmentation import RepTimeline, fill_gaps, segment_reps
+
+FPS = 30.0
+
+
+def squat_angles(reps=3, seconds_per_rep=2.0):
+    """Knee angle going 170 -> 80 -> 170 once per rep"""
+    t = np.arange(int(reps * seconds_per_rep * FPS)) / FPS
+    return t, 125 + 45 * np.cos(2 * np.pi * t / seconds_per_rep)
+
+
+def analysis(knee_angle):
+    features = np.full(len(FEATURE_NAMES), np.nan)
+    features[FEATURE_NAMES.index('knee_angle')] = knee_angle
+    return SimpleNamespace(features=features, form_score=0.8, is_correct_form=True)
+
+
+def test_segment_reps_finds_each_valley():
+    timestamps, angles = squat_angles(reps=3)
+    reps = segment_reps(angles, timestamps, min_prominence=30)
+    assert len(reps) == 3
+    for start, bottom, end in reps:
+        assert start < bottom < end
+        assert angles[bottom] < 85
+
+
+def test_fill_gaps_holds_edges_and_bridges_interior():
+    filled = fill_gaps(np.array([np.nan, 10.0, np.nan, 30.0, np.nan]))
+    assert filled.tolist() == [10.0, 10.0, 20.0, 30.0, 30.0]
+
+
+def test_timeline_with_unmeasured_edge_frames_stays_finite():
+    timestamps, angles = squat_angles(reps=3)
+    angles[:10] = np.nan   # person walking into frame
+    angles[-10:] = np.nan  # and out again
+    timeline = RepTimeline('squat')
+    for timestamp, angle in zip(timestamps, angles):
+        timeline.add(float(timestamp), analysis(angle))
+
+    reps = timeline.segment()
+
+    assert len(reps) == 3
+    for rep in reps:
+        assert math.isfinite(rep.min_angle) and math.isfinite(rep.range_of_motion)
+        assert rep.range_of_motion > 45
+    json.dumps([rep.to_dict() for rep in reps], allow_nan=False)
@@ -0,0 +1,39 @@
+import time
+
+from services.video_jobs import (
+    CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, VideoJob, VideoJobQueue, VideoJobStore
+)
+
+
+def make_job(job_id, status, finished_at=None):
+    return VideoJob(
+        job_id=job_id, status=status, exercise_type="squat", options={}, video_path=f"/missing/{job_id}.mp4",
+        total_frames=0, frames_analyzed=0, last_frame_number=-1, created_at=0.0, started_at=None,
+        finished_at=finished_at, error=None
+    )
+
+
+def test_prune_drops_only_jobs_finished_longer_ago_than_the_ttl(tmp_path):
+    store = VideoJobStore(str(tmp_path / "jobs.sqlite3"))
+    now = time.time()
+    store.insert(make_job("old-done", SUCCEEDED, now - 7200))
+    store.insert(make_job("old-failed", FAILED, now - 7200))
+    store.insert(make_job("old-cancelled", CANCELLED, now - 7200))
+    store.insert(make_job("recent-done", SUCCEEDED, now - 60))
+    store.insert(make_job("queued", QUEUED))
+    store.insert(make_job("running", RUNNING))
+    queue = VideoJobQueue(store, runner=lambda job, on_record: {}, storage_dir=str(tmp_path), result_ttl=3600)
+
+    assert queue.prune() == 3
+
+    remaining = {job.job_id for job in store.list_by_status(QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)}
+    assert remaining == {"recent-done", "queued", "running"}
+
+
+def test_prune_is_disabled_by_a_non_positive_ttl(tmp_path):
+    store = VideoJobStore(str(tmp_path / "jobs.sqlite3"))
+    store.insert(make_job("old-done", SUCCEEDED, 0.0))
+    queue = VideoJobQueue(store, runner=lambda job, on_record: {}, storage_dir=str(tmp_path), result_ttl=0)
+
+    assert queue.prune() == 0
+    assert store.get("old-done") is not None
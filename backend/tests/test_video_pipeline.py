@@ -0,0 +1,32 @@
+import threading
+
+import numpy as np
+
+from services.posture_analyzer import PoseLandmarks
+from services.video_pipeline import FrameSampling, VideoAnalysisPipeline
+
+
+class RecordingPool:
+    """Stands in for AnalyzerPool: records what detect_pose receives"""
+    size = 2
+
+    def __init__(self):
+        self.inputs = []
+        self._lock = threading.Lock()
+
+    def detect_pose(self, image, session_id=None, is_rgb=False, use_cache=True, roi=None):
+        with self._lock:
+            self.inputs.append(image)
+        return PoseLandmarks(landmarks=np.zeros(99), visibilities=np.ones(33))
+
+
+def test_untracked_run_poses_passes_images_to_the_pool(video_path):
+    pool = RecordingPool()
+    pipeline = VideoAnalysisPipeline(pool, workers=2, tracking=False)
+
+    frames = list(pipeline.run_poses(video_path, FrameSampling(frame_interval=5)))
+
+    assert [frame.frame_number for frame in frames] == list(range(0, 60, 5))
+    assert all(frame.pose is not None for frame in frames)
+    assert len(pool.inputs) == len(frames)
+    assert all(isinstance(image, np.ndarray) and image.shape == (48, 64, 3) for image in pool.inputs)
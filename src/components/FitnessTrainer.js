@@ -292,6 +292,8 @@ const ErrorMessage = styled.div`
 `;
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
+const WS_BASE_URL = API_BASE_URL.replace(/^http/, 'ws');
+const STREAM_FRAME_INTERVAL_MS = 100;
 
 const FitnessTrainer = () => {
   const webcamRef = useRef(null);
@@ -301,6 +303,8 @@ const FitnessTrainer = () => {
   const [poseOverlay, setPoseOverlay] = useState(null);
   const [error, setError] = useState(null);
   const [isCapturing, setIsCapturing] = useState(false);
+  const sessionIdRef = useRef(null);
+  const socketRef = useRef(null);
 
   const exercises = [
     { value: 'squat', label: 'Squat' },
@@ -337,6 +341,10 @@ const FitnessTrainer = () => {
       formData.append('file', blob, 'image.jpg');
       formData.append('exercise_type', selectedExercise);
       formData.append('include_pose_overlay', 'true');
+      if (sessionIdRef.current) {
+        // Lets the backend keep a tracking-mode pose graph for consecutive frames
+        formData.append('session_id', sessionIdRef.current);
+      }
 
       // Send to backend
       const result = await axios.post(`${API_BASE_URL}/analyze-posture`, formData, {
@@ -358,8 +366,8 @@ const FitnessTrainer = () => {
     }
   };
 
-  const startContinuousAnalysis = () => {
-    setIsCapturing(true);
+  const startPolling = () => {
+    sessionIdRef.current = `session-${Date.now()}-${Math.random().toString(36).slice(2, 10)}`;
     const interval = setInterval(() => {
       if (!isAnalyzing) {
         analyzePosture();
@@ -370,13 +378,100 @@ const FitnessTrainer = () => {
     webcamRef.current.intervalId = interval;
   };
 
+  const startStreaming = () => {
+    const socket = new WebSocket(
+      `${WS_BASE_URL}/ws/analyze?exercise_type=${encodeURIComponent(selectedExercise)}&include_pose_overlay=true`
+    );
+    socketRef.current = socket;
+    let awaitingResult = false;
+    let opened = false;
+
+    socket.onopen = () => {
+      opened = true;
+      const interval = setInterval(async () => {
+        // Keep at most one frame in flight; the server drops stale frames anyway
+        if (socket.readyState !== WebSocket.OPEN || awaitingResult) {
+          return;
+        }
+        const imageSrc = captureImage();
+        if (!imageSrc) {
+          return;
+        }
+        awaitingResult = true;
+        const blob = await (await fetch(imageSrc)).blob();
+        socket.send(blob);
+      }, STREAM_FRAME_INTERVAL_MS);
+      webcamRef.current.intervalId = interval;
+    };
+
+    socket.onmessage = (event) => {
+      awaitingResult = false;
+      const data = JSON.parse(event.data);
+      if (data.type === 'analysis') {
+        setError(null);
+        setAnalysisResult(data);
+        setPoseOverlay(data.pose_overlay_image ? `data:image/jpeg;base64,${data.pose_overlay_image}` : null);
+      } else if (data.type === 'error') {
+        setError(data.detail);
+      }
+    };
+
+    socket.onclose = () => {
+      if (socketRef.current !== socket) {
+        return;
+      }
+      socketRef.current = null;
+      if (webcamRef.current?.intervalId) {
+        clearInterval(webcamRef.current.intervalId);
+      }
+      if (!opened) {
+        // WebSocket unavailable (e.g. behind a proxy); fall back to HTTP polling
+        startPolling();
+      }
+    };
+  };
+
+  const startContinuousAnalysis = () => {
+    setIsCapturing(true);
+    if (typeof WebSocket !== 'undefined') {
+      startStreaming();
+    } else {
+      startPolling();
+    }
+  };
+
   const stopContinuousAnalysis = () => {
     setIsCapturing(false);
+    if (socketRef.current) {
+      const socket = socketRef.current;
+      socketRef.current = null;
+      socket.close();
+    }
     if (webcamRef.current?.intervalId) {
       clearInterval(webcamRef.current.intervalId);
     }
+    if (sessionIdRef.current) {
+      const sessionId = sessionIdRef.current;
+      sessionIdRef.current = null;
+      axios.delete(`${API_BASE_URL}/analyze-posture/sessions/${encodeURIComponent(sessionId)}`).catch(() => {});
+    }
   };
 
+  useEffect(() => {
+    // Switch the live stream to the newly selected exercise without reconnecting
+    if (socketRef.current?.readyState === WebSocket.OPEN) {
+      socketRef.current.send(JSON.stringify({ exercise_type: selectedExercise }));
+    }
+  }, [selectedExercise]);
+
+  useEffect(() => () => {
+    if (socketRef.current) {
+      const socket = socketRef.current;
+      socketRef.current = null;
+      socket.close();
+    }
+  }, []);
+
   const getScoreColor = (score) => {
     if (score >= 0.8) return '#4CAF50';
     if (score >= 0.6) return '#FF9800';
@@ -6,6 +6,8 @@ import cv2
 import numpy as np
 from PIL import Image
 import io
+import os
+import tempfile
 
 class FitnessTrainerTester:
     """Test suite for AI Fitness Trainer API"""
@@ -109,6 +111,117 @@ class FitnessTrainerTester:
             print(f"❌ Posture analysis error: {e}")
             return False
     
+    def test_batch_analysis(self):
+        """Test batch posture analysis endpoint"""
+        print("🔍 Testing batch posture analysis...")
+        try:
+            image_bytes = base64.b64decode(self.create_test_image())
+            files = [('files', (f'frame_{i}.jpg', image_bytes, 'image/jpeg')) for i in range(4)]
+            
+            start_time = time.time()
+            response = self.session.post(
+                f"{self.base_url}/analyze-posture/batch",
+                files=files,
+                data={'exercise_type': 'squat'}
+            )
+            analysis_time = time.time() - start_time
+            
+            if response.status_code == 200:
+                data = response.json()
+                print(f"✅ Batch analysis passed")
+                print(f"   Images: {len(data['results'])}")
+                print(f"   Analysis Time: {analysis_time*1000:.2f}ms")
+                return True
+            else:
+                print(f"❌ Batch analysis failed: {response.status_code}")
+                print(f"   Response: {response.text}")
+                return False
+        except Exception as e:
+            print(f"❌ Batch analysis error: {e}")
+            return False
+    
+    def create_test_video(self, num_frames=60, fps=30):
+        """Create a short test video of the stick figure and return its bytes"""
+        path = os.path.join(tempfile.gettempdir(), f"fitness_test_{os.getpid()}.avi")
+        frame = cv2.cvtColor(
+            np.array(Image.open(io.BytesIO(base64.b64decode(self.create_test_image())))),
+            cv2.COLOR_RGB2BGR
+        )
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (frame.shape[1], frame.shape[0]))
+        for _ in range(num_frames):
+            writer.write(frame)
+        writer.release()
+        
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+    
+    def test_video_rep_summary(self):
+        """Test video analysis with a per-rep summary"""
+        print("🔍 Testing video rep summary...")
+        try:
+            files = {
+                'file': ('test_video.avi', self.create_test_video(), 'video/x-msvideo')
+            }
+            data = {
+                'exercise_type': 'squat',
+                'frame_interval': 5,
+                'summary': 'reps'
+            }
+            
+            response = self.session.post(f"{self.base_url}/analyze-video", files=files, data=data)
+            
+            if response.status_code == 200:
+                data = response.json()
+                print(f"✅ Video rep summary passed")
+                print(f"   Rep Count: {data['rep_count']}")
+                return True
+            else:
+                print(f"❌ Video rep summary failed: {response.status_code}")
+                print(f"   Response: {response.text}")
+                return False
+        except Exception as e:
+            print(f"❌ Video rep summary error: {e}")
+            return False
+    
+    def test_video_job(self, timeout=60):
+        """Test background video job submission, polling and result"""
+        print("🔍 Testing video job...")
+        try:
+            files = {
+                'file': ('test_video.avi', self.create_test_video(), 'video/x-msvideo')
+            }
+            response = self.session.post(
+                f"{self.base_url}/video-jobs",
+                files=files,
+                data={'exercise_type': 'squat', 'frame_interval': 5}
+            )
+            if response.status_code != 202:
+                print(f"❌ Video job submission failed: {response.status_code}")
+                print(f"   Response: {response.text}")
+                return False
+            job = response.json()
+            
+            deadline = time.time() + timeout
+            while job['status'] in ('queued', 'running') and time.time() < deadline:
+                time.sleep(0.5)
+                job = self.session.get(f"{self.base_url}{job['status_url']}").json()
+            
+            if job['status'] != 'succeeded':
+                print(f"❌ Video job ended as {job['status']}: {job['error']}")
+                return False
+            
+            result = self.session.get(f"{self.base_url}{job['result_url']}").json()
+            print(f"✅ Video job passed")
+            print(f"   Job ID: {job['job_id']}")
+            print(f"   Frames Analyzed: {len(result['frame_analyses'])}")
+            return True
+        except Exception as e:
+            print(f"❌ Video job error: {e}")
+            return False
+    
     def test_workout_plan(self):
         """Test workout plan generation"""
         print("🔍 Testing workout plan generation...")
@@ -244,6 +357,9 @@ class FitnessTrainerTester:
             ("Health Check", self.test_health_check),
             ("Exercise Library", self.test_exercise_library),
             ("Posture Analysis", self.test_posture_analysis),
+            ("Batch Analysis", self.test_batch_analysis),
+            ("Video Rep Summary", self.test_video_rep_summary),
+            ("Video Job", self.test_video_job),
             ("Workout Plan", self.test_workout_plan),
             ("Nutrition Advice", self.test_nutrition_advice),
         ]